@@ -2,10 +2,11 @@ from utils.llm import get_llm
 from state.research_state import ResearchState
 from langchain_core.messages import HumanMessage
 from utils.llm import model
+from utils import events
 
 
 def clarifier(state: ResearchState) -> dict:
-    print("=== Clarifier Agent ===")
+    events.debug("clarifier.start")
     prompt = f"""
     You are assisting with a research task. The user's original query is:
 
@@ -27,6 +28,5 @@ def clarifier(state: ResearchState) -> dict:
     # TODO: assuming user responds externally for now
     clarified = state["user_query"] + " (clarified)"
 
-    print("=== Clarifier Result ===")
-    print({"clarified_query": clarified})
+    events.info("clarifier.result", question=question, clarified_query=clarified)
     return {"clarified_query": clarified}
@@ -1,10 +1,11 @@
 from state.research_state import ResearchState
 from langchain_core.messages import HumanMessage
 from utils.llm import model
+from utils import events
 
 
 def clarity_scorer(state: ResearchState):
-    print("=== Clarity Scorer Agent ===")
+    events.debug("clarity_scorer.start")
     prompt = f"""
 You are evaluating the clarity of a user-submitted research query.
 
@@ -43,6 +44,5 @@ Clarity is defined as how **specific, interpretable, and actionable** the query
     response = model.invoke([HumanMessage(content=prompt)]).content
     score = float(response.strip())
 
-    print("=== Clarity Scorer Result ===")
-    print({"clarity_score": score, "clarification_needed": score < 0.6})
+    events.info("clarity_scorer.result", clarity_score=score, clarification_needed=score < 0.6)
     return {"clarity_score": score, "clarification_needed": score < 0.6}
@@ -0,0 +1,125 @@
+import asyncio
+from typing import Dict, List, Set, Tuple
+
+from agents.report_generator import schedule_step_digest
+from agents.executor import execute_step, merge_entities, store_step_evidence
+from agents.supervisor import (
+    A_EXECUTE,
+    A_RETRY,
+    A_SKIP,
+    _max_retries_per_step,
+    decide_action,
+    expand_goal_with_entities,
+)
+from state.research_state import PlanStep, ResearchState
+from utils import events
+
+
+def build_step_dependencies(plan: List[PlanStep], start_idx: int = 0) -> Dict[int, Set[int]]:
+    """
+    Maps each remaining step index to the indices of the earlier steps that
+    produce one of its required entities. Steps before start_idx are already
+    done, and entities nobody earlier produces are ignored.
+    """
+    producers: Dict[str, List[int]] = {}
+    for idx, step in enumerate(plan):
+        for entity in step.get("produces_entities") or []:
+            producers.setdefault(entity, []).append(idx)
+
+    deps: Dict[int, Set[int]] = {}
+    for idx in range(start_idx, len(plan)):
+        required = plan[idx].get("requires_entities") or []
+        deps[idx] = {
+            j for entity in required for j in producers.get(entity, []) if start_idx <= j < idx
+        }
+    return deps
+
+
+async def dag_executor(state: ResearchState) -> dict:
+    """
+    Runs every remaining plan step as soon as the steps producing its
+    required entities are done, with independent steps running concurrently.
+
+    The supervisor policy is consulted per step right before it starts:
+    EXECUTE/RETRY run the step and SKIP marks it done. REPLAN or TERMINATE
+    stop new steps from starting; in-flight steps finish, and the graph-level
+    supervisor handles the first unfinished step as in sequential mode.
+    """
+    events.debug("dag_executor.start", current_step_idx=state.get("current_step_idx"))
+    plan = [dict(step) for step in state["plan"]]
+    start_idx = int(state.get("current_step_idx", 0) or 0)
+    deps = build_step_dependencies(plan, start_idx)
+    max_retries_per_step = _max_retries_per_step(state)
+
+    entities = {k: list(v) for k, v in (state.get("entities") or {}).items()}
+    evidence_store = list(state.get("evidence_store", []))
+    done: Set[int] = set(range(start_idx))
+    pending = set(deps)
+    running: Dict[asyncio.Task, int] = {}
+    halted = False
+    query = state.get("clarified_query") or state["user_query"]
+
+    async def run_step(step_idx: int) -> Tuple[str, List[str], Dict[str, List[str]]]:
+        plan[step_idx]["expanded_goal"] = expand_goal_with_entities(
+            goal=plan[step_idx]["goal"],
+            required_entities=plan[step_idx].get("requires_entities") or [],
+            entities=entities,
+        )
+        view = {**state, "plan": plan, "current_step_idx": step_idx, "entities": entities}
+        if step_idx == start_idx and state.get("supervisor_decision") in (A_EXECUTE, A_RETRY):
+            # the graph-level supervisor has just decided this step
+            action = state["supervisor_decision"]
+        else:
+            action = await asyncio.to_thread(decide_action, view, max_retries_per_step)
+        if action not in (A_EXECUTE, A_RETRY):
+            return action, [], {}
+        subtask_results, new_entities = await execute_step(view, step_idx)
+        return action, subtask_results, new_entities
+
+    try:
+        while pending or running:
+            if not halted:
+                for step_idx in sorted(pending):
+                    if deps[step_idx] <= done:
+                        pending.discard(step_idx)
+                        running[asyncio.create_task(run_step(step_idx))] = step_idx
+
+            if not running:
+                break
+
+            finished, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in finished:
+                step_idx = running.pop(task)
+                action, subtask_results, new_entities = task.result()
+                events.info("dag_executor.step", step=plan[step_idx]["id"], action=action)
+
+                if action in (A_EXECUTE, A_RETRY):
+                    merge_entities(entities, new_entities)
+                    evidence_store = store_step_evidence(evidence_store, step_idx, subtask_results)
+                    schedule_step_digest(query, plan[step_idx], subtask_results)
+                    done.add(step_idx)
+                elif action == A_SKIP:
+                    done.add(step_idx)
+                else:
+                    halted = True
+    finally:
+        # a failed step or a cancelled run must not leave siblings spending calls
+        for task in running:
+            task.cancel()
+        await asyncio.gather(*running, return_exceptions=True)
+
+    next_idx = next((i for i in range(start_idx, len(plan)) if i not in done), len(plan))
+
+    events.info(
+        "dag_executor.result",
+        current_step_idx=next_idx,
+        steps_done=len(done),
+        entity_types=len(entities),
+    )
+    events.debug("dag_executor.evidence", evidence_store=evidence_store, entities=entities)
+    return {
+        "plan": plan,
+        "evidence_store": evidence_store,
+        "entities": entities,
+        "current_step_idx": next_idx,
+    }
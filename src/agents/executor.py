@@ -1,21 +1,82 @@
 import json
 import os
+import re
 import asyncio
 from textwrap import indent
-from typing import Dict, List, Optional, Tuple
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
 from collections import Counter, defaultdict
+from urllib.parse import urlsplit
 
-from dotenv import load_dotenv
-from tavily import TavilyClient
 from utils.llm import model
+from utils import events
+from agents.report_generator import schedule_step_digest
+from utils.instrumentation import call_context
+from utils.passages import STOPWORDS, select_relevant_passages, tokenize
 from state.research_state import Evidence, ResearchState, PlanStep
 from langchain_core.messages import HumanMessage
-from utils.tavily_wrapper import tavily_search, tavily_extract
-
-
-def decompose_plan_step(step: str, entity_context: dict, prev_err: str | None) -> List[str]:
-    """Decomposes a plan step into a list of subtasks."""
-    prompt = f"""
+from utils.tavily_wrapper import (
+    ExtractCoordinator,
+    tavily_search_async,
+    tavily_extract_async,
+)
+
+# local BM25 pre-filter applied to page text before extract_info_from_page
+PAGE_PREFILTER_ENABLED = os.getenv("PAGE_PREFILTER_ENABLED", "1") != "0"
+PAGE_TOKEN_BUDGET = int(os.getenv("PAGE_TOKEN_BUDGET", 6000))
+PAGE_TOP_K_PASSAGES = int(os.getenv("PAGE_TOP_K_PASSAGES", 16))
+
+# one LLM call per page that returns both the cleaned extraction and its score
+FUSED_EXTRACT_AND_SCORE = os.getenv("FUSED_EXTRACT_AND_SCORE", "1") != "0"
+# max (subtask, result) pairs scored in one batched LLM call
+SCORE_BATCH_SIZE = int(os.getenv("SCORE_BATCH_SIZE", 10))
+# how long the step-level ScoreBatcher waits for other subtasks' pairs before sending a batch
+SCORE_BATCH_WINDOW_SECONDS = float(os.getenv("SCORE_BATCH_WINDOW_SECONDS", 0.05))
+# evidence items joined into one entity extraction call (1 = one call per item)
+ENTITY_BATCH_SIZE = int(os.getenv("ENTITY_BATCH_SIZE", 1))
+
+# Tavily rejects queries longer than this
+SEARCH_QUERY_LIMIT = 400
+# optional cap on subtasks per plan step (0 = no cap)
+MAX_SUBTASKS = int(os.getenv("MAX_SUBTASKS", 0))
+
+# "local": rank search results with rank_urls_locally; "llm": choose_best_n_urls
+URL_RANKER = os.getenv("URL_RANKER", "local")
+
+# score bonus by domain suffix, for sources that tend to be authoritative
+DOMAIN_PRIORS = {
+    ".gov": 0.3,
+    ".edu": 0.2,
+    ".int": 0.2,
+    "wikipedia.org": 0.2,
+    ".org": 0.1,
+}
+
+# penalties for results that are unlikely to extract cleanly
+NON_CRAWLABLE_PATTERNS = {
+    "pdf": (re.compile(r"\.pdf($|[?#])|/pdf/", re.I), 1.0),
+    "forum": (re.compile(r"reddit\.|forum|/threads?/|/t/|community\.|discussions?/", re.I), 0.5),
+    "paywall": (re.compile(r"subscribe|subscription|paywall|premium|/login|signin", re.I), 0.5),
+}
+
+
+def _invoke_text(prompt: str) -> str:
+    return model.invoke([HumanMessage(content=prompt)]).content
+
+
+async def _ainvoke_text(prompt: str) -> str:
+    response = await model.ainvoke([HumanMessage(content=prompt)])
+    return response.content
+
+
+def _decompose_prompt(
+    step: str, entity_context: dict, prev_err: str | None, max_subtasks: int | None = None
+) -> str:
+    count_rule = (
+        f"\n- Return **at most {max_subtasks}** subtasks; keep the most important ones."
+        if max_subtasks
+        else ""
+    )
+    return f"""
 You are a domain-aware research assistant. Your task is to decompose the following high-level research step into a minimal set of **atomic**, **web-searchable** subtasks.
 
 ### Guidelines:
@@ -27,6 +88,7 @@ You are a domain-aware research assistant. Your task is to decompose the followi
 - Use neutral phrasing, and focus on **fact-finding**, **comparisons**, **definitions**, **statistics**, or **causal relationships**.
 - Include only as many subtasks as are **necessary** to cover the plan step comprehensively.
 - There may be a list of entities extracted from prior steps that can help provide context for this step. Use them if relevant. You can make one subtask for each entity if required.
+- Each query must be **under {SEARCH_QUERY_LIMIT} characters**.{count_rule}
 
 ### Plan Step:
 "{step}"
@@ -34,32 +96,116 @@ You are a domain-aware research assistant. Your task is to decompose the followi
 ### Previous Errors:
 {prev_err if prev_err else "None"}
 
-### Output Format:
-Return only the subtasks as a numbered list.
-Each item should be a single-line query.
+### Output Format (STRICT JSON, no markdown):
+A JSON list with one object per subtask:
+[{{"query": "<single-line search query>", "priority": <1 = most important, 3 = least>}}]
+"""
+
+
+_LIST_MARKER_RE = re.compile(r"^\s*(?:\d+\s*[.)]|[-*•])\s*")
+_PARENTHETICAL_RE = re.compile(r"\s*[(\[][^)\]]*[)\]]")
+
+
+def compress_query(query: str, limit: int = SEARCH_QUERY_LIMIT) -> str:
+    """
+    Deterministically shortens a search query to fit `limit` characters:
+    collapse whitespace, drop parentheticals, then stopwords, then cut at a
+    word boundary. Queries that already fit are returned unchanged.
+    """
+    query = " ".join(query.split())
+    if len(query) <= limit:
+        return query
+
+    query = " ".join(_PARENTHETICAL_RE.sub("", query).split())
+    if len(query) > limit:
+        query = " ".join(w for w in query.split() if w.lower() not in STOPWORDS)
+    if len(query) > limit:
+        query = query[: limit + 1].rsplit(" ", 1)[0] if " " in query[:limit] else query[:limit]
+    return query
+
+
+def _parse_subtasks(
+    response: str, max_subtasks: int | None = None, limit: int = SEARCH_QUERY_LIMIT
+) -> List[str]:
+    """
+    Parses the decomposition JSON into search-ready queries, ordered by
+    priority and capped at max_subtasks. Items that are neither a string
+    nor an object with a string "query" are skipped. Falls back to a
+    numbered/bulleted list only if the model did not return JSON at all.
+    """
+    text = response.strip()
+    if text.startswith("```"):
+        text = text.strip("`").removeprefix("json").strip()
+
+    items: List[Tuple[int, str]] = []
+    try:
+        parsed = json.loads(text)
+    except json.JSONDecodeError:
+        items = [
+            (2, _LIST_MARKER_RE.sub("", line).strip())
+            for line in response.splitlines()
+            if line.strip()
+        ]
+    else:
+        if isinstance(parsed, dict):
+            # tolerate a single subtask object or a wrapper like {"subtasks": [...]}
+            parsed = [parsed] if "query" in parsed else next(
+                (v for v in parsed.values() if isinstance(v, list)), []
+            )
+        elif not isinstance(parsed, list):
+            parsed = [parsed]
+        for item in parsed:
+            if isinstance(item, str):
+                items.append((2, item))
+            elif isinstance(item, dict) and isinstance(item.get("query"), str):
+                priority = item.get("priority")
+                items.append((priority if isinstance(priority, int) else 2, item["query"]))
+
+    # sorted() is stable, so equal priorities keep the model's order
+    queries = [query for _, query in sorted(items, key=lambda item: item[0]) if query.strip()]
+    if max_subtasks:
+        queries = queries[:max_subtasks]
+    return [compress_query(query, limit) for query in queries]
+
+
+def decompose_plan_step(
+    step: str, entity_context: dict, prev_err: str | None, max_subtasks: int | None = None
+) -> List[str]:
+    """Decomposes a plan step into a list of search-ready subtask queries."""
+    prompt = _decompose_prompt(step, entity_context, prev_err, max_subtasks)
+    return _parse_subtasks(_invoke_text(prompt), max_subtasks)
+
+
+async def decompose_plan_step_async(
+    step: str, entity_context: dict, prev_err: str | None, max_subtasks: int | None = None
+) -> List[str]:
+    prompt = _decompose_prompt(step, entity_context, prev_err, max_subtasks)
+    return _parse_subtasks(await _ainvoke_text(prompt), max_subtasks)
+
+
+def _shorten_prompt(subtask: str, limit: int) -> str:
+    return f"""
+Shorten the following sentence to under {limit} characters while preserving its meaning and specificity:
+
+"{subtask}"
 """
-    # print("DECOMPOSE PROMPT\n", prompt)
-    response = model.invoke([HumanMessage(content=prompt)]).content
-    return [line.strip().split(". ", 1)[-1] for line in response.splitlines() if line.strip()]
 
 
 def shorten_plan_subtask(subtask: str, limit: int) -> str:
     """Shortens a plan subtask to a specified limit."""
     if len(subtask) <= limit:
         return subtask
+    return _invoke_text(_shorten_prompt(subtask, limit))
 
-    prompt = f"""
-Shorten the following sentence to under {limit} characters while preserving its meaning and specificity:
 
-"{subtask}"
-"""
-    response = model.invoke([HumanMessage(content=prompt)]).content
-    return response
+async def shorten_plan_subtask_async(subtask: str, limit: int) -> str:
+    if len(subtask) <= limit:
+        return subtask
+    return await _ainvoke_text(_shorten_prompt(subtask, limit))
 
 
-def choose_best_n_urls(subtask: str, urls: List[str], n: int) -> List[int]:
-    """Chooses the best N URLs from a list of URLs based on a given subtask."""
-    prompt = f"""
+def _choose_urls_prompt(subtask: str, urls: List[str], n: int) -> str:
+    return f"""
 You're evaluating URLs for relevance to the following research subtask:
 "{subtask}"
 
@@ -69,7 +215,9 @@ Given these URLs:
 Return the numbers of the {n} most relevant URLs in order of usefulness. The URLS should be crawlable, so exclude sites like Reddit, or PDFs, or other non-crawlable content.
 Just return a comma-separated list of numbers (e.g., 2,1,5).
 """
-    response = model.invoke([HumanMessage(content=prompt)]).content
+
+
+def _parse_url_indexes(response: str, n: int) -> List[int]:
     try:
         indexes = [int(x.strip()) - 1 for x in response.split(",") if x.strip().isdigit()]
         return indexes[:n]
@@ -77,9 +225,52 @@ Just return a comma-separated list of numbers (e.g., 2,1,5).
         return [i for i in range(n)]
 
 
-def extract_info_from_page(subtask: str, page_content: str) -> str:
-    """Extracts information from a page's content that is relevant to the subtask. Gets rid of unnecessary things"""
-    prompt = f"""
+def choose_best_n_urls(subtask: str, urls: List[str], n: int) -> List[int]:
+    """Chooses the best N URLs from a list of URLs based on a given subtask."""
+    return _parse_url_indexes(_invoke_text(_choose_urls_prompt(subtask, urls, n)), n)
+
+
+async def choose_best_n_urls_async(subtask: str, urls: List[str], n: int) -> List[int]:
+    response = await _ainvoke_text(_choose_urls_prompt(subtask, urls, n))
+    return _parse_url_indexes(response, n)
+
+
+def _url_domain(url: str) -> str:
+    return urlsplit(url).netloc.lower()
+
+
+def score_search_result(subtask: str, result: Dict) -> float:
+    """
+    Local relevance score for one Tavily search result: Tavily's own score,
+    subtask term overlap with the title and snippet, domain priors, and
+    penalties for PDFs, forums and paywalled pages.
+    """
+    subtask_terms = set(tokenize(subtask))
+    snippet_terms = set(tokenize(f"{result.get('title') or ''} {result.get('content') or ''}"))
+    overlap = len(subtask_terms & snippet_terms) / len(subtask_terms) if subtask_terms else 0.0
+
+    score = float(result.get("score") or 0.0) + overlap
+
+    url = result.get("url", "")
+    domain = _url_domain(url)
+    score += max(
+        (bonus for suffix, bonus in DOMAIN_PRIORS.items() if domain.endswith(suffix)), default=0.0
+    )
+    for pattern, penalty in NON_CRAWLABLE_PATTERNS.values():
+        if pattern.search(url):
+            score -= penalty
+    return score
+
+
+def rank_urls_locally(subtask: str, results: List[Dict], n: int) -> List[int]:
+    """Chooses the best N search results without an LLM call. Returns their indexes."""
+    scores = [score_search_result(subtask, result) for result in results]
+    ranked = sorted(range(len(results)), key=lambda i: scores[i], reverse=True)
+    return ranked[:n]
+
+
+def _extract_info_prompt(subtask: str, page_content: str) -> str:
+    return f"""
 You are an information extraction agent. Your task is to extract only factual, relevant content from the following web page, based on this research subtask:
 
 Subtask:
@@ -100,12 +291,19 @@ Subtask:
 
 ### Cleaned Output:
 """
-    return model.invoke([HumanMessage(content=prompt)]).content.strip()
 
 
-def evaluate_subtask_result(subtask: str, result: str) -> int:
-    """Evaluates the result of a subtask. Returns a score between 0 and 10"""
-    prompt = f"""
+def extract_info_from_page(subtask: str, page_content: str) -> str:
+    """Extracts information from a page's content that is relevant to the subtask. Gets rid of unnecessary things"""
+    return _invoke_text(_extract_info_prompt(subtask, page_content)).strip()
+
+
+async def extract_info_from_page_async(subtask: str, page_content: str) -> str:
+    return (await _ainvoke_text(_extract_info_prompt(subtask, page_content))).strip()
+
+
+def _evaluate_result_prompt(subtask: str, result: str) -> str:
+    return f"""
 Evaluate the relevance and quality of the following result for this research subtask:
 
 Subtask:
@@ -133,26 +331,179 @@ Score the result on a scale from **0 to 10** based on the following dimensions:
 - Return **only a single integer** between 0 and 10.
 - Do not include explanations, text, or formatting.
 """
-    response = model.invoke([HumanMessage(content=prompt)]).content
+
+
+def _parse_score(response: str) -> int:
     try:
         return min(max(int(response.strip()), 0), 10)
     except Exception:
         return 5  # fallback neutral
 
 
-def _extract_entities_from_text(
-    expected_entities: List[str], evidence_text: str
-) -> Dict[str, List[str]]:
-    """
-    Extract entities of specified types from raw evidence text.
+def evaluate_subtask_result(subtask: str, result: str) -> int:
+    """Evaluates the result of a subtask. Returns a score between 0 and 10"""
+    return _parse_score(_invoke_text(_evaluate_result_prompt(subtask, result)))
 
-    Returns a dict keyed by entity type, each mapping to a list of strings.
+
+async def evaluate_subtask_result_async(subtask: str, result: str) -> int:
+    return _parse_score(await _ainvoke_text(_evaluate_result_prompt(subtask, result)))
+
+
+def _evaluate_batch_prompt(pairs: List[Tuple[str, str]]) -> str:
+    candidates = "\n\n".join(
+        f'### Candidate {i}\nSubtask:\n"{subtask}"\nResult:\n\"\"\"\n{result}\n\"\"\"'
+        for i, (subtask, result) in enumerate(pairs)
+    )
+    return f"""
+Evaluate the relevance and quality of each of the following results for its research subtask.
+
+{candidates}
+
+Score each result on a scale from **0 to 10** based on the following dimensions:
+
+- **Relevance**: Does the result directly address the subtask?
+- **Completeness**: Does it substantially cover the information needed to answer the subtask?
+- **Factual Quality**: Is the information specific, concrete, and plausibly reliable (not vague or speculative)?
+
+### Scoring Guidance:
+- **9-10**: Directly answers the subtask with clear, detailed, and relevant factual information.
+- **6-8**: Mostly relevant and useful, but missing some important details or depth.
+- **3-5**: Partially related, superficial, or only indirectly useful.
+- **1-2**: Barely related or mostly noise.
+- **0**: Irrelevant, incorrect, or empty.
+
+### Output Requirements:
+- Return **only a JSON list of {len(pairs)} integers**, one score per candidate, in candidate order (e.g., [7, 2, 9]).
+- Do not include explanations, text, or formatting.
+"""
+
+
+def _parse_batch_scores(response: str, n: int) -> List[Optional[int]]:
+    """Parses a JSON list of scores. Items that are missing or invalid come back as None."""
+    try:
+        parsed = json.loads(response.strip())
+    except Exception:
+        return [None] * n
+    if not isinstance(parsed, list):
+        return [None] * n
+
+    scores: List[Optional[int]] = []
+    for i in range(n):
+        try:
+            scores.append(min(max(int(parsed[i]), 0), 10))
+        except Exception:
+            scores.append(None)
+    return scores
+
+
+def _score_batches(pairs: List[Tuple[str, str]]) -> List[List[Tuple[str, str]]]:
+    return [pairs[i : i + SCORE_BATCH_SIZE] for i in range(0, len(pairs), SCORE_BATCH_SIZE)]
+
+
+def evaluate_subtask_results_batch(pairs: List[Tuple[str, str]]) -> List[int]:
+    """
+    Scores several (subtask, result) pairs in one LLM call per batch.
+    Items the batched response does not score are scored individually.
     """
+    scores: List[int] = []
+    for batch in _score_batches(pairs):
+        if len(batch) == 1:
+            scores.append(evaluate_subtask_result(*batch[0]))
+            continue
+        parsed = _parse_batch_scores(_invoke_text(_evaluate_batch_prompt(batch)), len(batch))
+        for pair, score in zip(batch, parsed):
+            scores.append(score if score is not None else evaluate_subtask_result(*pair))
+    return scores
+
+
+async def evaluate_subtask_results_batch_async(pairs: List[Tuple[str, str]]) -> List[int]:
+    async def score_batch(batch: List[Tuple[str, str]]) -> List[int]:
+        if len(batch) == 1:
+            return [await evaluate_subtask_result_async(*batch[0])]
+        response = await _ainvoke_text(_evaluate_batch_prompt(batch))
+        parsed = _parse_batch_scores(response, len(batch))
+        fallbacks = {
+            i: evaluate_subtask_result_async(*pair)
+            for i, (pair, score) in enumerate(zip(batch, parsed))
+            if score is None
+        }
+        for i, score in zip(fallbacks, await asyncio.gather(*fallbacks.values())):
+            parsed[i] = score
+        return parsed
 
-    if not expected_entities or not evidence_text.strip():
-        return {entity: [] for entity in expected_entities}
+    batches = await asyncio.gather(*(score_batch(b) for b in _score_batches(pairs)))
+    return [score for batch in batches for score in batch]
 
-    prompt = f"""
+
+class ScoreBatcher:
+    """
+    Step-level scoring coordinator, the scoring counterpart of
+    ExtractCoordinator. Subtasks of one step submit their (subtask, result)
+    pairs here instead of scoring them themselves; pairs submitted within a
+    short window, from any subtask, are scored together, SCORE_BATCH_SIZE
+    per LLM call.
+    """
+
+    def __init__(
+        self,
+        score_fn: Callable[[List[Tuple[str, str]]], Awaitable[List[int]]] = (
+            evaluate_subtask_results_batch_async
+        ),
+        batch_window: float = SCORE_BATCH_WINDOW_SECONDS,
+        max_batch: int = SCORE_BATCH_SIZE,
+    ):
+        self.score_fn = score_fn
+        self.batch_window = batch_window
+        self.max_batch = max(max_batch, 1)
+        self._queue: List[Tuple[Tuple[str, str], asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self.scored = 0
+        self.batches = 0
+
+    async def score(self, pairs: List[Tuple[str, str]]) -> List[int]:
+        loop = asyncio.get_running_loop()
+        futures = [loop.create_future() for _ in pairs]
+        self._queue.extend(zip(pairs, futures))
+        self.scored += len(pairs)
+        if len(self._queue) >= self.max_batch:
+            self._flush()
+        elif self._queue and self._timer is None:
+            self._timer = loop.call_later(self.batch_window, self._flush)
+        return list(await asyncio.gather(*futures))
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._queue:
+            batch, self._queue = self._queue[: self.max_batch], self._queue[self.max_batch :]
+            task = asyncio.ensure_future(self._run_batch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, batch: List[Tuple[Tuple[str, str], asyncio.Future]]) -> None:
+        self.batches += 1
+        try:
+            scores = await self.score_fn([pair for pair, _ in batch])
+            for (_, future), score in zip(batch, scores):
+                if not future.done():
+                    future.set_result(score)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            # cancelled (or answered short): never leave a subtask waiting
+            for _, future in batch:
+                future.cancel()
+
+    def stats(self) -> Dict[str, int]:
+        return {"scored": self.scored, "batches": self.batches}
+
+
+def _extract_entities_prompt(expected_entities: List[str], evidence_text: str) -> str:
+    return f"""
 You are an information extraction system.
 
 Your task is to extract structured entities from the text below.
@@ -177,12 +528,14 @@ TEXT:
 {evidence_text}
 """
 
-    response = model.invoke([HumanMessage(content=prompt)]).content
 
+def _parse_entities(expected_entities: List[str], response: str) -> Dict[str, List[str]]:
     try:
         parsed = json.loads(response)
     except Exception:
         parsed = {entity: [] for entity in expected_entities}
+    if not isinstance(parsed, dict):
+        parsed = {}
 
     # Normalize output
     result: Dict[str, List[str]] = {}
@@ -195,20 +548,36 @@ TEXT:
     return result
 
 
-def _extract_entities(step: PlanStep, evidence: List[str]) -> Dict[str, List[str]]:
+def _extract_entities_from_text(
+    expected_entities: List[str], evidence_text: str
+) -> Dict[str, List[str]]:
     """
-    Extract entities from the plan step goal for better context.
-    This is a placeholder function and should be replaced with a proper NER model.
+    Extract entities of specified types from raw evidence text.
+
+    Returns a dict keyed by entity type, each mapping to a list of strings.
     """
-    expected_entities = step.get("produces_entities", [])
-    aggregated: Dict[str, List[str]] = defaultdict(list)
 
-    if not expected_entities:
-        return {}
+    if not expected_entities or not evidence_text.strip():
+        return {entity: [] for entity in expected_entities}
+
+    response = _invoke_text(_extract_entities_prompt(expected_entities, evidence_text))
+    return _parse_entities(expected_entities, response)
+
+
+async def _extract_entities_from_text_async(
+    expected_entities: List[str], evidence_text: str
+) -> Dict[str, List[str]]:
+    if not expected_entities or not evidence_text.strip():
+        return {entity: [] for entity in expected_entities}
+
+    response = await _ainvoke_text(_extract_entities_prompt(expected_entities, evidence_text))
+    return _parse_entities(expected_entities, response)
 
-    for ev in evidence:
-        extracted = _extract_entities_from_text(expected_entities, ev)
 
+def _aggregate_entities(extractions: List[Dict[str, List[str]]]) -> Dict[str, List[str]]:
+    """Concatenates per-item extractions in evidence order and drops duplicates."""
+    aggregated: Dict[str, List[str]] = defaultdict(list)
+    for extracted in extractions:
         for entity_type, values in extracted.items():
             aggregated[entity_type] += values
 
@@ -224,6 +593,37 @@ def _extract_entities(step: PlanStep, evidence: List[str]) -> Dict[str, List[str
     return aggregated
 
 
+def _extract_entities(step: PlanStep, evidence: List[str]) -> Dict[str, List[str]]:
+    """
+    Extract entities from the plan step goal for better context.
+    This is a placeholder function and should be replaced with a proper NER model.
+    """
+    expected_entities = step.get("produces_entities", [])
+    if not expected_entities:
+        return {}
+
+    return _aggregate_entities(
+        [_extract_entities_from_text(expected_entities, ev) for ev in evidence]
+    )
+
+
+async def _extract_entities_async(step: PlanStep, evidence: List[str]) -> Dict[str, List[str]]:
+    """
+    Async _extract_entities: evidence items (grouped ENTITY_BATCH_SIZE per
+    call) are extracted concurrently instead of one blocking call at a time.
+    """
+    expected_entities = step.get("produces_entities", [])
+    if not expected_entities:
+        return {}
+
+    size = max(ENTITY_BATCH_SIZE, 1)
+    batches = ["\n\n---\n\n".join(evidence[i : i + size]) for i in range(0, len(evidence), size)]
+    extractions = await asyncio.gather(
+        *(_extract_entities_from_text_async(expected_entities, text) for text in batches)
+    )
+    return _aggregate_entities(list(extractions))
+
+
 def trim_entities(entities: Dict[str, List[str]], limit: int) -> Dict[str, List[str]]:
     """Trims the number of entities per type to a specified limit."""
     trimmed = {}
@@ -252,9 +652,79 @@ Subtask:
     return score
 
 
-def estimate_evidence(subtask: str) -> str:
-    """Generates estimated evidence for a subtask when real evidence is not findable."""
-    prompt = f"""
+def _extract_and_score_prompt(subtask: str, page_content: str) -> str:
+    return f"""
+You are an information extraction agent. Your task is to extract only factual, relevant content from the following web page, based on this research subtask, and then score what you extracted.
+
+Subtask:
+"{subtask}"
+
+### Extraction Instructions:
+- Keep only the sections that are directly relevant to the subtask.
+- Make sure to extract numeric data if it appears.
+- Exclude boilerplate elements like navigation menus, ads, author bios, prompts to subscribe, cookie notices, or unrelated sections.
+- Ignore links, images, citations, and formatting — focus on the core informative content.
+- The extraction should be a clean, readable summary of the key factual information related to the subtask.
+- Do not hallucinate or add any extra context or information not found in the content.
+
+### Scoring Instructions:
+Score the extraction on a scale from **0 to 10** for relevance, completeness and factual quality:
+- **9-10**: Directly answers the subtask with clear, detailed, and relevant factual information.
+- **6-8**: Mostly relevant and useful, but missing some important details or depth.
+- **3-5**: Partially related, superficial, or only indirectly useful.
+- **1-2**: Barely related or mostly noise.
+- **0**: Irrelevant, incorrect, or empty.
+
+### Page Content:
+\"\"\"
+{page_content}
+\"\"\"
+
+### Output Format (STRICT JSON, no markdown):
+{{"extracted": "<cleaned output>", "score": <integer 0-10>}}
+"""
+
+
+def _parse_extract_and_score(response: str) -> Optional[Tuple[str, int]]:
+    """Returns (extraction, score), or None when the response is not the expected JSON."""
+    text = response.strip()
+    if text.startswith("```"):
+        text = text.strip("`").removeprefix("json").strip()
+    try:
+        parsed = json.loads(text)
+        extracted = str(parsed["extracted"]).strip()
+        score = min(max(int(parsed["score"]), 0), 10)
+    except Exception:
+        return None
+    return extracted, score
+
+
+def extract_and_score_page(subtask: str, page_content: str) -> Tuple[str, int]:
+    """Fused extract_info_from_page + evaluate_subtask_result in a single LLM call."""
+    response = _invoke_text(_extract_and_score_prompt(subtask, page_content))
+    parsed = _parse_extract_and_score(response)
+    if parsed is not None:
+        return parsed
+    # malformed JSON: keep the raw text as the extraction and score it separately
+    extracted = response.strip()
+    return extracted, evaluate_subtask_result(subtask, extracted)
+
+
+async def extract_and_score_page_async(
+    subtask: str, page_content: str, scorer: Optional[ScoreBatcher] = None
+) -> Tuple[str, int]:
+    response = await _ainvoke_text(_extract_and_score_prompt(subtask, page_content))
+    parsed = _parse_extract_and_score(response)
+    if parsed is not None:
+        return parsed
+    extracted = response.strip()
+    if scorer is not None:
+        return extracted, (await scorer.score([(subtask, extracted)]))[0]
+    return extracted, await evaluate_subtask_result_async(subtask, extracted)
+
+
+def _estimate_prompt(subtask: str) -> str:
+    return f"""
 You are a knowledgeable research assistant. Your task is to provide a plausible and concise summary of information that would address the following research subtask:
 Subtask:
 "{subtask}"
@@ -266,20 +736,42 @@ Subtask:
 ### Output:
 Return a very concise paragraph summarizing the key information. Don't include any extra information or context if it's not explicitly asked for.
 """
-    return model.invoke([HumanMessage(content=prompt)]).content.strip()
+
+
+def estimate_evidence(subtask: str) -> str:
+    """Generates estimated evidence for a subtask when real evidence is not findable."""
+    return _invoke_text(_estimate_prompt(subtask)).strip()
+
+
+async def estimate_evidence_async(subtask: str) -> str:
+    return (await _ainvoke_text(_estimate_prompt(subtask))).strip()
 
 
 async def execute_subtask_async(subtask: str) -> str:
-    # Wrap sync functions in asyncio.to_thread
-    shortened_subtask = await asyncio.to_thread(shorten_plan_subtask, subtask, 400)
-    # print("SHORTENED", shortened_subtask)
+    result, _ = await execute_subtask_scored_async(subtask)
+    return result
 
-    search_response = await asyncio.to_thread(tavily_search, shortened_subtask)
+
+async def execute_subtask_scored_async(
+    subtask: str,
+    coordinator: Optional[ExtractCoordinator] = None,
+    scorer: Optional[ScoreBatcher] = None,
+) -> Tuple[str, int]:
+    """
+    Runs one subtask. Returns the best page extraction and its 0-10 score.
+    With a coordinator, page extraction is shared with the step's other
+    subtasks; with a scorer, so is scoring (ScoreBatcher).
+    """
+    # subtasks come out of decompose_plan_step already under SEARCH_QUERY_LIMIT
+    search_response = await tavily_search_async(subtask)
     urls = [result["url"] for result in search_response["results"]]
     # print("ALL URLS", urls)
 
     num_best = 2
-    best_url_indexes = await asyncio.to_thread(choose_best_n_urls, subtask, urls, num_best)
+    if URL_RANKER == "llm":
+        best_url_indexes = await choose_best_n_urls_async(subtask, urls, num_best)
+    else:
+        best_url_indexes = rank_urls_locally(subtask, search_response["results"], num_best)
     best_urls = (
         [urls[i] for i in best_url_indexes]
         if len(best_url_indexes) == num_best
@@ -288,30 +780,60 @@ async def execute_subtask_async(subtask: str) -> str:
     # print("BEST URLs", best_urls)
 
     if not best_urls:
-        return "No search results"
+        return "No search results", 0
 
-    page_content = await asyncio.to_thread(tavily_extract, best_urls)
+    if coordinator is not None:
+        page_content = await coordinator.extract(best_urls)
+    else:
+        page_content = await tavily_extract_async(best_urls)
     best_extracted_info = "No relevant content found"
     max_score = -1
 
+    contents = []
     for result in page_content["results"]:
         content = result["raw_content"][:300_000]
-        # print("CONTENT", content[:100])
-        extracted_info = await asyncio.to_thread(extract_info_from_page, subtask, content)
-        # print("EXTRACTED FROM", result["url"], ":", extracted_info)
-        score = await asyncio.to_thread(evaluate_subtask_result, subtask, extracted_info)
+        if PAGE_PREFILTER_ENABLED:
+            content = select_relevant_passages(
+                subtask, content, token_budget=PAGE_TOKEN_BUDGET, top_k=PAGE_TOP_K_PASSAGES
+            )
+        contents.append(content)
+
+    # pages are processed concurrently; separate scoring calls (unfused mode,
+    # or a fused response that did not parse) are batched
+    if FUSED_EXTRACT_AND_SCORE:
+        scored_pages = await asyncio.gather(
+            *(extract_and_score_page_async(subtask, content, scorer) for content in contents)
+        )
+    else:
+        extracted = await asyncio.gather(
+            *(extract_info_from_page_async(subtask, content) for content in contents)
+        )
+        pairs = [(subtask, e) for e in extracted]
+        if scorer is not None:
+            scores = await scorer.score(pairs)
+        else:
+            scores = await evaluate_subtask_results_batch_async(pairs)
+        scored_pages = list(zip(extracted, scores))
 
+    for extracted_info, score in scored_pages:
         if score > max_score or best_extracted_info is None:
             max_score = score
             best_extracted_info = extracted_info
 
-    return best_extracted_info
+    return best_extracted_info, max(max_score, 0)
 
 
-async def executor(state: ResearchState) -> dict:
-    print("=== Executor Agent ===")
-    print("Current Step Index:", state["current_step_idx"])
-    step_idx = state["current_step_idx"]
+async def execute_step(
+    state: ResearchState, step_idx: int
+) -> Tuple[List[str], Dict[str, List[str]]]:
+    """Runs one plan step. Returns (evidence per subtask, entities extracted from it)."""
+    with call_context(step_id=state["plan"][step_idx]["id"]):
+        return await _execute_step(state, step_idx)
+
+
+async def _execute_step(
+    state: ResearchState, step_idx: int
+) -> Tuple[List[str], Dict[str, List[str]]]:
     step_goal = state["plan"][step_idx]["expanded_goal"]
     prev_err = (
         state["failed_steps"][step_idx]["reason"] if step_idx in state["failed_steps"] else None
@@ -322,26 +844,31 @@ async def executor(state: ResearchState) -> dict:
     entity_context = {k: v for k, v in entity_context.items() if k in required_entities}
 
     # print("ENTITY CONTEXT", entity_context)
-    subtask_list = decompose_plan_step(step_goal, entity_context, prev_err)
+    subtask_list = await decompose_plan_step_async(
+        step_goal, entity_context, prev_err, MAX_SUBTASKS or None
+    )
     # print("SUBTASKS", subtask_list)
 
-    # Run all subtasks concurrently
-    subtask_results = await asyncio.gather(
-        *[execute_subtask_async(subtask) for subtask in subtask_list]
-    )
+    # Run all subtasks concurrently; each result comes back with the score of
+    # the page it was picked from, so there is no second scoring pass.
+    # Pages chosen by several subtasks are extracted once, in shared batches.
+    # Separate scoring calls are batched across all of the step's subtasks.
+    coordinator = ExtractCoordinator(tavily_extract_async)
+    scorer = ScoreBatcher()
 
-    quality_scores = await asyncio.gather(
-        *(
-            asyncio.to_thread(evaluate_subtask_result, subtask, result)
-            for subtask, result in zip(subtask_list, subtask_results)
-        )
-    )
+    async def run_subtask(subtask: str) -> Tuple[str, int]:
+        with call_context(subtask=subtask):
+            return await execute_subtask_scored_async(subtask, coordinator, scorer)
+
+    scored_results = await asyncio.gather(*[run_subtask(subtask) for subtask in subtask_list])
+    subtask_results = [result for result, _ in scored_results]
+    quality_scores = [score for _, score in scored_results]
 
     estimate_tasks = {}
     if state.get("estimate", False):
         for i, score in enumerate(quality_scores):
             if score <= 0.3:
-                estimate_tasks[i] = asyncio.to_thread(estimate_evidence, subtask_list[i])
+                estimate_tasks[i] = estimate_evidence_async(subtask_list[i])
 
     if estimate_tasks:
         estimated_values = await asyncio.gather(*estimate_tasks.values())
@@ -350,28 +877,50 @@ async def executor(state: ResearchState) -> dict:
             subtask_results[idx] = "ESTIMATED EVIDENCE: " + estimated
 
     # print("SUBTASK RESULTS", subtask_results)
-    new_entities = _extract_entities(state["plan"][step_idx], subtask_results)
-    new_entities = trim_entities(new_entities, limit=10)
+    new_entities = await _extract_entities_async(state["plan"][step_idx], subtask_results)
+    return subtask_results, trim_entities(new_entities, limit=10)
+
 
-    merged_entities = state.get("entities", {})
+def merge_entities(
+    merged_entities: Dict[str, List[str]], new_entities: Dict[str, List[str]]
+) -> Dict[str, List[str]]:
+    """Adds new entity values in place, skipping ones already present."""
     for entity_type, values in new_entities.items():
         merged_entities.setdefault(entity_type, [])
         merged_entities[entity_type].extend(
             v for v in values if v not in merged_entities[entity_type]
         )
+    return merged_entities
+
 
-    evidence_store = list(state.get("evidence_store", []))
+def store_step_evidence(
+    evidence_store: List[List[str]], step_idx: int, subtask_results: List[str]
+) -> List[List[str]]:
+    evidence_store = list(evidence_store)
     while len(evidence_store) <= step_idx:
         evidence_store.append([])
     evidence_store[step_idx] = subtask_results
+    return evidence_store
 
-    print("=== Executor Result ===")
-    print(
-        {
-            "evidence_store": evidence_store,
-            "entities": merged_entities,
-        }
+
+async def executor(state: ResearchState) -> dict:
+    step_idx = state["current_step_idx"]
+    events.debug("executor.start", step_idx=step_idx)
+    subtask_results, new_entities = await execute_step(state, step_idx)
+
+    merged_entities = merge_entities(state.get("entities", {}), new_entities)
+    evidence_store = store_step_evidence(state.get("evidence_store", []), step_idx, subtask_results)
+    schedule_step_digest(
+        state.get("clarified_query") or state["user_query"], state["plan"][step_idx], subtask_results
+    )
+
+    events.info(
+        "executor.result",
+        step_idx=step_idx,
+        evidence_items=len(subtask_results),
+        entity_types=len(merged_entities),
     )
+    events.debug("executor.evidence", evidence=subtask_results, entities=merged_entities)
     return {
         "evidence_store": evidence_store,
         "entities": merged_entities,
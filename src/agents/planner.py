@@ -3,6 +3,7 @@ from typing import List
 from state.research_state import ResearchState, PlanStep
 from langchain_core.messages import HumanMessage
 from utils.llm import model
+from utils import events
 
 ALLOWED_METHODS = {"search", "analysis"}
 ALLOWED_RISKS = {"low", "medium", "high"}
@@ -54,7 +55,7 @@ def _validate_plan(plan: List[dict]) -> List[PlanStep]:
 
 
 def planner(state: ResearchState) -> dict:
-    print("=== Planner Agent ===")
+    events.debug("planner.start", replan=bool(state.get("replan_request")))
     replan_request = state.get("replan_request")
 
     query = state.get("clarified_query") or state["user_query"]
@@ -124,8 +125,8 @@ def planner(state: ResearchState) -> dict:
                 f"Error: {e}"
             )
 
-        print("=== Planner Result ===")
-        print({"plan": validated_plan, "current_step_idx": 0})
+        events.info("planner.result", steps=len(validated_plan), current_step_idx=0)
+        events.debug("planner.plan", plan=validated_plan)
         return {"plan": validated_plan, "current_step_idx": 0}
 
     # SCOPED REPLANNING
@@ -221,8 +222,13 @@ def planner(state: ResearchState) -> dict:
             f for f in state.get("failed_steps", []) if f.get("step_id") in preserved_step_ids
         ]
 
-        print("=== Planner Result ===")
-        print({"plan": new_plan, "current_step_idx": k})
+        events.info(
+            "planner.result",
+            steps=len(new_plan),
+            current_step_idx=k,
+            replaced_steps=len(new_steps),
+        )
+        events.debug("planner.plan", plan=new_plan)
         return {
             "plan": new_plan,
             "current_step_idx": k,
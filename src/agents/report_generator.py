@@ -1,8 +1,32 @@
-from typing import Dict, List
+import asyncio
+import contextvars
+import os
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
 from utils.llm import get_llm, model
+from utils.cache import make_key
+from utils import events
+from utils.instrumentation import current_metrics
+from utils.rate_limiter import estimate_tokens
 from langchain_core.messages import HumanMessage
+from langgraph.config import get_stream_writer
 from state.research_state import ResearchState, Evidence, PlanStep
 
+# "map_reduce": synthesize over per-step digests; "single": one prompt over all evidence
+REPORT_MODE = os.getenv("REPORT_MODE", "map_reduce")
+# digests are merged in groups until they fit this budget
+REPORT_DIGEST_TOKEN_BUDGET = int(os.getenv("REPORT_DIGEST_TOKEN_BUDGET", 12_000))
+DIGEST_REDUCE_GROUP_SIZE = 4
+# inside a graph run, report tokens go to the "custom" stream as they are generated
+REPORT_STREAMING = os.getenv("REPORT_STREAMING", "1") != "0"
+REPORT_TOKEN_EVENT = "report_token"
+
+# step digests started in the background as executor steps complete, keyed by
+# _digest_key; one dict per run (see digest_scope), shared by the run's tasks
+_pending_digests: contextvars.ContextVar[Optional[Dict[str, asyncio.Task]]] = (
+    contextvars.ContextVar("pending_digests", default=None)
+)
+
 
 def _format_evidence_summary(
     plan: List[PlanStep],
@@ -28,6 +52,11 @@ def _format_evidence_summary(
         else:
             lines.append("    * No evidence collected for this step.")
 
+    _append_failed_steps(lines, failed_steps)
+    return "\n".join(lines)
+
+
+def _append_failed_steps(lines: List[str], failed_steps: List[Dict]) -> None:
     if failed_steps:
         lines.append("\nFAILED / INCOMPLETE STEPS")
         for f in failed_steps:
@@ -35,22 +64,157 @@ def _format_evidence_summary(
             reason = f.get("reason", "no reason provided")
             lines.append(f"- Step {step_id}: {reason}")
 
-    return "\n".join(lines)
 
+def _digest_prompt(query: str, step: PlanStep, evidence: List[str]) -> str:
+    evidence_block = "\n".join(f"* {ev.strip()}" for ev in evidence)
+    return f"""
+You are a research assistant condensing the evidence collected for one step of a research plan.
 
-def report_generator(state: ResearchState) -> dict:
-    print("=== Report Generator Agent ===")
-    query = state.get("clarified_query") or state["user_query"]
-    plan = state["plan"]
-    evidence_store = state["evidence_store"]
-    failed_steps = state["failed_steps"]
-    termination_reason = state.get("termination_reason")
+Research Question:
+{query}
+
+Plan Step:
+{step.get("goal", "[No goal defined]")}
+
+Evidence:
+{evidence_block}
+
+Write a dense digest of this evidence (at most 250 words) that keeps every fact,
+number, date, name and source needed to answer the research question. Mark
+estimated evidence as estimated. Do NOT add information that is not in the
+evidence, and do NOT answer the research question itself.
+""".strip()
+
+
+def _reduce_prompt(query: str, digests: List[str]) -> str:
+    digest_block = "\n\n".join(digests)
+    return f"""
+You are a research assistant merging evidence digests from several steps of a research plan.
+
+Research Question:
+{query}
+
+Digests:
+{digest_block}
+
+Merge these digests into one digest (at most 400 words) that keeps every fact,
+number, date, name and source needed to answer the research question. Do NOT
+add information that is not in the digests.
+""".strip()
+
+
+def _digest_key(query: str, step: PlanStep, evidence: List[str]) -> str:
+    return make_key("step_digest", query, step.get("id"), step.get("goal"), evidence)
+
+
+async def digest_step_async(query: str, step: PlanStep, evidence: List[str]) -> str:
+    """Condenses one step's evidence into a bounded digest (the map phase)."""
+    response = await model.ainvoke([HumanMessage(content=_digest_prompt(query, step, evidence))])
+    return response.content.strip()
+
+
+@contextmanager
+def digest_scope() -> Iterator[Dict[str, asyncio.Task]]:
+    """
+    Scopes background step digests to one run. Digests still pending when
+    the run ends (finished, failed or cancelled) are cancelled, so they do
+    not keep making LLM calls for a run that is gone.
+    """
+    pending: Dict[str, asyncio.Task] = {}
+    token = _pending_digests.set(pending)
+    try:
+        yield pending
+    finally:
+        _pending_digests.reset(token)
+        for task in pending.values():
+            task.cancel()
+        pending.clear()
+
+
+def schedule_step_digest(query: str, step: PlanStep, evidence: List[str]) -> None:
+    """
+    Starts the digest of a finished step in the background, so it runs in
+    parallel with later steps. No-op outside a digest_scope, outside an
+    event loop or in single mode; the report then digests the step itself.
+    """
+    pending = _pending_digests.get()
+    if pending is None or REPORT_MODE != "map_reduce" or not evidence:
+        return
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    key = _digest_key(query, step, evidence)
+    if key not in pending:
+        pending[key] = asyncio.ensure_future(digest_step_async(query, step, evidence))
+
+
+async def _collect_digest(query: str, step: PlanStep, evidence: List[str]) -> str:
+    """Uses the background digest for this evidence if there is one, else computes it."""
+    pending = _pending_digests.get()
+    task = pending.pop(_digest_key(query, step, evidence), None) if pending else None
+    if task is not None:
+        if task.done() and not task.cancelled() and task.exception() is None:
+            return task.result()
+        if not task.done() and task.get_loop() is asyncio.get_running_loop():
+            try:
+                return await task
+            except Exception:
+                pass
+    return await digest_step_async(query, step, evidence)
+
+
+async def _reduce_digests(query: str, digests: List[str]) -> List[str]:
+    """Merges digests in groups until they fit REPORT_DIGEST_TOKEN_BUDGET (the reduce phase)."""
+    while len(digests) > 1 and estimate_tokens("\n".join(digests)) > REPORT_DIGEST_TOKEN_BUDGET:
+        groups = [
+            digests[i : i + DIGEST_REDUCE_GROUP_SIZE]
+            for i in range(0, len(digests), DIGEST_REDUCE_GROUP_SIZE)
+        ]
+        merged = await asyncio.gather(
+            *(
+                model.ainvoke([HumanMessage(content=_reduce_prompt(query, group))])
+                for group in groups
+            )
+        )
+        digests = [response.content.strip() for response in merged]
+    return digests
 
-    evidence_summary = _format_evidence_summary(plan, evidence_store, failed_steps)
-    # print("=== Evidence Summary ===")
-    # print(evidence_summary)
 
-    prompt = f"""
+async def _format_digest_summary(
+    query: str,
+    plan: List[PlanStep],
+    evidence_store: List[List[str]],
+    failed_steps: List[Dict],
+) -> str:
+    """Like _format_evidence_summary, but with one bounded digest per step."""
+    steps_with_evidence = [
+        (idx, step)
+        for idx, step in enumerate(plan)
+        if idx < len(evidence_store) and evidence_store[idx]
+    ]
+    digests = await asyncio.gather(
+        *(_collect_digest(query, step, evidence_store[idx]) for idx, step in steps_with_evidence)
+    )
+    by_idx = dict(zip((idx for idx, _ in steps_with_evidence), digests))
+
+    blocks = []
+    for idx, step in enumerate(plan):
+        step_id = step.get("id", f"step-{idx}")
+        step_goal = step.get("goal", "[No goal defined]")
+        digest = by_idx.get(idx, "No evidence collected for this step.")
+        blocks.append(f"- Step {step_id}: {step_goal}\n{digest}")
+
+    if estimate_tokens("\n\n".join(blocks)) > REPORT_DIGEST_TOKEN_BUDGET:
+        blocks = await _reduce_digests(query, blocks)
+
+    lines = ["EVIDENCE DIGESTS BY PLAN STEP:\n", "\n\n".join(blocks)]
+    _append_failed_steps(lines, failed_steps)
+    return "\n".join(lines)
+
+
+def _report_prompt(query: str, evidence_summary: str, termination_reason: Optional[str]) -> str:
+    return f"""
     You are a research assistant writing a final report.
 
     Your task is to answer the following research question using ONLY
@@ -80,8 +244,77 @@ def report_generator(state: ResearchState) -> dict:
     Do NOT mention internal agents, steps, or system details.
     """.strip()
 
+
+def report_generator(state: ResearchState) -> dict:
+    events.debug("report_generator.start", mode="single")
+    query = state.get("clarified_query") or state["user_query"]
+    plan = state["plan"]
+    evidence_store = state["evidence_store"]
+    failed_steps = state["failed_steps"]
+    termination_reason = state.get("termination_reason")
+
+    evidence_summary = _format_evidence_summary(plan, evidence_store, failed_steps)
+
+    prompt = _report_prompt(query, evidence_summary, termination_reason)
     final_report = model.invoke([HumanMessage(content=prompt)]).content.strip()
 
-    print("=== Report Generator Result ===")
-    print({"final_report": final_report})
-    return {"final_report": final_report}
+    events.info("report_generator.result", report_chars=len(final_report))
+    events.debug("report_generator.report", final_report=final_report)
+    # the report is the last node, so this covers every call of the run
+    return {"final_report": final_report, "metrics": current_metrics().summary()}
+
+
+def _report_stream_writer():
+    """The graph's custom stream writer, or None outside a graph run or with streaming off."""
+    if not REPORT_STREAMING:
+        return None
+    try:
+        return get_stream_writer()
+    except (RuntimeError, KeyError):
+        return None
+
+
+async def _write_report_async(prompt: str) -> str:
+    """
+    Generates the report. Inside a graph run each chunk is also written to
+    the stream as {"event": REPORT_TOKEN_EVENT, "text": ...}, so callers
+    streaming with stream_mode="custom" see the report as it is written.
+    """
+    messages = [HumanMessage(content=prompt)]
+    writer = _report_stream_writer()
+    if writer is None:
+        response = await model.ainvoke(messages)
+        return response.content.strip()
+
+    parts = []
+    async for chunk in model.astream(messages):
+        if isinstance(chunk.content, str) and chunk.content:
+            parts.append(chunk.content)
+            writer({"event": REPORT_TOKEN_EVENT, "text": chunk.content})
+    return "".join(parts).strip()
+
+
+async def report_generator_async(state: ResearchState) -> dict:
+    """
+    Graph node for the report. In map_reduce mode the final synthesis runs
+    over per-step digests, most of which were already produced in the
+    background while later steps executed, so the prompt stays bounded.
+    """
+    events.debug("report_generator.start", mode=REPORT_MODE)
+    query = state.get("clarified_query") or state["user_query"]
+    if REPORT_MODE == "map_reduce":
+        evidence_summary = await _format_digest_summary(
+            query, state["plan"], state["evidence_store"], state["failed_steps"]
+        )
+    else:
+        evidence_summary = _format_evidence_summary(
+            state["plan"], state["evidence_store"], state["failed_steps"]
+        )
+
+    prompt = _report_prompt(query, evidence_summary, state.get("termination_reason"))
+    final_report = await _write_report_async(prompt)
+
+    events.info("report_generator.result", report_chars=len(final_report))
+    events.debug("report_generator.report", final_report=final_report)
+    # the report is the last node, so this covers every call of the run
+    return {"final_report": final_report, "metrics": current_metrics().summary()}
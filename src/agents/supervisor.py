@@ -1,8 +1,11 @@
 from __future__ import annotations
 import json
+import os
 from typing import Any, Dict, List, Optional, Tuple
 from collections import Counter, defaultdict
 
+from utils.instrumentation import call_context
+from utils import events
 from utils.llm import get_llm, model
 from langchain_core.messages import HumanMessage
 from state.research_state import Evidence, ResearchState, PlanStep
@@ -19,6 +22,16 @@ ALLOWED_ACTIONS = {A_EXECUTE, A_RETRY, A_SKIP, A_REPLAN, A_TERMINATE}
 # can move to config later
 MAX_RETRIES_PER_STEP = 2
 
+# "llm": ask the LLM every time; "hybrid": only in ambiguous states;
+# "deterministic": never ask, always use _fallback_policy
+POLICY_LLM = "llm"
+POLICY_HYBRID = "hybrid"
+POLICY_DETERMINISTIC = "deterministic"
+SUPERVISOR_POLICY = os.getenv("SUPERVISOR_POLICY", POLICY_HYBRID)
+
+# process-wide decision counters: llm_decisions, llm_decisions_avoided
+supervisor_stats: Counter = Counter()
+
 
 # helpers
 def _get_query(state: ResearchState) -> str:
@@ -147,6 +160,21 @@ def _fallback_policy(state, max_retries_per_step: int) -> Tuple[str, str]:
     return (A_EXECUTE, "No failures for current step")
 
 
+def _needs_llm_decision(state: ResearchState, max_retries_per_step: int) -> bool:
+    """
+    True only when the deterministic policy has a real choice to make: the
+    current step has failures and a retry or replan budget is left.
+    Otherwise the answer is forced (EXECUTE, TERMINATE or a last-resort SKIP).
+    """
+    if _plan_finished(state) or _get_current_step(state) is None:
+        return False
+    if not _current_step_failures(state):
+        return False
+    retry_left = not _retry_budget_exhausted(state, max_retries_per_step)
+    replan_left = not _replan_budget_exhausted(state)
+    return retry_left or replan_left
+
+
 def _llm_decide_action(state: ResearchState, max_retries_per_step: int) -> str:
     """
     Ask the LLM to return ONLY one action token from ALLOWED_ACTIONS.
@@ -252,7 +280,7 @@ def expand_goal_with_entities(
     context_blocks = []
 
     for entity_type in required_entities:
-        items = entities[entity_type]
+        items = entities.get(entity_type, [])
 
         block = f"Context for entity type {entity_type}:\n"
         for i, item in enumerate(items, start=1):
@@ -268,18 +296,8 @@ def expand_goal_with_entities(
     return expanded_goal
 
 
-def supervisor(state: ResearchState) -> dict:
-    print("=== Supervisor Agent ===")
-    """
-    Returns a dict update containing at minimum:
-      - supervisor_decision: one of ALLOWED_ACTIONS
-
-    Also updates relevant control state:
-      - replan_count (increment on REPLAN)
-      - current_step_idx (increment on SKIP)
-      - termination_reason (set on TERMINATE)
-    """
-    max_retries_per_step = int(
+def _max_retries_per_step(state: ResearchState) -> int:
+    return int(
         state.get(
             "max_retries_per_step",
             MAX_RETRIES_PER_STEP,
@@ -287,21 +305,29 @@ def supervisor(state: ResearchState) -> dict:
         or MAX_RETRIES_PER_STEP
     )
 
-    # deterministic guards
-    plan = state.get("plan") or []
-    if not isinstance(plan, list) or len(plan) == 0:
-        return {
-            "supervisor_decision": A_TERMINATE,
-            "termination_reason": "No plan available to execute",
-        }
 
-    if _plan_finished(state):
-        # if plan is finished, terminate gracefully.
-        return {"supervisor_decision": A_TERMINATE, "termination_reason": "Plan completed"}
+def decide_action(state: ResearchState, max_retries_per_step: int) -> str:
+    """
+    Picks the action for the current step: LLM decision, validated and
+    corrected by the deterministic fallback policy and hard budget guards.
+    Depending on the policy mode, the LLM is skipped when the state is not
+    ambiguous and the deterministic answer is used directly.
+    """
+    policy = state.get("supervisor_policy") or SUPERVISOR_POLICY
+    if policy == POLICY_DETERMINISTIC or (
+        policy == POLICY_HYBRID and not _needs_llm_decision(state, max_retries_per_step)
+    ):
+        supervisor_stats["llm_decisions_avoided"] += 1
+        action, _ = _fallback_policy(state, max_retries_per_step)
+        return action
+
+    supervisor_stats["llm_decisions"] += 1
 
     # LLM-based decision (with validation + fallback)
+    step = _get_current_step(state)
     try:
-        action = _llm_decide_action(state, max_retries_per_step)
+        with call_context(step_id=step["id"] if step else None):
+            action = _llm_decide_action(state, max_retries_per_step)
     except Exception:
         # if the LLM call fails for any reason, fall back deterministically
         action, _ = _fallback_policy(state, max_retries_per_step)
@@ -318,6 +344,36 @@ def supervisor(state: ResearchState) -> dict:
     if action == A_RETRY and _retry_budget_exhausted(state, max_retries_per_step):
         action, _ = _fallback_policy(state, max_retries_per_step)
 
+    return action
+
+
+def supervisor(state: ResearchState) -> dict:
+    """
+    Returns a dict update containing at minimum:
+      - supervisor_decision: one of ALLOWED_ACTIONS
+
+    Also updates relevant control state:
+      - replan_count (increment on REPLAN)
+      - current_step_idx (increment on SKIP)
+      - termination_reason (set on TERMINATE)
+    """
+    events.debug("supervisor.start", current_step_idx=state.get("current_step_idx"))
+    max_retries_per_step = _max_retries_per_step(state)
+
+    # deterministic guards
+    plan = state.get("plan") or []
+    if not isinstance(plan, list) or len(plan) == 0:
+        return {
+            "supervisor_decision": A_TERMINATE,
+            "termination_reason": "No plan available to execute",
+        }
+
+    if _plan_finished(state):
+        # if plan is finished, terminate gracefully.
+        return {"supervisor_decision": A_TERMINATE, "termination_reason": "Plan completed"}
+
+    action = decide_action(state, max_retries_per_step)
+
     # apply state updates based on the chosen action
     updates: Dict[str, object] = {"supervisor_decision": action}
 
@@ -352,6 +408,12 @@ def supervisor(state: ResearchState) -> dict:
     updates["plan"] = list(state["plan"])  # shallow copy
     updates["plan"][state["current_step_idx"]]["expanded_goal"] = expanded_goal
 
-    print("=== Supervisor Result ===")
-    print(updates)
+    events.info(
+        "supervisor.result",
+        decision=action,
+        current_step_idx=state.get("current_step_idx"),
+        replan_request=updates.get("replan_request"),
+        termination_reason=updates.get("termination_reason"),
+    )
+    events.debug("supervisor.stats", decisions=dict(supervisor_stats), expanded_goal=expanded_goal)
     return updates
@@ -0,0 +1,89 @@
+"""
+Cold-start import cost of the main entry modules, each measured in a fresh
+interpreter without API keys. Run from src/:
+
+    python -m benchmarks.import_time --repeat 5 --json import_time.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Optional
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULES = [
+    "utils.llm",
+    "utils.tavily_wrapper",
+    "agents.executor",
+    "graph.main_graph",
+    "server",
+]
+# provider SDKs that should only be imported when a client is first built
+PROVIDER_MODULES = ["langchain_openai", "langchain.chat_models", "openai", "tavily", "dotenv"]
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - start
+print(json.dumps({{"seconds": seconds, "loaded": [m for m in {providers!r} if m in sys.modules]}}))
+"""
+
+
+def _probe_env() -> Dict[str, str]:
+    env = {k: v for k, v in os.environ.items() if not k.endswith("_API_KEY")}
+    env["PYTHONPATH"] = SRC_DIR + os.pathsep + env.get("PYTHONPATH", "")
+    return env
+
+
+def measure_import(module: str) -> Dict:
+    """Imports `module` in a fresh interpreter; returns its import time and loaded provider SDKs."""
+    result = subprocess.run(
+        [sys.executable, "-c", _PROBE.format(module=module, providers=PROVIDER_MODULES)],
+        cwd=SRC_DIR,
+        env=_probe_env(),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def run(modules: List[str], repeat: int = 3) -> List[Dict]:
+    results = []
+    for module in modules:
+        probes = [measure_import(module) for _ in range(repeat)]
+        times = sorted(p["seconds"] for p in probes)
+        results.append(
+            {
+                "module": module,
+                "seconds_median": round(statistics.median(times), 4),
+                "seconds_min": round(times[0], 4),
+                "provider_modules_loaded": probes[-1]["loaded"],
+            }
+        )
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Measure cold-start import time.")
+    parser.add_argument("modules", nargs="*", default=MODULES)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", metavar="PATH", help="also write the results as JSON")
+    args = parser.parse_args(argv)
+
+    results = run(args.modules, args.repeat)
+    for r in results:
+        loaded = ", ".join(r["provider_modules_loaded"]) or "none"
+        print(f"{r['module']:<24} {r['seconds_median'] * 1000:8.1f} ms  provider SDKs: {loaded}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,334 @@
+import ast
+import asyncio
+import json
+import os
+import random
+import re
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from typing import AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
+
+from langchain_core.messages import AIMessage, AIMessageChunk
+
+from utils.rate_limiter import estimate_tokens
+
+DATA_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "end_to_end_data"
+)
+# recorded final states of real runs, replayed by the benchmark
+SCENARIOS = {
+    "doj": "end_to_end_result_DOJ.txt",
+    "hiking": "end_to_end_result_hiking.txt",
+    "temporal_drift": "end_to_end_result_temporal_drift.txt",
+}
+
+# subtask queries carry their (step id, index) so every backend can find the recorded evidence
+_SUBTASK_RE = re.compile(r"replay-(\S+?)-(\d+)\b")
+_ENTITY_TYPES_RE = re.compile(r"ENTITY TYPES TO EXTRACT:\n(\[.*?\])\n")
+# characters per chunk when a replayed answer is streamed
+STREAM_CHUNK_CHARS = 40
+
+
+def load_recorded_run(scenario: str) -> Dict:
+    """Parses a recorded final state (the pprint output of run_graph.py)."""
+    with open(os.path.join(DATA_DIR, SCENARIOS[scenario]), encoding="utf-8") as f:
+        text = f.read()
+    if text.startswith("'Final State:'"):
+        text = text.split("\n", 1)[1]
+    return ast.literal_eval(text)
+
+
+class LatencyModel:
+    """
+    Samples simulated call latencies. Specs look like "constant:0.2",
+    "uniform:0.1:0.5" (low, high) or "lognormal:0.8:0.5" (median, sigma).
+    """
+
+    def __init__(self, spec: str = "constant:0", seed: Optional[int] = None):
+        kind, *params = spec.split(":")
+        if kind not in ("constant", "uniform", "lognormal"):
+            raise ValueError(f"Unknown latency distribution: {kind}")
+        self.spec = spec
+        self.kind = kind
+        self.params = [float(p) for p in params] or [0.0]
+        self.random = random.Random(seed)
+
+    def sample(self) -> float:
+        if self.kind == "uniform":
+            return self.random.uniform(*self.params[:2])
+        if self.kind == "lognormal":
+            median, sigma = (self.params + [0.5])[:2]
+            return median * self.random.lognormvariate(0, sigma) if median > 0 else 0.0
+        return self.params[0]
+
+
+class ConcurrencyTracker:
+    """Peak and time-weighted average number of in-flight calls to one backend."""
+
+    def __init__(self):
+        self.in_flight = 0
+        self.peak = 0
+        self.calls = 0
+        self.busy_seconds = 0.0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def track(self) -> Iterator[None]:
+        with self._lock:
+            self.calls += 1
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+                self.busy_seconds += time.perf_counter() - start
+
+    def stats(self, wall_seconds: float) -> Dict[str, float]:
+        return {
+            "calls": self.calls,
+            "peak_concurrency": self.peak,
+            "avg_concurrency": round(self.busy_seconds / wall_seconds, 2) if wall_seconds else 0.0,
+        }
+
+
+def _subtask_ref(text: str) -> Optional[Tuple[str, int]]:
+    match = _SUBTASK_RE.search(text)
+    return (match.group(1), int(match.group(2))) if match else None
+
+
+class ReplayLLM:
+    """
+    Chat model that answers each agent's prompt from a recorded run: the
+    recorded plan, one subtask per recorded evidence item, the recorded
+    evidence as page extractions, the recorded entities and final report.
+    """
+
+    def __init__(self, run: Dict, latency: LatencyModel):
+        self.run = run
+        self.latency = latency
+        self.tracker = ConcurrencyTracker()
+        self.steps = {step["id"]: idx for idx, step in enumerate(run["plan"])}
+        self.routes: List[Tuple[str, Callable[[str], str]]] = [
+            ("evaluating the clarity", lambda p: str(run.get("clarity_score") or 1.0)),
+            ("research planning agent", self._plan),
+            ("SUPERVISOR in a multi-agent", lambda p: "EXECUTE"),
+            ("decompose the following high-level research step", self._subtasks),
+            ("most relevant URLs", lambda p: "1,2"),
+            ("### Scoring Instructions", self._extract_and_score),
+            ("information extraction agent", self._evidence),
+            ("Evaluate the relevance and quality of each", self._batch_scores),
+            ("Evaluate the relevance and quality", lambda p: "8"),
+            ("ENTITY TYPES TO EXTRACT", self._entities),
+            ("plausible and concise summary", lambda p: "Estimated value."),
+            ("condensing the evidence", lambda p: p.split("Evidence:\n", 1)[-1][:1500]),
+            ("merging evidence digests", lambda p: p.split("Digests:\n", 1)[-1][:2500]),
+            ("writing a final report", lambda p: run.get("final_report") or ""),
+        ]
+
+    def _plan(self, prompt: str) -> str:
+        keys = ("id", "goal", "method", "risk", "produces_entities", "requires_entities")
+        return json.dumps([{k: step.get(k) for k in keys} for step in self.run["plan"]])
+
+    def _subtasks(self, prompt: str) -> str:
+        # the step with the longest goal contained in the prompt (goals can be prefixes)
+        matches = [s for s in self.run["plan"] if s["goal"] in prompt]
+        if not matches:
+            return "[]"
+        step = max(matches, key=lambda s: len(s["goal"]))
+        evidence = self.run["evidence_store"][self.steps[step["id"]]]
+        return json.dumps(
+            [
+                {"query": f"replay-{step['id']}-{i} {step['goal'][:200]}", "priority": 1}
+                for i in range(len(evidence))
+            ]
+        )
+
+    def _evidence(self, prompt: str) -> str:
+        ref = _subtask_ref(prompt)
+        if ref is None or ref[0] not in self.steps:
+            return "No relevant content found"
+        evidence = self.run["evidence_store"][self.steps[ref[0]]]
+        return evidence[ref[1]] if ref[1] < len(evidence) else "No relevant content found"
+
+    def _extract_and_score(self, prompt: str) -> str:
+        return json.dumps({"extracted": self._evidence(prompt), "score": 8})
+
+    def _batch_scores(self, prompt: str) -> str:
+        return json.dumps([8] * prompt.count("### Candidate"))
+
+    def _entities(self, prompt: str) -> str:
+        match = _ENTITY_TYPES_RE.search(prompt)
+        expected = ast.literal_eval(match.group(1)) if match else []
+        entities = self.run.get("entities") or {}
+        return json.dumps({entity: entities.get(entity, []) for entity in expected})
+
+    def _answer(self, prompt) -> AIMessage:
+        text = prompt if isinstance(prompt, str) else "\n".join(str(m.content) for m in prompt)
+        content = next((fn(text) for marker, fn in self.routes if marker in text), "")
+        usage = {
+            "input_tokens": estimate_tokens(text),
+            "output_tokens": estimate_tokens(content),
+            "total_tokens": estimate_tokens(text) + estimate_tokens(content),
+        }
+        return AIMessage(content=content, usage_metadata=usage)
+
+    def invoke(self, prompt, *args, **kwargs) -> AIMessage:
+        with self.tracker.track():
+            time.sleep(self.latency.sample())
+            return self._answer(prompt)
+
+    async def ainvoke(self, prompt, *args, **kwargs) -> AIMessage:
+        with self.tracker.track():
+            await asyncio.sleep(self.latency.sample())
+            return self._answer(prompt)
+
+    async def astream(self, prompt, *args, **kwargs) -> AsyncIterator[AIMessageChunk]:
+        """Like ainvoke, with half the latency before the first chunk and half spread over the rest."""
+        with self.tracker.track():
+            latency = self.latency.sample()
+            answer = self._answer(prompt)
+            text = answer.content
+            chunks = [
+                text[i : i + STREAM_CHUNK_CHARS] for i in range(0, len(text), STREAM_CHUNK_CHARS)
+            ] or [""]
+            await asyncio.sleep(latency / 2)
+            for i, chunk in enumerate(chunks):
+                if i:
+                    await asyncio.sleep(latency / 2 / len(chunks))
+                last = i == len(chunks) - 1
+                yield AIMessageChunk(
+                    content=chunk, usage_metadata=answer.usage_metadata if last else None
+                )
+
+
+class ReplayTavily:
+    """
+    Tavily backend serving synthetic search results for replay subtasks and
+    pages that embed the recorded evidence in `page_chars` of filler text,
+    so passage selection and extraction batching see realistic inputs.
+    Serves both the sync client API and the async HTTP endpoints.
+    """
+
+    def __init__(
+        self,
+        run: Dict,
+        latency: LatencyModel,
+        results_per_search: int = 5,
+        page_chars: int = 20_000,
+    ):
+        self.run = run
+        self.latency = latency
+        self.results_per_search = results_per_search
+        self.page_chars = page_chars
+        self.tracker = ConcurrencyTracker()
+        self.steps = {step["id"]: idx for idx, step in enumerate(run["plan"])}
+        all_evidence = [ev for step_evidence in run["evidence_store"] for ev in step_evidence]
+        self.filler = "\n\n".join(all_evidence) or "filler text"
+
+    def _search(self, query: str) -> Dict:
+        ref = _subtask_ref(query)
+        slug = f"replay-{ref[0]}-{ref[1]}" if ref else "none"
+        return {
+            "query": query,
+            "results": [
+                {
+                    "url": f"https://replay{k}.example.org/{slug}",
+                    "title": query[:120],
+                    "content": query,
+                    "score": 1.0 - k / 10,
+                }
+                for k in range(self.results_per_search)
+            ],
+        }
+
+    def _page(self, url: str) -> Dict:
+        ref = _subtask_ref(url)
+        evidence = ""
+        if ref and ref[0] in self.steps:
+            step_evidence = self.run["evidence_store"][self.steps[ref[0]]]
+            evidence = step_evidence[ref[1]] if ref[1] < len(step_evidence) else ""
+        filler = (self.filler * (self.page_chars // len(self.filler) + 1))[: self.page_chars]
+        return {"url": url, "raw_content": f"{evidence}\n\n{filler}"}
+
+    def _extract(self, urls: List[str]) -> Dict:
+        return {"results": [self._page(url) for url in urls], "failed_results": []}
+
+    # sync TavilyClient API
+    def search(self, query: str, **kwargs) -> Dict:
+        with self.tracker.track():
+            time.sleep(self.latency.sample())
+            return self._search(query)
+
+    def extract(self, urls, **kwargs) -> Dict:
+        with self.tracker.track():
+            time.sleep(self.latency.sample())
+            return self._extract([urls] if isinstance(urls, str) else list(urls))
+
+    # async HTTP endpoints (replaces tavily_wrapper._post_once_async)
+    async def post(self, path: str, payload: Dict) -> Dict:
+        with self.tracker.track():
+            await asyncio.sleep(self.latency.sample())
+            if path == "/search":
+                return self._search(payload["query"])
+            return self._extract(payload["urls"])
+
+
+def _patch(stack: ExitStack, obj, attr: str, value) -> None:
+    original = getattr(obj, attr)
+    setattr(obj, attr, value)
+    stack.callback(setattr, obj, attr, original)
+
+
+def _inject_provider(stack: ExitStack, name: str, client) -> None:
+    """Injects a provider client, restoring (or dropping) the previous one on exit."""
+    from utils.providers import registry
+
+    original = registry.instances.get(name)
+    registry.instances[name] = client
+    if original is None:
+        stack.callback(registry.instances.pop, name, None)
+    else:
+        stack.callback(registry.instances.__setitem__, name, original)
+
+
+@contextmanager
+def replay_backends(
+    run: Dict,
+    llm_latency: LatencyModel,
+    tavily_latency: LatencyModel,
+    use_cache: bool = False,
+    rate_limits: bool = False,
+) -> Iterator[Tuple[ReplayLLM, ReplayTavily]]:
+    """
+    Swaps the LLM and Tavily backends for replay fakes. Everything above the
+    provider boundary (caches, rate limiters, single-flight, instrumentation,
+    extract batching) stays real. Caches and rate limits are off by default
+    so every run measures the same amount of work.
+    """
+    import agents.clarifier as clarifier_mod
+    import agents.supervisor as supervisor_mod
+    import utils.llm as llm_mod
+    import utils.tavily_wrapper as tavily_mod
+    from utils.rate_limiter import TokenBucket, limiters
+
+    llm = ReplayLLM(run, llm_latency)
+    tavily = ReplayTavily(run, tavily_latency)
+    with ExitStack() as stack:
+        _inject_provider(stack, llm_mod.model.provider, llm)
+        replay_model = llm_mod.model
+        for mod in (supervisor_mod, clarifier_mod):
+            _patch(stack, mod, "get_llm", lambda *args, **kwargs: replay_model)
+        _inject_provider(stack, "tavily", tavily)
+        _patch(stack, tavily_mod, "_post_once_async", tavily.post)
+        if not use_cache:
+            _patch(stack, llm_mod.model, "cache", None)
+            _patch(stack, tavily_mod, "TAVILY_CACHE_ENABLED", False)
+        if not rate_limits:
+            for limiter in limiters.values():
+                _patch(stack, limiter, "requests", TokenBucket(1e12))
+                _patch(stack, limiter, "tokens", None)
+        yield llm, tavily
@@ -0,0 +1,131 @@
+"""
+Offline end-to-end benchmark: replays recorded runs through the real graph
+with fake LLM and Tavily backends. Run from src/:
+
+    python -m benchmarks.run --scenario hiking --llm-latency lognormal:0.5:0.6
+"""
+
+import argparse
+import asyncio
+import json
+import time
+import tracemalloc
+from typing import Dict, List, Optional
+
+from agents.report_generator import digest_scope
+from benchmarks.replay import SCENARIOS, LatencyModel, load_recorded_run, replay_backends
+from graph.main_graph import build_graph
+from state.research_state import new_research_state
+from utils.events import configure_events
+from utils.instrumentation import collect_metrics
+
+
+async def run_scenario(
+    scenario: str,
+    llm_latency: str = "constant:0",
+    tavily_latency: str = "constant:0",
+    parallel_steps: bool = False,
+    seed: Optional[int] = 0,
+    use_cache: bool = False,
+    rate_limits: bool = False,
+) -> Dict:
+    """Runs one recorded scenario through the graph and returns its measurements."""
+    run = load_recorded_run(scenario)
+    graph = build_graph(parallel_steps=parallel_steps)
+
+    with replay_backends(
+        run,
+        LatencyModel(llm_latency, seed),
+        LatencyModel(tavily_latency, seed),
+        use_cache=use_cache,
+        rate_limits=rate_limits,
+    ) as (llm, tavily), collect_metrics() as collector, digest_scope():
+        state = new_research_state(run["user_query"], max_replans=run.get("max_replans", 3))
+        tracemalloc.start()
+        start = time.perf_counter()
+        final_state = await graph.ainvoke(state, {"recursion_limit": 200})
+        wall_seconds = time.perf_counter() - start
+        _, peak_bytes = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    summary = collector.summary()
+    return {
+        "scenario": scenario,
+        "parallel_steps": parallel_steps,
+        "llm_latency": llm_latency,
+        "tavily_latency": tavily_latency,
+        "wall_seconds": round(wall_seconds, 3),
+        "peak_memory_mb": round(peak_bytes / 2**20, 2),
+        "llm": llm.tracker.stats(wall_seconds),
+        "tavily": tavily.tracker.stats(wall_seconds),
+        "calls_by_function": {
+            label: group["calls"] for label, group in sorted(summary["by_caller"].items())
+        },
+        "prompt_tokens": summary["total"]["prompt_tokens"],
+        "completion_tokens": summary["total"]["completion_tokens"],
+        "steps_completed": final_state.get("current_step_idx"),
+        "report_chars": len(final_state.get("final_report") or ""),
+    }
+
+
+def _print_result(result: Dict) -> None:
+    print(
+        f"\n== {result['scenario']} (parallel_steps={result['parallel_steps']}) "
+        f"llm={result['llm_latency']} tavily={result['tavily_latency']}"
+    )
+    print(f"wall time        {result['wall_seconds']:.3f} s")
+    print(f"peak memory      {result['peak_memory_mb']:.2f} MiB")
+    for backend in ("llm", "tavily"):
+        stats = result[backend]
+        print(
+            f"{backend:<16} {stats['calls']} calls, peak concurrency {stats['peak_concurrency']}, "
+            f"avg concurrency {stats['avg_concurrency']}"
+        )
+    print("calls by function:")
+    for label, calls in result["calls_by_function"].items():
+        print(f"  {label:<48} {calls}")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Replay recorded runs with fake backends.")
+    parser.add_argument("--scenario", choices=[*SCENARIOS, "all"], default="all")
+    parser.add_argument("--llm-latency", default="lognormal:0.5:0.6", help="e.g. constant:0.2")
+    parser.add_argument("--tavily-latency", default="lognormal:0.8:0.4")
+    parser.add_argument("--parallel-steps", action="store_true")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--use-cache", action="store_true", help="keep the LLM/Tavily caches on")
+    parser.add_argument("--rate-limits", action="store_true", help="keep provider rate limits")
+    parser.add_argument("--json", metavar="PATH", help="also write all results as JSON")
+    parser.add_argument(
+        "--log-level", default="OFF", help="agent event level on stderr, e.g. INFO"
+    )
+    args = parser.parse_args(argv)
+    # agent events would interleave with the results
+    configure_events(args.log_level)
+
+    scenarios = list(SCENARIOS) if args.scenario == "all" else [args.scenario]
+    results = []
+    for scenario in scenarios:
+        for i in range(args.repeat):
+            result = asyncio.run(
+                run_scenario(
+                    scenario,
+                    args.llm_latency,
+                    args.tavily_latency,
+                    parallel_steps=args.parallel_steps,
+                    seed=args.seed + i,
+                    use_cache=args.use_cache,
+                    rate_limits=args.rate_limits,
+                )
+            )
+            _print_result(result)
+            results.append(result)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
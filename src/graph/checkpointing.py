@@ -0,0 +1,124 @@
+import os
+import uuid
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Optional
+
+from agents.report_generator import REPORT_TOKEN_EVENT, digest_scope
+from graph.main_graph import build_graph
+from state.research_state import ResearchState
+from utils import events
+from utils.cache import DEFAULT_CACHE_DIR
+from utils.instrumentation import collect_metrics
+
+CHECKPOINT_PATH = os.getenv(
+    "CHECKPOINT_PATH", os.path.join(DEFAULT_CACHE_DIR, "checkpoints.sqlite")
+)
+
+
+@asynccontextmanager
+async def open_checkpointer(path: str = CHECKPOINT_PATH) -> AsyncIterator[object]:
+    """SQLite-backed LangGraph checkpointer, persisted across processes."""
+    # a required dependency (every run_graph.py run is checkpointed), imported on
+    # first use so importing the graph stays cheap
+    from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    async with AsyncSqliteSaver.from_conn_string(path) as saver:
+        yield saver
+
+
+def graph_metadata(parallel_steps: bool) -> dict:
+    """Checkpoint metadata recording the graph shape, so a resume rebuilds the same graph."""
+    return {"parallel_steps": parallel_steps}
+
+
+def _config(thread_id: str, parallel_steps: Optional[bool] = None) -> dict:
+    config: dict = {"configurable": {"thread_id": thread_id}}
+    if parallel_steps is not None:
+        config["metadata"] = graph_metadata(parallel_steps)
+    return config
+
+
+async def _saved_parallel_steps(saver, thread_id: str) -> Optional[bool]:
+    """The graph shape a thread was started with (None for checkpoints that predate it)."""
+    checkpoint = await saver.aget_tuple(_config(thread_id))
+    if checkpoint is None:
+        raise ValueError(f"No checkpoint found for thread {thread_id}")
+    return (checkpoint.metadata or {}).get("parallel_steps")
+
+
+def new_thread_id() -> str:
+    return uuid.uuid4().hex
+
+
+async def _invoke(
+    graph, graph_input, config: dict, on_report_token: Optional[Callable[[str], None]]
+) -> dict:
+    """graph.ainvoke, or a stream that hands report tokens to on_report_token as they arrive."""
+    with digest_scope():
+        if on_report_token is None:
+            return await graph.ainvoke(graph_input, config)
+        final_state = {}
+        stream = graph.astream(graph_input, config, stream_mode=["custom", "values"])
+        async for mode, chunk in stream:
+            if mode == "values":
+                final_state = chunk
+            elif isinstance(chunk, dict) and chunk.get("event") == REPORT_TOKEN_EVENT:
+                on_report_token(chunk["text"])
+        return final_state
+
+
+async def run_with_checkpoints(
+    initial_state: ResearchState,
+    thread_id: Optional[str] = None,
+    path: str = CHECKPOINT_PATH,
+    parallel_steps: bool = False,
+    on_report_token: Optional[Callable[[str], None]] = None,
+) -> dict:
+    """
+    Runs the graph with a checkpoint written after every node, so the run
+    can be resumed under `thread_id` if it crashes or times out. The calls
+    of this run are instrumented separately from any other run in the process.
+    on_report_token, if given, receives the final report as it is generated.
+    """
+    thread_id = thread_id or new_thread_id()
+    events.info("run.start", thread_id=thread_id)
+    async with open_checkpointer(path) as saver:
+        graph = build_graph(parallel_steps=parallel_steps, checkpointer=saver)
+        with collect_metrics():
+            config = _config(thread_id, parallel_steps)
+            return await _invoke(graph, initial_state, config, on_report_token)
+
+
+async def resume_run(
+    thread_id: str,
+    path: str = CHECKPOINT_PATH,
+    parallel_steps: Optional[bool] = None,
+    on_report_token: Optional[Callable[[str], None]] = None,
+) -> dict:
+    """
+    Continues a checkpointed run from the last completed node. Nodes that
+    already finished (and the LLM/search calls they paid for) are not rerun,
+    so the metrics of the resumed run only cover the calls made after resuming.
+    The graph is rebuilt with the parallel_steps setting saved with the
+    thread; passing a different one raises ValueError.
+    """
+    async with open_checkpointer(path) as saver:
+        saved = await _saved_parallel_steps(saver, thread_id)
+        if parallel_steps is None:
+            parallel_steps = bool(saved)
+        elif saved is not None and saved != parallel_steps:
+            raise ValueError(
+                f"Thread {thread_id} was started with parallel_steps={saved}; "
+                f"it cannot be resumed with parallel_steps={parallel_steps}"
+            )
+        graph = build_graph(parallel_steps=parallel_steps, checkpointer=saver)
+        config = _config(thread_id, parallel_steps)
+        snapshot = await graph.aget_state(config)
+        if not snapshot.values:
+            raise ValueError(f"No checkpoint found for thread {thread_id}")
+        if not snapshot.next:
+            # the run already reached END
+            return snapshot.values
+        with collect_metrics():
+            return await _invoke(graph, None, config, on_report_token)
@@ -6,18 +6,28 @@ from agents.clarifier import clarifier
 from agents.planner import planner
 from agents.supervisor import supervisor
 from agents.executor import executor
-from agents.report_generator import report_generator
+from agents.dag_executor import dag_executor
+from agents.report_generator import report_generator_async
 
 
-def build_graph():
+def build_graph(parallel_steps: bool = False, checkpointer=None):
+    """
+    Builds the research graph. With parallel_steps, EXECUTE runs all
+    remaining plan steps as a dependency DAG instead of one step at a time.
+    A checkpointer (see graph/checkpointing.py) makes runs resumable.
+    """
     graph = StateGraph(ResearchState)
+    execute_node = "dag_executor" if parallel_steps else "executor"
 
     graph.add_node("clarity_scorer", clarity_scorer)
     graph.add_node("clarifier", clarifier)
     graph.add_node("planner", planner)
     graph.add_node("supervisor", supervisor)
-    graph.add_node("executor", executor)
-    graph.add_node("report_generator", report_generator)
+    if parallel_steps:
+        graph.add_node("dag_executor", dag_executor)
+    else:
+        graph.add_node("executor", executor)
+    graph.add_node("report_generator", report_generator_async)
 
     graph.set_entry_point("clarity_scorer")
 
@@ -33,13 +43,13 @@ def build_graph():
         "supervisor",
         lambda s: s["supervisor_decision"],
         {
-            "EXECUTE": "executor",
+            "EXECUTE": execute_node,
             "REPLAN": "planner",
             "TERMINATE": "report_generator",
         },
     )
 
-    graph.add_edge("executor", "supervisor")
+    graph.add_edge(execute_node, "supervisor")
     graph.add_edge("report_generator", END)
 
-    return graph.compile()
+    return graph.compile(checkpointer=checkpointer)
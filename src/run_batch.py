@@ -0,0 +1,206 @@
+"""
+Runs many research queries concurrently in one process. Run from src/:
+
+    python run_batch.py queries.jsonl results.jsonl --concurrency 8
+
+Each input line is {"query": ...} with an optional "id" and any initial
+state overrides (e.g. "max_replans"). Results are appended to the output
+file as each run finishes. All runs share the process-wide LLM/Tavily
+caches, single-flight table and rate limiters.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import statistics
+import sys
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+from agents.report_generator import digest_scope
+from graph.checkpointing import CHECKPOINT_PATH, graph_metadata, open_checkpointer
+from graph.main_graph import build_graph
+from state.research_state import new_research_state
+from utils.events import configure_events, run_event_level
+from utils.http import pool_stats
+from utils.instrumentation import collect_metrics
+
+BATCH_RECURSION_LIMIT = 200
+
+
+def load_queries(path: str) -> List[Dict[str, Any]]:
+    """Reads the JSONL input; every line needs a "query", ids default to the line number."""
+    queries = []
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            if "query" not in item:
+                raise ValueError(f"{path}:{line_no}: missing 'query'")
+            item.setdefault("id", str(line_no))
+            queries.append(item)
+    return queries
+
+
+def batch_thread_id(batch_id: str, item_id: str) -> str:
+    """Checkpoint thread of one item; the batch id keeps batches that reuse item ids apart."""
+    return f"batch-{batch_id}-{item_id}"
+
+
+async def run_one(
+    graph,
+    item: Dict[str, Any],
+    semaphore: asyncio.Semaphore,
+    parallel_steps: bool = False,
+    batch_id: str = "0",
+) -> Dict[str, Any]:
+    """Runs one query under the concurrency limit and returns its output record."""
+    overrides = {k: v for k, v in item.items() if k not in ("id", "query", "log_level")}
+    level = item.get("log_level")
+    state = new_research_state(item["query"], **overrides)
+    thread_id = batch_thread_id(batch_id, item["id"])
+    config = {
+        "configurable": {"thread_id": thread_id},
+        "metadata": graph_metadata(parallel_steps),
+        "recursion_limit": BATCH_RECURSION_LIMIT,
+    }
+
+    async with semaphore:
+        start = time.perf_counter()
+        # each run is its own task, so its calls land in its own collector
+        with collect_metrics() as collector, digest_scope(), run_event_level(level):
+            try:
+                final_state = await graph.ainvoke(state, config)
+                error = None
+            except Exception as e:
+                final_state, error = {}, f"{type(e).__name__}: {e}"
+        seconds = time.perf_counter() - start
+
+    summary = collector.summary()
+    by_provider = summary["by_provider"]
+    return {
+        "id": item["id"],
+        "thread_id": thread_id,
+        "query": item["query"],
+        "ok": error is None,
+        "error": error,
+        "final_report": final_state.get("final_report"),
+        "termination_reason": final_state.get("termination_reason"),
+        "steps": len(final_state.get("plan") or []),
+        "seconds": round(seconds, 3),
+        "llm_calls": by_provider.get("openai", {}).get("calls", 0),
+        "tavily_calls": by_provider.get("tavily", {}).get("calls", 0),
+        "cost_usd": round(summary["total"]["cost_usd"], 6),
+    }
+
+
+def summarize(records: List[Dict[str, Any]], wall_seconds: float) -> Dict[str, Any]:
+    durations = sorted(r["seconds"] for r in records)
+    return {
+        "runs": len(records),
+        "failed": sum(not r["ok"] for r in records),
+        "wall_seconds": round(wall_seconds, 3),
+        "runs_per_minute": round(60 * len(records) / wall_seconds, 2) if wall_seconds else 0.0,
+        "run_seconds_mean": round(statistics.fmean(durations), 3) if durations else 0.0,
+        "run_seconds_p50": durations[len(durations) // 2] if durations else 0.0,
+        "run_seconds_p95": durations[int(0.95 * (len(durations) - 1))] if durations else 0.0,
+        "run_seconds_max": durations[-1] if durations else 0.0,
+        "cost_usd": round(sum(r["cost_usd"] for r in records), 6),
+        "http_pool": pool_stats(),
+    }
+
+
+async def run_batch(
+    items: List[Dict[str, Any]],
+    output_path: str,
+    concurrency: int = 4,
+    parallel_steps: bool = False,
+    checkpoint_db: Optional[str] = None,
+    batch_id: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Runs every item with at most `concurrency` graphs in flight, appending
+    each result to output_path as soon as it finishes. The graph is compiled
+    once; with checkpoint_db every run is resumable under thread
+    batch-<batch_id>-<id>. batch_id defaults to a new random id; pass the
+    id of an earlier batch to continue its threads.
+    """
+    batch_id = batch_id or uuid.uuid4().hex[:12]
+    if checkpoint_db:
+        print(
+            f"batch {batch_id}: runs are resumable under thread batch-{batch_id}-<id>",
+            file=sys.stderr,
+        )
+    semaphore = asyncio.Semaphore(concurrency)
+    records = []
+    start = time.perf_counter()
+
+    async with contextlib.AsyncExitStack() as stack:
+        checkpointer = None
+        if checkpoint_db:
+            checkpointer = await stack.enter_async_context(open_checkpointer(checkpoint_db))
+        graph = build_graph(parallel_steps=parallel_steps, checkpointer=checkpointer)
+
+        with open(output_path, "a", encoding="utf-8") as out:
+            tasks = [
+                asyncio.create_task(run_one(graph, item, semaphore, parallel_steps, batch_id))
+                for item in items
+            ]
+            for finished in asyncio.as_completed(tasks):
+                record = await finished
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out.flush()
+                records.append(record)
+                status = "ok" if record["ok"] else f"FAILED ({record['error']})"
+                print(
+                    f"[{len(records)}/{len(items)}] {record['id']} {status} "
+                    f"in {record['seconds']:.1f}s",
+                    file=sys.stderr,
+                )
+
+    return {"batch_id": batch_id, **summarize(records, time.perf_counter() - start)}
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Run many research queries concurrently.")
+    parser.add_argument("input", help="JSONL file with one {\"query\": ...} per line")
+    parser.add_argument("output", help="JSONL file results are appended to")
+    parser.add_argument("--concurrency", type=int, default=4, help="max graphs in flight")
+    parser.add_argument("--parallel-steps", action="store_true")
+    parser.add_argument(
+        "--checkpoint-db",
+        nargs="?",
+        const=CHECKPOINT_PATH,
+        help="make every run resumable (optionally give the database path)",
+    )
+    parser.add_argument(
+        "--batch-id",
+        help="checkpoint thread prefix (default: a new random id; reuse one to continue a batch)",
+    )
+    parser.add_argument(
+        "--log-level", default="WARNING", help="agent event level on stderr (OFF to silence)"
+    )
+    parser.add_argument("--event-log", metavar="PATH", help="also write all events as JSONL")
+    args = parser.parse_args(argv)
+
+    items = load_queries(args.input)
+    # per-agent events of many interleaved runs are noise on the console
+    configure_events(args.log_level, args.event_log)
+    summary = asyncio.run(
+        run_batch(
+            items,
+            args.output,
+            concurrency=args.concurrency,
+            parallel_steps=args.parallel_steps,
+            checkpoint_db=args.checkpoint_db,
+            batch_id=args.batch_id,
+        )
+    )
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
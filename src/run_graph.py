@@ -1,8 +1,20 @@
+import argparse
 import asyncio
+import sys
+import time
 from pprint import pprint
-from src.graph.main_graph import build_graph
 
-graph = build_graph()
+# imported from src/ like the agents do, so every module (and its contextvars) is loaded once
+from graph.checkpointing import CHECKPOINT_PATH, resume_run, run_with_checkpoints
+from utils.cassette import (
+    MODE_RECORD,
+    MODE_REPLAY,
+    ON_MISS_FAIL,
+    ON_MISS_PASSTHROUGH,
+    use_cassette,
+)
+from utils.events import configure_events
+from utils.instrumentation import export_metrics
 
 initial_state = {
     "user_query": "Investigate the 2023–2024 U.S. Department of Justice antitrust actions against major technology companies. Identify one specific enforcement action where at least three reputable outlets disagree on the primary motivation or legal theory. Cite the exact statutory language used by DOJ, contrast it with each outlet’s framing, and explain which interpretation is best supported by the complaint text.",
@@ -21,6 +33,68 @@ initial_state = {
     "max_replans": 3,
 }
 
-final_state = asyncio.run(graph.ainvoke(initial_state))
-pprint("Final State:")
-pprint(final_state)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the deep research graph.")
+    parser.add_argument("--thread-id", help="checkpoint thread ID for a new run")
+    parser.add_argument("--resume", metavar="THREAD_ID", help="resume a checkpointed run")
+    parser.add_argument("--checkpoint-db", default=CHECKPOINT_PATH)
+    parser.add_argument("--parallel-steps", action="store_true")
+    parser.add_argument(
+        "--metrics-out", help="write call metrics as JSON, or Prometheus text for .prom paths"
+    )
+    parser.add_argument("--cassette", help="gzip'd JSONL file of recorded LLM/Tavily traffic")
+    parser.add_argument("--cassette-mode", choices=[MODE_RECORD, MODE_REPLAY], default=MODE_REPLAY)
+    parser.add_argument(
+        "--cassette-on-miss", choices=[ON_MISS_FAIL, ON_MISS_PASSTHROUGH], default=ON_MISS_FAIL
+    )
+    parser.add_argument(
+        "--stream-report", action="store_true", help="print the final report as it is written"
+    )
+    parser.add_argument("--log-level", help="agent event level on stderr (default EVENT_LOG_LEVEL)")
+    parser.add_argument("--event-log", metavar="PATH", help="also write all events as JSONL")
+    args = parser.parse_args()
+
+    configure_events(args.log_level, args.event_log)
+
+    if args.cassette:
+        use_cassette(args.cassette, args.cassette_mode, args.cassette_on_miss)
+
+    on_report_token = None
+    if args.stream_report:
+
+        def on_report_token(text):
+            sys.stdout.write(text)
+            sys.stdout.flush()
+
+    start = time.perf_counter()
+    if args.resume:
+        final_state = asyncio.run(
+            resume_run(
+                args.resume,
+                args.checkpoint_db,
+                # without the flag, the graph shape saved with the thread is used
+                parallel_steps=args.parallel_steps or None,
+                on_report_token=on_report_token,
+            )
+        )
+    else:
+        final_state = asyncio.run(
+            run_with_checkpoints(
+                initial_state,
+                args.thread_id,
+                args.checkpoint_db,
+                parallel_steps=args.parallel_steps,
+                on_report_token=on_report_token,
+            )
+        )
+    pprint("Final State:")
+    pprint(final_state)
+    print(f"Wall time: {time.perf_counter() - start:.2f}s")
+    if args.metrics_out and final_state.get("metrics"):
+        export_metrics(final_state["metrics"], args.metrics_out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,462 @@
+"""
+Local HTTP service for research jobs, built on asyncio streams. Run from src/:
+
+    python server.py --port 8080 --workers 4 --backend fake --fake-scenario hiking
+
+Endpoints:
+    POST /jobs                {"query": ..., <initial state overrides>} -> 202 {"id": ...}
+    GET  /jobs/<id>           job status (and the report once done)
+    GET  /jobs/<id>/events    server-sent progress events (and report tokens) until the job ends
+    POST /jobs/<id>/cancel    cancel a queued or running job
+    GET  /health              queue depth and worker count
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import sys
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+# cold-start cost of the imports below (the graph, agents and utils), reported by /health
+_import_started = time.perf_counter()
+
+from agents.report_generator import REPORT_TOKEN_EVENT, digest_scope
+from graph.main_graph import build_graph
+from state.research_state import ResearchState, new_research_state
+from utils.events import configure_events, run_event_level
+from utils.http import pool_stats
+from utils.instrumentation import collect_metrics
+from utils.providers import registry
+
+IMPORT_SECONDS = time.perf_counter() - _import_started
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED = (DONE, FAILED, CANCELLED)
+
+SERVICE_RECURSION_LIMIT = 200
+SSE_KEEPALIVE_SECONDS = 15.0
+MAX_BODY_BYTES = 1024 * 1024
+# initial-state fields a job body may override; the query itself is "query"
+JOB_OVERRIDES = frozenset(ResearchState.__annotations__) - {"user_query"}
+JOB_LOG_LEVELS = ("DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL", "OFF")
+
+
+class Job:
+    """One research run: its status, progress events and result."""
+
+    def __init__(self, job_id: str, state: Dict[str, Any], log_level: Optional[str] = None):
+        self.id = job_id
+        self.state = state
+        self.log_level = log_level
+        self.status = QUEUED
+        self.events: List[Dict[str, Any]] = []
+        self.final_state: Dict[str, Any] = {}
+        self.metrics: Optional[Dict] = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+        self._changed = asyncio.Condition()
+
+    async def emit(self, event_type: str, **data: Any) -> None:
+        async with self._changed:
+            self.events.append(
+                {
+                    "seq": len(self.events),
+                    "type": event_type,
+                    "elapsed": round(time.time() - self.created_at, 3),
+                    **data,
+                }
+            )
+            self._changed.notify_all()
+
+    async def wait_for_events(self, seen: int, timeout: float) -> bool:
+        """Waits until there are more than `seen` events; False on timeout."""
+        async with self._changed:
+            try:
+                await asyncio.wait_for(
+                    self._changed.wait_for(lambda: len(self.events) > seen), timeout
+                )
+            except asyncio.TimeoutError:
+                return False
+        return True
+
+    def to_dict(self) -> Dict[str, Any]:
+        finished = self.status in FINISHED
+        return {
+            "id": self.id,
+            "status": self.status,
+            "query": self.state["user_query"],
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "last_event": self.events[-1] if self.events else None,
+            "error": self.error,
+            "final_report": self.final_state.get("final_report") if finished else None,
+            "metrics": self.metrics["total"] if self.metrics else None,
+        }
+
+
+def describe_update(node: str, update: Dict[str, Any], state: Dict[str, Any]) -> str:
+    """Human-readable progress message for one node's state update."""
+    update = update or {}
+    if node == "clarity_scorer":
+        return f"clarity score {update.get('clarity_score')}"
+    if node == "planner":
+        return f"plan ready: {len(update.get('plan') or [])} steps"
+    if node == "supervisor":
+        return f"supervisor decided {update.get('supervisor_decision')}"
+    if node in ("executor", "dag_executor"):
+        plan = state.get("plan") or []
+        done = update.get("current_step_idx", 0)
+        if node == "executor" and 0 < done <= len(plan):
+            return f"step {plan[done - 1]['id']} executed"
+        return f"{done}/{len(plan)} steps executed"
+    if node == "report_generator":
+        return "report ready"
+    return f"{node} done"
+
+
+class ResearchService:
+    """
+    Compiles the graph once and runs submitted jobs from a bounded queue
+    with a fixed number of workers. Each job runs in its own task (so it
+    can be cancelled without touching the worker) and publishes one event
+    per graph node as it completes.
+    """
+
+    def __init__(
+        self,
+        workers: int = 4,
+        queue_size: int = 100,
+        parallel_steps: bool = False,
+        max_finished_jobs: int = 1000,
+    ):
+        self.graph = build_graph(parallel_steps=parallel_steps)
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self.num_workers = workers
+        self.max_finished_jobs = max_finished_jobs
+        self._workers: List[asyncio.Task] = []
+
+    def start(self) -> None:
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.num_workers)]
+
+    async def stop(self) -> None:
+        """
+        Cancels the running jobs and the workers and waits for them to wind
+        down, including sync graph nodes still running in worker threads.
+        Called once, at shutdown: the loop's default executor is shut down.
+        """
+        tasks = [job.task for job in self.jobs.values() if job.task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        # cancelling a task does not stop the thread of a sync node it was awaiting
+        await asyncio.get_running_loop().shutdown_default_executor()
+
+    def submit(self, query: str, log_level: Optional[str] = None, **overrides: Any) -> Job:
+        """
+        Queues a job. `log_level` quiets this job's agent events only.
+        Raises asyncio.QueueFull when the queue is at capacity.
+        """
+        job = Job(uuid.uuid4().hex, new_research_state(query, **overrides), log_level)
+        self.queue.put_nowait(job)
+        self.jobs[job.id] = job
+        job.events.append({"seq": 0, "type": QUEUED, "elapsed": 0.0})
+        self._forget_old_jobs()
+        return job
+
+    async def cancel(self, job: Job) -> None:
+        if job.status == QUEUED:
+            # the worker skips it when it comes up
+            await self._finish(job, CANCELLED)
+        elif job.status == RUNNING and job.task is not None:
+            job.task.cancel()
+
+    def _forget_old_jobs(self) -> None:
+        finished = [job_id for job_id, job in self.jobs.items() if job.status in FINISHED]
+        for job_id in finished[: max(0, len(finished) - self.max_finished_jobs)]:
+            del self.jobs[job_id]
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self.queue.get()
+            try:
+                if job.status == QUEUED:
+                    job.task = asyncio.create_task(self._run(job))
+                    with contextlib.suppress(asyncio.CancelledError):
+                        await job.task
+            finally:
+                self.queue.task_done()
+
+    async def _run(self, job: Job) -> None:
+        job.status = RUNNING
+        job.started_at = time.time()
+        await job.emit(RUNNING)
+        config = {
+            "configurable": {"thread_id": job.id},
+            "recursion_limit": SERVICE_RECURSION_LIMIT,
+        }
+        state = dict(job.state)
+        with collect_metrics() as collector, digest_scope(), run_event_level(job.log_level):
+            try:
+                async for mode, chunk in self.graph.astream(
+                    job.state, config, stream_mode=["updates", "values", "custom"]
+                ):
+                    if mode == "values":
+                        state = chunk
+                        continue
+                    if mode == "custom":
+                        if isinstance(chunk, dict) and chunk.get("event") == REPORT_TOKEN_EVENT:
+                            await job.emit("token", text=chunk["text"])
+                        continue
+                    for node, update in chunk.items():
+                        message = describe_update(node, update, state)
+                        await job.emit("node", node=node, message=message)
+            except asyncio.CancelledError:
+                job.final_state, job.metrics = state, collector.summary()
+                await self._finish(job, CANCELLED)
+                raise
+            except Exception as e:
+                job.final_state, job.metrics = state, collector.summary()
+                job.error = f"{type(e).__name__}: {e}"
+                await self._finish(job, FAILED, error=job.error)
+                return
+        job.final_state, job.metrics = state, collector.summary()
+        await self._finish(job, DONE)
+
+    async def _finish(self, job: Job, status: str, **data: Any) -> None:
+        job.status = status
+        job.finished_at = time.time()
+        await job.emit(status, **data)
+
+    def health(self) -> Dict[str, Any]:
+        return {
+            "workers": self.num_workers,
+            "queued": self.queue.qsize(),
+            "queue_capacity": self.queue.maxsize,
+            "running": sum(job.status == RUNNING for job in self.jobs.values()),
+            "jobs": len(self.jobs),
+            "import_seconds": round(IMPORT_SECONDS, 3),
+            "providers_built": registry.built(),
+            "http_pool": pool_stats(),
+        }
+
+
+# --- HTTP ---------------------------------------------------------------
+
+_REASONS = {
+    200: "OK",
+    202: "Accepted",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    503: "Service Unavailable",
+}
+
+
+async def _read_request(
+    reader: asyncio.StreamReader,
+) -> Tuple[str, str, Dict[str, str], bytes]:
+    request_line = (await reader.readline()).decode("latin-1").strip()
+    method, path, _ = request_line.split(" ", 2)
+    headers = {}
+    while True:
+        line = (await reader.readline()).decode("latin-1")
+        if line in ("\r\n", "\n", ""):
+            break
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip()
+    length = int(headers.get("content-length", 0))
+    if length > MAX_BODY_BYTES:
+        raise ValueError("body too large")
+    body = await reader.readexactly(length) if length else b""
+    return method.upper(), path.split("?", 1)[0], headers, body
+
+
+def _response(status: int, payload: Any) -> bytes:
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    head = (
+        f"HTTP/1.1 {status} {_REASONS[status]}\r\n"
+        "Content-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        "Connection: close\r\n\r\n"
+    )
+    return head.encode("latin-1") + body
+
+
+def _job_request(body: bytes) -> Tuple[str, Dict[str, Any]]:
+    """Validates a POST /jobs body into (query, submit kwargs); raises ValueError."""
+    request = json.loads(body or b"{}")
+    if not isinstance(request, dict) or not isinstance(request.get("query"), str):
+        raise ValueError("expected a JSON object with 'query'")
+    query = request.pop("query")
+    log_level = request.get("log_level")
+    if log_level is not None and str(log_level).upper() not in JOB_LOG_LEVELS:
+        raise ValueError(f"unknown log_level {log_level!r}")
+    unknown = sorted(set(request) - JOB_OVERRIDES - {"log_level"})
+    if unknown:
+        raise ValueError(f"unknown or reserved fields: {', '.join(unknown)}")
+    return query, request
+
+
+async def _stream_events(job: Job, writer: asyncio.StreamWriter) -> None:
+    writer.write(
+        b"HTTP/1.1 200 OK\r\n"
+        b"Content-Type: text/event-stream\r\n"
+        b"Cache-Control: no-cache\r\n"
+        b"Connection: close\r\n\r\n"
+    )
+    seen = 0
+    while True:
+        for event in job.events[seen:]:
+            data = json.dumps(event, ensure_ascii=False)
+            writer.write(f"id: {event['seq']}\nevent: {event['type']}\ndata: {data}\n\n".encode())
+            seen += 1
+        await writer.drain()
+        if job.status in FINISHED and seen == len(job.events):
+            return
+        if not await job.wait_for_events(seen, SSE_KEEPALIVE_SECONDS):
+            writer.write(b": keep-alive\n\n")
+
+
+async def handle_connection(
+    service: ResearchService, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+) -> None:
+    try:
+        try:
+            method, path, _, body = await _read_request(reader)
+        except ValueError:
+            writer.write(_response(413, {"error": "request too large"}))
+            return
+        except Exception:
+            writer.write(_response(400, {"error": "malformed request"}))
+            return
+
+        parts = [p for p in path.split("/") if p]
+        if parts == ["health"] and method == "GET":
+            writer.write(_response(200, service.health()))
+        elif parts == ["jobs"] and method == "POST":
+            try:
+                query, request = _job_request(body)
+            except ValueError as e:
+                # json.JSONDecodeError is a ValueError too
+                message = "malformed JSON" if isinstance(e, json.JSONDecodeError) else str(e)
+                writer.write(_response(400, {"error": message}))
+                return
+            try:
+                job = service.submit(query, **request)
+            except asyncio.QueueFull:
+                writer.write(_response(503, {"error": "job queue is full"}))
+                return
+            writer.write(_response(202, {"id": job.id, "status": job.status}))
+        elif len(parts) >= 2 and parts[0] == "jobs":
+            job = service.jobs.get(parts[1])
+            if job is None:
+                writer.write(_response(404, {"error": "unknown job"}))
+            elif len(parts) == 2 and method == "GET":
+                writer.write(_response(200, job.to_dict()))
+            elif parts[2:] == ["events"] and method == "GET":
+                await _stream_events(job, writer)
+            elif parts[2:] == ["cancel"] and method in ("POST", "DELETE"):
+                await service.cancel(job)
+                writer.write(_response(202, {"id": job.id, "status": job.status}))
+            else:
+                writer.write(_response(405, {"error": "method not allowed"}))
+        else:
+            writer.write(_response(404, {"error": "not found"}))
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        with contextlib.suppress(ConnectionError):
+            await writer.drain()
+        writer.close()
+
+
+async def serve(
+    service: ResearchService, host: str = "127.0.0.1", port: int = 8080
+) -> asyncio.AbstractServer:
+    service.start()
+    return await asyncio.start_server(
+        lambda r, w: handle_connection(service, r, w), host=host, port=port
+    )
+
+
+@contextlib.contextmanager
+def _backends(args: argparse.Namespace):
+    """Live providers, the benchmark's replay fakes, or a recorded cassette."""
+    if args.backend == "fake":
+        from benchmarks.replay import LatencyModel, load_recorded_run, replay_backends
+
+        with replay_backends(
+            load_recorded_run(args.fake_scenario),
+            LatencyModel(args.llm_latency),
+            LatencyModel(args.tavily_latency),
+        ):
+            yield
+    elif args.backend == "cassette":
+        from utils.cassette import use_cassette
+
+        use_cassette(args.cassette, "replay", args.cassette_on_miss)
+        try:
+            yield
+        finally:
+            use_cassette(None)
+    else:
+        yield
+
+
+async def _main(args: argparse.Namespace) -> None:
+    service = ResearchService(
+        workers=args.workers, queue_size=args.queue_size, parallel_steps=args.parallel_steps
+    )
+    server = await serve(service, args.host, args.port)
+    print(f"Serving research jobs on http://{args.host}:{args.port}", file=sys.stderr)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.stop()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Serve research jobs over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=4, help="jobs running at once")
+    parser.add_argument("--queue-size", type=int, default=100, help="max queued jobs")
+    parser.add_argument("--parallel-steps", action="store_true")
+    parser.add_argument("--backend", choices=["live", "fake", "cassette"], default="live")
+    parser.add_argument("--fake-scenario", default="hiking", help="recorded run the fakes replay")
+    parser.add_argument("--llm-latency", default="lognormal:0.5:0.6")
+    parser.add_argument("--tavily-latency", default="lognormal:0.8:0.4")
+    parser.add_argument("--cassette", help="cassette to replay with --backend cassette")
+    parser.add_argument("--cassette-on-miss", choices=["fail", "passthrough"], default="fail")
+    parser.add_argument(
+        "--log-level", default="WARNING", help="agent event level on stderr (OFF to silence)"
+    )
+    parser.add_argument("--event-log", metavar="PATH", help="also write all events as JSONL")
+    args = parser.parse_args(argv)
+
+    # per-agent events of many interleaved jobs are noise on the console
+    configure_events(args.log_level, args.event_log)
+    with _backends(args), contextlib.suppress(KeyboardInterrupt):
+        asyncio.run(_main(args))
+
+
+if __name__ == "__main__":
+    main()
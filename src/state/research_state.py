@@ -46,6 +46,7 @@ class ResearchState(TypedDict):
 
     # control
     supervisor_decision: Optional[str]
+    supervisor_policy: Optional[str]  # "llm", "hybrid" or "deterministic"
     termination_reason: Optional[str]
 
     # loop control
@@ -53,3 +54,28 @@ class ResearchState(TypedDict):
     max_replans: int
 
     final_report: Optional[str]
+    metrics: Optional[dict]  # per-call latency/token/cost aggregates, see utils/instrumentation.py
+
+
+def new_research_state(user_query: str, **overrides: Any) -> ResearchState:
+    """Initial state for a fresh run of the graph on `user_query`."""
+    state: ResearchState = {
+        "user_query": user_query,
+        "clarified_query": None,
+        "clarity_score": 0.0,
+        "clarification_needed": False,
+        "research_brief": None,
+        "plan": [],
+        "current_step_idx": 0,
+        "replan_request": None,
+        "entities": {},
+        "evidence_store": [],
+        "failed_steps": [],
+        "estimate": False,
+        "supervisor_decision": None,
+        "termination_reason": None,
+        "replan_count": 0,
+        "max_replans": 3,
+    }
+    state.update(overrides)
+    return state
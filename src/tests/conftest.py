@@ -0,0 +1,19 @@
+import os
+import shutil
+import tempfile
+
+import pytest
+
+# set before the modules under test are imported: their caches open these paths at import
+_cache_dir = tempfile.mkdtemp(prefix="deep-research-test-cache-")
+os.environ["RESEARCH_CACHE_DIR"] = _cache_dir
+os.environ["LLM_CACHE_PATH"] = os.path.join(_cache_dir, "llm_cache.sqlite")
+os.environ["TAVILY_CACHE_PATH"] = os.path.join(_cache_dir, "tavily_cache.sqlite")
+os.environ["CHECKPOINT_PATH"] = os.path.join(_cache_dir, "checkpoints.sqlite")
+
+
+@pytest.fixture(scope="session", autouse=True)
+def isolated_caches():
+    """Keeps the test suite away from the developer's .cache directory."""
+    yield _cache_dir
+    shutil.rmtree(_cache_dir, ignore_errors=True)
@@ -14,3 +14,54 @@ class FakeLLM:
         out = self.outputs[min(self.i, len(self.outputs) - 1)]
         self.i += 1
         return FakeMsg(out)
+
+    async def ainvoke(self, prompt: str):
+        return self.invoke(prompt)
+
+
+def _prompt_text(prompt) -> str:
+    if isinstance(prompt, str):
+        return prompt
+    return "\n".join(str(getattr(m, "content", m)) for m in prompt)
+
+
+class RoutingFakeLLM:
+    """Answers each prompt with the output of the first route whose marker it contains."""
+
+    def __init__(self, routes, default: str = ""):
+        self.routes = routes
+        self.default = default
+        self.calls = []
+
+    def invoke(self, prompt):
+        text = _prompt_text(prompt)
+        for marker, out in self.routes:
+            if marker in text:
+                self.calls.append(marker)
+                return FakeMsg(out(text) if callable(out) else out)
+        self.calls.append(None)
+        return FakeMsg(self.default)
+
+    async def ainvoke(self, prompt):
+        return self.invoke(prompt)
+
+
+class FakeTavilyClient:
+    def __init__(self, search_results=None, pages=None):
+        self.search_results = search_results or []
+        self.pages = pages or {}
+        self.search_calls = []
+        self.extract_calls = []
+
+    def search(self, query: str, **kwargs):
+        self.search_calls.append(query)
+        return {"query": query, "results": self.search_results}
+
+    def extract(self, urls):
+        urls = [urls] if isinstance(urls, str) else list(urls)
+        self.extract_calls.append(urls)
+        results = [
+            {"url": url, "raw_content": self.pages[url]} for url in urls if url in self.pages
+        ]
+        failed = [{"url": url, "error": "not found"} for url in urls if url not in self.pages]
+        return {"results": results, "failed_results": failed}
@@ -0,0 +1,33 @@
+import asyncio
+
+import pytest
+
+from benchmarks.replay import LatencyModel, load_recorded_run
+from benchmarks.run import run_scenario
+
+
+def test_latency_model_specs():
+    assert LatencyModel("constant:0.2").sample() == 0.2
+    assert 0.1 <= LatencyModel("uniform:0.1:0.3", seed=1).sample() <= 0.3
+    assert LatencyModel("lognormal:0.5:0.4", seed=1).sample() > 0
+    with pytest.raises(ValueError):
+        LatencyModel("gamma:1")
+
+
+def test_recorded_runs_parse():
+    run = load_recorded_run("doj")
+    assert run["plan"] and len(run["evidence_store"]) == len(run["plan"])
+
+
+@pytest.mark.parametrize("parallel_steps", [False, True])
+def test_replay_runs_the_whole_graph_offline(parallel_steps):
+    run = load_recorded_run("hiking")
+    result = asyncio.run(run_scenario("hiking", parallel_steps=parallel_steps))
+
+    assert result["steps_completed"] == len(run["plan"])
+    assert result["report_chars"] == len(run["final_report"])
+    subtasks = sum(len(evidence) for evidence in run["evidence_store"])
+    assert result["calls_by_function"]["tavily:execute_subtask_scored"] == subtasks
+    assert result["calls_by_function"]["openai:decompose_plan_step"] == len(run["plan"])
+    assert result["llm"]["peak_concurrency"] > 1
+    assert result["peak_memory_mb"] > 0
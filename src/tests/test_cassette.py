@@ -0,0 +1,156 @@
+import asyncio
+import gzip
+
+import pytest
+from langchain_core.messages import HumanMessage
+
+import utils.cassette as cassette_mod
+import utils.tavily_wrapper as tavily_mod
+from tests.fakes import FakeLLM, FakeTavilyClient
+from utils.cache import SQLiteCache
+from utils.cassette import Cassette, CassetteMiss, use_cassette
+from utils.llm import CachedChatModel
+from utils.providers import registry
+
+
+class ExplodingLLM:
+    def invoke(self, prompt):
+        raise AssertionError("live provider called during replay")
+
+    async def ainvoke(self, prompt):
+        return self.invoke(prompt)
+
+
+@pytest.fixture
+def cassette_path(tmp_path, monkeypatch):
+    # restore "no cassette" after each test
+    monkeypatch.setattr(cassette_mod, "_cassette", None)
+    yield str(tmp_path / "run.jsonl.gz")
+    use_cassette(None)
+
+
+def test_llm_calls_record_then_replay(cassette_path):
+    use_cassette(cassette_path, "record")
+    live = CachedChatModel(FakeLLM(["live answer"]), "m", 0, None)
+    assert live.invoke([HumanMessage(content="q")]).content == "live answer"
+
+    use_cassette(cassette_path, "replay")
+    replayed = CachedChatModel(ExplodingLLM(), "m", 0, None)
+    assert replayed.invoke([HumanMessage(content="q")]).content == "live answer"
+    assert asyncio.run(replayed.ainvoke([HumanMessage(content="q")])).content == "live answer"
+
+    with pytest.raises(CassetteMiss):
+        replayed.invoke([HumanMessage(content="other")])
+
+
+def test_replay_miss_can_pass_through_and_is_recorded(cassette_path):
+    cassette = use_cassette(cassette_path, "replay", "passthrough")
+    llm = CachedChatModel(FakeLLM(["fresh"]), "m", 0, None)
+
+    assert llm.invoke("new prompt").content == "fresh"
+    assert cassette.stats() == {"hits": 0, "misses": 1, "recorded": 1}
+
+    use_cassette(cassette_path, "replay")
+    assert CachedChatModel(ExplodingLLM(), "m", 0, None).invoke("new prompt").content == "fresh"
+
+
+def test_extract_replays_per_url_across_batch_shapes(cassette_path, monkeypatch):
+    monkeypatch.setattr(tavily_mod, "TAVILY_CACHE_ENABLED", False)
+    client = FakeTavilyClient(pages={"https://a.com/1": "page 1", "https://a.com/2": "page 2"})
+    monkeypatch.setitem(registry.instances, "tavily", client)
+
+    use_cassette(cassette_path, "record")
+    tavily_mod.tavily_extract(["https://a.com/1", "https://a.com/2", "https://a.com/3"])
+
+    use_cassette(cassette_path, "replay")
+    # any live call would fail on this client
+    monkeypatch.setitem(registry.instances, "tavily", object())
+    response = tavily_mod.tavily_extract(["https://a.com/2?utm_source=x", "https://a.com/3"])
+
+    assert [r["raw_content"] for r in response["results"]] == ["page 2"]
+    assert [f["url"] for f in response["failed_results"]] == ["https://a.com/3"]
+
+
+def test_cassette_survives_an_unterminated_file(cassette_path):
+    cassette = Cassette(cassette_path, "record")
+    cassette.record("llm", "k1", {"content": "a"})
+    # simulate a crash: the gzip stream is flushed but never closed
+    raw = open(cassette_path, "rb").read()
+    cassette._file = None
+    with open(cassette_path, "wb") as f:
+        f.write(raw)
+
+    recovered = Cassette(cassette_path, "record")
+    assert recovered.entries == {"llm:k1": {"content": "a"}}
+    recovered.record("llm", "k2", {"content": "b"})
+    recovered.close()
+
+    with gzip.open(cassette_path, "rt") as f:
+        assert len(f.readlines()) == 2
+
+
+def test_recording_with_a_warm_cache_replays_with_a_cold_one(cassette_path, monkeypatch, tmp_path):
+    llm_cache = SQLiteCache(str(tmp_path / "llm.sqlite"), namespace="llm")
+    tavily_path = str(tmp_path / "tavily.sqlite")
+    monkeypatch.setattr(tavily_mod, "TAVILY_CACHE_ENABLED", True)
+    monkeypatch.setattr(tavily_mod, "search_cache", SQLiteCache(tavily_path, namespace="search"))
+    monkeypatch.setattr(tavily_mod, "extract_cache", SQLiteCache(tavily_path, namespace="extract"))
+    client = FakeTavilyClient(
+        search_results=[{"url": "https://a.com/1", "title": "", "content": "", "score": 1}],
+        pages={"https://a.com/1": "page 1"},
+    )
+    monkeypatch.setitem(registry.instances, "tavily", client)
+
+    def run(llm):
+        answer = llm.invoke([HumanMessage(content="q")]).content
+        search = tavily_mod.tavily_search("trails")
+        page = tavily_mod.tavily_extract(["https://a.com/1"])["results"][0]["raw_content"]
+        return answer, search["results"][0]["url"], page
+
+    # warm the caches without a cassette
+    expected = run(CachedChatModel(FakeLLM(["live answer"]), "m", 0, llm_cache))
+
+    cassette = use_cassette(cassette_path, "record")
+    assert run(CachedChatModel(ExplodingLLM(), "m", 0, llm_cache)) == expected
+    assert cassette.stats()["recorded"] == 3
+
+    use_cassette(cassette_path, "replay")
+    llm_cache.clear()
+    tavily_mod.search_cache.clear()
+    tavily_mod.extract_cache.clear()
+    monkeypatch.setitem(registry.instances, "tavily", object())
+    assert run(CachedChatModel(ExplodingLLM(), "m", 0, llm_cache)) == expected
+
+
+def test_replay_bypasses_a_warm_cache(cassette_path, monkeypatch, tmp_path):
+    llm_cache = SQLiteCache(str(tmp_path / "llm.sqlite"), namespace="llm")
+    tavily_path = str(tmp_path / "tavily.sqlite")
+    monkeypatch.setattr(tavily_mod, "TAVILY_CACHE_ENABLED", True)
+    monkeypatch.setattr(tavily_mod, "search_cache", SQLiteCache(tavily_path, namespace="search"))
+    monkeypatch.setitem(
+        registry.instances,
+        "tavily",
+        FakeTavilyClient(search_results=[{"url": "https://a.com/1", "title": "", "content": ""}]),
+    )
+
+    use_cassette(cassette_path, "record")
+    CachedChatModel(FakeLLM(["recorded answer"]), "m", 0, None).invoke([HumanMessage(content="q")])
+    use_cassette(None)
+    # a later live answer and an unrecorded request land in the cache
+    for prompt, answer in (("q", "later answer"), ("other", "other answer")):
+        CachedChatModel(FakeLLM([answer]), "m", 0, llm_cache).invoke([HumanMessage(content=prompt)])
+    tavily_mod.tavily_search("trails")
+
+    use_cassette(cassette_path, "replay")
+    replayed = CachedChatModel(ExplodingLLM(), "m", 0, llm_cache)
+    assert replayed.invoke([HumanMessage(content="q")]).content == "recorded answer"
+    assert asyncio.run(replayed.ainvoke([HumanMessage(content="q")])).content == "recorded answer"
+    with pytest.raises(CassetteMiss):
+        replayed.invoke([HumanMessage(content="other")])
+    with pytest.raises(CassetteMiss):
+        tavily_mod.tavily_search("trails")
+
+    # replayed answers are not written into the cache
+    use_cassette(None)
+    fresh = CachedChatModel(ExplodingLLM(), "m", 0, llm_cache)
+    assert fresh.invoke([HumanMessage(content="q")]).content == "later answer"
@@ -0,0 +1,100 @@
+import asyncio
+
+import pytest
+
+import graph.checkpointing as checkpointing
+import graph.main_graph as main_graph
+
+
+def test_resume_continues_from_last_completed_node(monkeypatch, tmp_path):
+    calls = []
+    planner_attempts = []
+
+    def clarity_scorer(state):
+        calls.append("clarity_scorer")
+        return {"clarity_score": 0.9, "clarification_needed": False}
+
+    def planner(state):
+        planner_attempts.append(1)
+        if len(planner_attempts) == 1:
+            raise RuntimeError("simulated crash")
+        calls.append("planner")
+        return {"plan": [], "current_step_idx": 0}
+
+    def supervisor(state):
+        calls.append("supervisor")
+        return {"supervisor_decision": "TERMINATE", "termination_reason": "done"}
+
+    def report_generator(state):
+        calls.append("report_generator")
+        return {"final_report": "report"}
+
+    for name, fn in [
+        ("clarity_scorer", clarity_scorer),
+        ("planner", planner),
+        ("supervisor", supervisor),
+        ("report_generator_async", report_generator),
+    ]:
+        monkeypatch.setattr(main_graph, name, fn)
+
+    path = str(tmp_path / "checkpoints.sqlite")
+    state = {"user_query": "q", "plan": [], "current_step_idx": 0}
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(checkpointing.run_with_checkpoints(state, "run-1", path))
+
+    final_state = asyncio.run(checkpointing.resume_run("run-1", path))
+
+    assert final_state["final_report"] == "report"
+    assert calls == ["clarity_scorer", "planner", "supervisor", "report_generator"]
+
+    # resuming a finished run just returns its final state
+    assert asyncio.run(checkpointing.resume_run("run-1", path))["final_report"] == "report"
+
+
+def test_resume_rebuilds_the_graph_shape_saved_with_the_thread(monkeypatch, tmp_path):
+    planner_attempts = []
+
+    def planner(state):
+        planner_attempts.append(1)
+        if len(planner_attempts) == 1:
+            raise RuntimeError("simulated crash")
+        return {"plan": [], "current_step_idx": 0}
+
+    monkeypatch.setattr(
+        main_graph,
+        "clarity_scorer",
+        lambda state: {"clarity_score": 0.9, "clarification_needed": False},
+    )
+    monkeypatch.setattr(main_graph, "planner", planner)
+    monkeypatch.setattr(
+        main_graph,
+        "supervisor",
+        lambda state: {"supervisor_decision": "TERMINATE", "termination_reason": "done"},
+    )
+    monkeypatch.setattr(main_graph, "report_generator_async", lambda s: {"final_report": "r"})
+    shapes = []
+
+    def build_graph(parallel_steps=False, checkpointer=None):
+        shapes.append(parallel_steps)
+        return main_graph.build_graph(parallel_steps, checkpointer)
+
+    monkeypatch.setattr(checkpointing, "build_graph", build_graph)
+    path = str(tmp_path / "checkpoints.sqlite")
+    state = {"user_query": "q", "plan": [], "current_step_idx": 0}
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(
+            checkpointing.run_with_checkpoints(state, "run-dag", path, parallel_steps=True)
+        )
+    with pytest.raises(ValueError, match="parallel_steps=True"):
+        asyncio.run(checkpointing.resume_run("run-dag", path, parallel_steps=False))
+
+    # without an explicit setting, the saved shape is used
+    assert asyncio.run(checkpointing.resume_run("run-dag", path))["final_report"] == "r"
+    assert shapes == [True, True]
+
+
+def test_resume_unknown_thread_fails(tmp_path):
+    with pytest.raises(ValueError):
+        asyncio.run(checkpointing.resume_run("missing", str(tmp_path / "checkpoints.sqlite")))
@@ -0,0 +1,104 @@
+import asyncio
+
+import pytest
+
+import agents.dag_executor as dag_mod
+
+
+def _step(step_id, produces=(), requires=()):
+    return {
+        "id": step_id,
+        "goal": f"goal {step_id}",
+        "method": "search",
+        "risk": "low",
+        "produces_entities": list(produces),
+        "requires_entities": list(requires),
+    }
+
+
+PLAN = [
+    _step("s1", produces=["trails"]),
+    _step("s2", produces=["weather"]),
+    _step("s3", requires=["trails"]),
+    _step("s4", requires=["trails", "weather"]),
+]
+
+
+def test_build_step_dependencies():
+    assert dag_mod.build_step_dependencies(PLAN) == {0: set(), 1: set(), 2: {0}, 3: {0, 1}}
+    assert dag_mod.build_step_dependencies(PLAN, start_idx=1) == {1: set(), 2: set(), 3: {1}}
+
+
+def test_dag_executor_runs_independent_steps_concurrently(monkeypatch):
+    started, in_flight, peak = [], [0], [0]
+
+    async def fake_execute_step(state, step_idx):
+        started.append(state["plan"][step_idx]["id"])
+        in_flight[0] += 1
+        peak[0] = max(peak[0], in_flight[0])
+        await asyncio.sleep(0.01)
+        in_flight[0] -= 1
+        step = state["plan"][step_idx]
+        return [f"evidence {step['id']}"], {e: [step["id"]] for e in step["produces_entities"]}
+
+    monkeypatch.setattr(dag_mod, "execute_step", fake_execute_step)
+    monkeypatch.setattr(dag_mod, "decide_action", lambda state, max_retries: "EXECUTE")
+    digested = []
+    monkeypatch.setattr(
+        dag_mod, "schedule_step_digest", lambda query, step, evidence: digested.append(step["id"])
+    )
+
+    state = {"user_query": "q", "plan": PLAN, "current_step_idx": 0, "entities": {}, "evidence_store": []}
+    upd = asyncio.run(dag_mod.dag_executor(state))
+
+    assert started[:2] == ["s1", "s2"]
+    assert peak[0] == 2
+    assert upd["current_step_idx"] == 4
+    assert upd["evidence_store"] == [[f"evidence s{i}"] for i in range(1, 5)]
+    assert upd["entities"] == {"trails": ["s1"], "weather": ["s2"]}
+    assert "trails" in upd["plan"][2]["expanded_goal"]
+    assert sorted(digested) == ["s1", "s2", "s3", "s4"]
+
+
+def test_dag_executor_stops_scheduling_on_replan(monkeypatch):
+    async def fake_execute_step(state, step_idx):
+        return ["ok"], {}
+
+    def fake_decide(state, max_retries):
+        return "REPLAN" if state["current_step_idx"] == 1 else "EXECUTE"
+
+    monkeypatch.setattr(dag_mod, "execute_step", fake_execute_step)
+    monkeypatch.setattr(dag_mod, "decide_action", fake_decide)
+    monkeypatch.setattr(dag_mod, "schedule_step_digest", lambda query, step, evidence: None)
+
+    state = {"user_query": "q", "plan": PLAN, "current_step_idx": 0, "entities": {}, "evidence_store": []}
+    upd = asyncio.run(dag_mod.dag_executor(state))
+
+    assert upd["current_step_idx"] == 1
+
+
+def test_dag_executor_cancels_sibling_steps_when_one_fails(monkeypatch):
+    finished = []
+
+    async def fake_execute_step(state, step_idx):
+        if step_idx == 0:
+            raise RuntimeError("step failed")
+        await asyncio.sleep(0.5)
+        finished.append(step_idx)
+        return ["ok"], {}
+
+    monkeypatch.setattr(dag_mod, "execute_step", fake_execute_step)
+    monkeypatch.setattr(dag_mod, "decide_action", lambda state, max_retries: "EXECUTE")
+    monkeypatch.setattr(dag_mod, "schedule_step_digest", lambda query, step, evidence: None)
+
+    state = {"user_query": "q", "plan": PLAN, "current_step_idx": 0, "entities": {}, "evidence_store": []}
+
+    async def main():
+        with pytest.raises(RuntimeError):
+            await dag_mod.dag_executor(state)
+        # give a leaked sibling the time to finish
+        await asyncio.sleep(0.6)
+
+    asyncio.run(main())
+
+    assert finished == []
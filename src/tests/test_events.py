@@ -0,0 +1,85 @@
+import asyncio
+import json
+import logging
+
+import pytest
+
+from utils import events
+from utils.instrumentation import call_context
+
+
+class CountingRepr:
+    def __init__(self):
+        self.calls = 0
+
+    def __repr__(self):
+        self.calls += 1
+        return "counted"
+
+
+@pytest.fixture
+def event_log(tmp_path):
+    path = tmp_path / "events.jsonl"
+    events.configure_events("OFF", str(path), path_level="INFO")
+    yield path
+    events.configure_events()
+
+
+def _read(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_preview_caps_strings_and_containers():
+    big = {"evidence": ["x" * 10_000] * 100, **{f"k{i}": i for i in range(10)}}
+
+    shown = events.preview(big)
+
+    assert len(json.dumps(shown)) < 3_000
+    assert shown["evidence"][0].endswith("[10000 chars]")
+    assert shown["evidence"][-1] == "... +95 more"
+    assert shown["..."] == f"+{len(big) - events.EVENT_PREVIEW_ITEMS} more"
+
+
+def test_events_below_the_level_are_never_formatted(event_log):
+    payload = CountingRepr()
+
+    events.debug("agent.payload", payload=payload)
+    events.info("agent.result", payload=payload, count=3)
+
+    assert payload.calls == 1
+    assert [e["event"] for e in _read(event_log)] == ["agent.result"]
+
+
+def test_jsonl_events_carry_the_call_context(event_log):
+    with call_context(step_id="s2", subtask="find trails"):
+        events.info("executor.result", evidence_items=2)
+    events.warning("run.slow", seconds=12.5)
+
+    first, second = _read(event_log)
+    assert first["step_id"] == "s2" and first["subtask"] == "find trails"
+    assert first["evidence_items"] == 2 and first["level"] == "INFO"
+    assert second["event"] == "run.slow" and "step_id" not in second
+
+
+def test_run_level_quiets_one_run_without_reconfiguring(event_log):
+    handler_levels = [h.level for h in events.logger.handlers]
+
+    async def run(name, level):
+        with events.run_event_level(level):
+            await asyncio.sleep(0)
+            events.info("agent.result", run=name)
+            events.warning("run.slow", run=name)
+
+    async def main():
+        await asyncio.gather(run("quiet", "WARNING"), run("normal", None))
+
+    asyncio.run(main())
+
+    seen = [(e["run"], e["event"]) for e in _read(event_log)]
+    assert sorted(seen) == [
+        ("normal", "agent.result"),
+        ("normal", "run.slow"),
+        ("quiet", "run.slow"),
+    ]
+    assert [h.level for h in events.logger.handlers] == handler_levels
+    assert events.logger.level == logging.INFO
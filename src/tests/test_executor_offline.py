@@ -0,0 +1,287 @@
+import asyncio
+import json
+
+import agents.executor as executor_mod
+from tests.fakes import FakeMsg, RoutingFakeLLM
+
+PAGES = {
+    "https://a.com/trails": "Rattlesnake Ledge is 4 miles round trip with 1,160 ft of gain.",
+    "https://b.com/trails": "Mailbox Peak is 9.4 miles round trip.",
+}
+
+
+def _make_llm():
+    return RoutingFakeLLM(
+        [
+            ("decompose the following high-level research step", "1. trails near Seattle"),
+            ("most relevant URLs", "1,2"),
+            ("### Scoring Instructions", '{"extracted": "Rattlesnake Ledge: 4 miles", "score": 8}'),
+            ("information extraction agent", "Rattlesnake Ledge: 4 miles"),
+            ("Evaluate the relevance and quality of each", "[8, 6]"),
+            ("Evaluate the relevance and quality", "8"),
+            ("ENTITY TYPES TO EXTRACT", '{"trails": ["Rattlesnake Ledge"]}'),
+        ]
+    )
+
+
+async def _fake_search(query, **kwargs):
+    return {"results": [{"url": url, "title": "", "content": "", "score": 0.5} for url in PAGES]}
+
+
+async def _fake_extract(urls):
+    return {"results": [{"url": u, "raw_content": PAGES[u]} for u in urls], "failed_results": []}
+
+
+def _state():
+    return {
+        "user_query": "Short hikes near Seattle",
+        "plan": [
+            {
+                "id": "s1",
+                "goal": "Find short hikes near Seattle",
+                "expanded_goal": "Find short hikes near Seattle",
+                "method": "search",
+                "risk": "low",
+                "produces_entities": ["trails"],
+                "requires_entities": [],
+            }
+        ],
+        "current_step_idx": 0,
+        "entities": {},
+        "evidence_store": [],
+        "failed_steps": [],
+    }
+
+
+def test_executor_runs_on_native_async_calls(monkeypatch):
+    monkeypatch.setattr(executor_mod, "model", _make_llm())
+    monkeypatch.setattr(executor_mod, "schedule_step_digest", lambda query, step, evidence: None)
+    monkeypatch.setattr(executor_mod, "tavily_search_async", _fake_search)
+    monkeypatch.setattr(executor_mod, "tavily_extract_async", _fake_extract)
+
+    def _no_threads(*args, **kwargs):
+        raise AssertionError("executor should not fall back to worker threads")
+
+    monkeypatch.setattr(executor_mod.asyncio, "to_thread", _no_threads)
+
+    upd = asyncio.run(executor_mod.executor(_state()))
+
+    assert upd["current_step_idx"] == 1
+    assert upd["evidence_store"] == [["Rattlesnake Ledge: 4 miles"]]
+    assert upd["entities"] == {"trails": ["Rattlesnake Ledge"]}
+
+
+def test_fused_mode_scores_each_page_once(monkeypatch):
+    llm = _make_llm()
+    monkeypatch.setattr(executor_mod, "model", llm)
+    monkeypatch.setattr(executor_mod, "schedule_step_digest", lambda query, step, evidence: None)
+    monkeypatch.setattr(executor_mod, "FUSED_EXTRACT_AND_SCORE", True)
+    monkeypatch.setattr(executor_mod, "tavily_search_async", _fake_search)
+    monkeypatch.setattr(executor_mod, "tavily_extract_async", _fake_extract)
+
+    asyncio.run(executor_mod.executor(_state()))
+
+    assert llm.calls.count("### Scoring Instructions") == 2
+    assert "Evaluate the relevance and quality" not in llm.calls
+
+
+def test_unfused_mode_reuses_page_scores(monkeypatch):
+    llm = _make_llm()
+    monkeypatch.setattr(executor_mod, "model", llm)
+    monkeypatch.setattr(executor_mod, "schedule_step_digest", lambda query, step, evidence: None)
+    monkeypatch.setattr(executor_mod, "FUSED_EXTRACT_AND_SCORE", False)
+    monkeypatch.setattr(executor_mod, "tavily_search_async", _fake_search)
+    monkeypatch.setattr(executor_mod, "tavily_extract_async", _fake_extract)
+
+    asyncio.run(executor_mod.executor(_state()))
+
+    # both pages scored in one batch, nothing re-scored after the gather
+    assert llm.calls.count("Evaluate the relevance and quality of each") == 1
+    assert "Evaluate the relevance and quality" not in llm.calls
+
+
+def test_unfused_scores_are_batched_across_subtasks(monkeypatch):
+    def batch_scores(prompt):
+        return json.dumps([7] * prompt.count("### Candidate"))
+
+    llm = RoutingFakeLLM(
+        [
+            ("decompose the following high-level research step", "1. trails\n2. hikes"),
+            ("information extraction agent", "Rattlesnake Ledge: 4 miles"),
+            ("Evaluate the relevance and quality of each", batch_scores),
+            ("Evaluate the relevance and quality", "8"),
+            ("ENTITY TYPES TO EXTRACT", "{}"),
+        ]
+    )
+    monkeypatch.setattr(executor_mod, "model", llm)
+    monkeypatch.setattr(executor_mod, "schedule_step_digest", lambda query, step, evidence: None)
+    monkeypatch.setattr(executor_mod, "FUSED_EXTRACT_AND_SCORE", False)
+    monkeypatch.setattr(executor_mod, "tavily_search_async", _fake_search)
+    monkeypatch.setattr(executor_mod, "tavily_extract_async", _fake_extract)
+
+    upd = asyncio.run(executor_mod.executor(_state()))
+
+    # two subtasks x two pages, scored in a single call
+    assert len(upd["evidence_store"][0]) == 2
+    assert llm.calls.count("Evaluate the relevance and quality of each") == 1
+    assert "Evaluate the relevance and quality" not in llm.calls
+
+
+def test_score_batcher_merges_concurrent_requests_and_fails_them_together():
+    calls = []
+
+    async def fake_score(pairs):
+        calls.append(list(pairs))
+        if any(result == "boom" for _, result in pairs):
+            raise RuntimeError("scoring failed")
+        return [len(result) for _, result in pairs]
+
+    async def run():
+        scorer = executor_mod.ScoreBatcher(fake_score, batch_window=0.01, max_batch=3)
+        merged = await asyncio.gather(
+            scorer.score([("q1", "a"), ("q1", "bb")]),
+            scorer.score([("q2", "ccc"), ("q2", "dddd")]),
+        )
+        failed = await asyncio.gather(
+            scorer.score([("q3", "boom")]), scorer.score([("q4", "e")]), return_exceptions=True
+        )
+        return scorer, merged, failed
+
+    scorer, merged, failed = asyncio.run(run())
+
+    assert merged == [[1, 2], [3, 4]]
+    assert [len(batch) for batch in calls] == [3, 1, 2]
+    assert all(isinstance(result, RuntimeError) for result in failed)
+    assert scorer.stats() == {"scored": 6, "batches": 3}
+
+
+def test_batch_scoring_falls_back_per_item(monkeypatch):
+    llm = RoutingFakeLLM(
+        [
+            ("Evaluate the relevance and quality of each", '[9, "n/a"]'),
+            ("Evaluate the relevance and quality", "4"),
+        ]
+    )
+    monkeypatch.setattr(executor_mod, "model", llm)
+    monkeypatch.setattr(executor_mod, "schedule_step_digest", lambda query, step, evidence: None)
+
+    scores = executor_mod.evaluate_subtask_results_batch([("q", "a"), ("q", "b")])
+
+    assert scores == [9, 4]
+    assert llm.calls.count("Evaluate the relevance and quality") == 1
+
+
+def test_parse_extract_and_score_handles_fences_and_bad_json():
+    parse = executor_mod._parse_extract_and_score
+    fenced = '```json\n{"extracted": "y", "score": 3}\n```'
+
+    assert parse('{"extracted": " x ", "score": 12}') == ("x", 10)
+    assert parse(fenced) == ("y", 3)
+    assert parse("not json") is None
+
+
+def test_entity_extraction_runs_concurrently_and_dedupes(monkeypatch):
+    in_flight, peak = [0], [0]
+
+    class SlowEntityLLM:
+        async def ainvoke(self, prompt):
+            text = prompt[0].content
+            in_flight[0] += 1
+            peak[0] = max(peak[0], in_flight[0])
+            await asyncio.sleep(0.01)
+            in_flight[0] -= 1
+            names = [n for n in ("Mailbox", "Rattlesnake", "Tiger") if n in text.split("TEXT:")[1]]
+            return FakeMsg(json.dumps({"trails": names}))
+
+    monkeypatch.setattr(executor_mod, "model", SlowEntityLLM())
+    monkeypatch.setattr(executor_mod, "ENTITY_BATCH_SIZE", 1)
+    step = {"produces_entities": ["trails"]}
+    evidence = ["Rattlesnake and Mailbox", "Mailbox again", "Tiger"]
+
+    entities = asyncio.run(executor_mod._extract_entities_async(step, evidence))
+
+    assert peak[0] == 3
+    assert entities == {"trails": ["Mailbox", "Rattlesnake", "Tiger"]}
+
+
+def test_local_url_ranker_prefers_relevant_crawlable_pages():
+    results = [
+        {"url": "https://forum.example.com/threads/1", "title": "Hikes", "content": "", "score": 0.9},
+        {"url": "https://example.com/guide.pdf", "title": "Trail guide", "content": "", "score": 0.8},
+        {
+            "url": "https://www.nps.gov/trails",
+            "title": "Rattlesnake Ledge trail",
+            "content": "Trail length and elevation gain",
+            "score": 0.5,
+        },
+        {"url": "https://blog.example.com/x", "title": "Unrelated", "content": "", "score": 0.4},
+    ]
+
+    best = executor_mod.rank_urls_locally("Rattlesnake Ledge trail length", results, 2)
+
+    assert best[0] == 2
+    assert 1 not in best
+
+
+def test_llm_url_ranker_is_still_available(monkeypatch):
+    llm = _make_llm()
+    monkeypatch.setattr(executor_mod, "model", llm)
+    monkeypatch.setattr(executor_mod, "schedule_step_digest", lambda query, step, evidence: None)
+    monkeypatch.setattr(executor_mod, "URL_RANKER", "llm")
+    monkeypatch.setattr(executor_mod, "tavily_search_async", _fake_search)
+    monkeypatch.setattr(executor_mod, "tavily_extract_async", _fake_extract)
+
+    asyncio.run(executor_mod.executor(_state()))
+
+    assert "most relevant URLs" in llm.calls
+
+
+def test_parse_subtasks_orders_by_priority_and_caps():
+    response = json.dumps(
+        [
+            {"query": "drive time Seattle to Rattlesnake Ledge", "priority": 2},
+            {"query": "Rattlesnake Ledge trail length", "priority": 1},
+            {"query": "Rattlesnake Ledge winter access", "priority": 3},
+        ]
+    )
+
+    assert executor_mod._parse_subtasks(response, max_subtasks=2) == [
+        "Rattlesnake Ledge trail length",
+        "drive time Seattle to Rattlesnake Ledge",
+    ]
+
+
+def test_parse_subtasks_falls_back_to_numbered_list():
+    response = "1. Trail lengths near Seattle\n2) Mailbox Peak elevation (2023)\n- Tiger Mountain"
+
+    assert executor_mod._parse_subtasks(response) == [
+        "Trail lengths near Seattle",
+        "Mailbox Peak elevation (2023)",
+        "Tiger Mountain",
+    ]
+
+
+def test_parse_subtasks_skips_json_items_that_are_not_subtasks():
+    parse = executor_mod._parse_subtasks
+
+    # valid JSON never falls back to splitting its text into lines
+    assert parse('{"note": "no subtasks here"}') == []
+    assert parse('"Trail lengths near Seattle"') == ["Trail lengths near Seattle"]
+    assert parse("42") == []
+    assert parse('[["nested"], "Tiger Mountain"]') == ["Tiger Mountain"]
+    assert parse('[{"q": "a b"}, {"query": 3}, {"query": "Mailbox Peak"}]') == ["Mailbox Peak"]
+    assert parse('{"query": "Mailbox Peak elevation", "priority": 1}') == [
+        "Mailbox Peak elevation"
+    ]
+    assert parse('{"subtasks": ["Tiger Mountain"]}') == ["Tiger Mountain"]
+
+
+def test_compress_query_fits_limit_deterministically():
+    query = "What is the (officially reported, per the agency) length of the trail " + "x " * 30
+
+    compressed = executor_mod.compress_query(query, limit=60)
+
+    assert len(compressed) <= 60
+    assert compressed == executor_mod.compress_query(query, limit=60)
+    assert "officially" not in compressed
+    assert executor_mod.compress_query("short query", limit=60) == "short query"
@@ -0,0 +1,121 @@
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+
+from utils.http import HTTPPool
+from utils.tavily_wrapper import TavilyHTTPClient
+
+
+class EchoHandler(BaseHTTPRequestHandler):
+    # keep-alive, so pooled connections can be reused
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        payload = json.dumps({"path": self.path, "body": json.loads(body or b"{}")}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def base_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), EchoHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_clients_share_warm_connections(base_url):
+    pool = HTTPPool(max_connections=4)
+    llm_client = pool.client(base_url=base_url)
+    search_client = pool.client(base_url=base_url)
+
+    for i in range(3):
+        assert llm_client.post("/chat", json={"i": i}).json()["path"] == "/chat"
+        search_client.post("/search", json={"i": i})
+    # closing one provider's client leaves the shared pool usable
+    llm_client.close()
+    search_client.post("/search", json={})
+
+    stats = pool.stats()["sync"]
+    assert stats["requests"] == 7
+    assert stats["connections_opened"] == 1
+    assert stats["connection_reuse"] == round(1 - 1 / 7, 3)
+    assert stats["open_connections"] == stats["idle_connections"] == 1
+
+
+def test_async_pool_limits_and_separate_loops(base_url):
+    pool = HTTPPool(max_connections=2)
+    client = pool.async_client(base_url=base_url)
+
+    async def burst():
+        responses = await asyncio.gather(*(client.post("/x", json={"i": i}) for i in range(8)))
+        return [r.json()["body"]["i"] for r in responses]
+
+    # the same client works from successive event loops
+    assert asyncio.run(burst()) == list(range(8))
+    assert asyncio.run(burst()) == list(range(8))
+
+    stats = pool.stats()["async"]
+    assert stats["requests"] == 16
+    assert stats["peak_in_flight"] == 8
+    assert stats["connections_opened"] <= 4
+    # each loop's pool was closed as asyncio.run shut the loop down
+    assert stats["open_connections"] == 0
+
+
+def test_loop_pool_is_closed_when_its_loop_shuts_down(base_url):
+    pool = HTTPPool()
+    client = pool.async_client(base_url=base_url)
+
+    async def request():
+        await client.post("/x", json={})
+        return await pool.async_transport._transport()
+
+    transport = asyncio.run(request())
+
+    assert transport._pool.connections == []
+    assert len(pool.async_transport._transports) == 0
+    # a new loop gets a fresh pool
+    assert asyncio.run(request()) is not transport
+
+
+def test_acquire_time_is_averaged_over_requests_that_got_a_connection(base_url):
+    pool = HTTPPool(retries=0)
+    client = pool.client(base_url=base_url)
+    unreachable = pool.client(base_url="http://127.0.0.1:9")
+
+    with pytest.raises(httpx.ConnectError):
+        unreachable.post("/x", json={})
+    client.post("/x", json={})
+
+    stats = pool.sync_stats.summary()
+    assert stats["requests"] == 2 and stats["errors"] == 1
+    assert stats["avg_acquire_ms"] == round(1000 * pool.sync_stats.acquire_seconds, 2)
+    pool.close()
+
+
+def test_tavily_client_posts_through_the_given_pool(base_url):
+    pool = HTTPPool()
+    client = TavilyHTTPClient(pool.client(base_url=base_url))
+
+    response = client.search("hikes", max_results=3, exclude_domains=["x.com"])
+
+    assert response == {
+        "path": "/search",
+        "body": {"query": "hikes", "max_results": 3, "exclude_domains": ["x.com"]},
+    }
+    assert client.extract(["https://a.com"])["body"] == {"urls": ["https://a.com"]}
+    assert pool.stats()["sync"]["connections_opened"] == 1
@@ -0,0 +1,98 @@
+import asyncio
+import json
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+import utils.instrumentation as instrumentation
+import utils.tavily_wrapper as tavily_mod
+from tests.fakes import FakeTavilyClient
+from utils.cache import SQLiteCache
+from utils.instrumentation import call_context, collect_metrics, export_metrics, to_prometheus
+from utils.llm import CachedChatModel
+from utils.providers import registry
+
+
+class UsageLLM:
+    def invoke(self, prompt):
+        return AIMessage(
+            content="answer",
+            usage_metadata={"input_tokens": 1000, "output_tokens": 200, "total_tokens": 1200},
+        )
+
+    async def ainvoke(self, prompt):
+        return self.invoke(prompt)
+
+
+async def extract_info_from_page_async(llm, subtask):
+    with call_context(subtask=subtask):
+        return await llm.ainvoke([HumanMessage(content=subtask)])
+
+
+def test_llm_calls_record_caller_step_tokens_and_cost(tmp_path):
+    cache = SQLiteCache(str(tmp_path / "cache.sqlite"), namespace="llm")
+    llm = CachedChatModel(UsageLLM(), "gpt-5-mini", 0, cache)
+
+    async def run():
+        with call_context(step_id="s1"):
+            await extract_info_from_page_async(llm, "trails")
+            await extract_info_from_page_async(llm, "trails")
+
+    with collect_metrics() as collector:
+        asyncio.run(run())
+
+    provider_call, cache_hit = collector.calls
+    assert provider_call["caller"] == "extract_info_from_page"
+    assert provider_call["step_id"] == "s1"
+    assert provider_call["subtask"] == "trails"
+    assert (provider_call["prompt_tokens"], provider_call["completion_tokens"]) == (1000, 200)
+    assert abs(provider_call["cost_usd"] - (1000 * 0.25 + 200 * 2.0) / 1e6) < 1e-12
+    assert cache_hit["cached"] and cache_hit["cost_usd"] == 0
+
+    summary = collector.summary()
+    assert summary["total"]["calls"] == 2
+    assert summary["by_step"]["s1"]["prompt_tokens"] == 1000
+    assert summary["by_caller"]["openai:extract_info_from_page"]["cached"] == 1
+
+
+def test_tavily_calls_record_credits(monkeypatch, tmp_path):
+    path = str(tmp_path / "tavily.sqlite")
+    monkeypatch.setattr(tavily_mod, "search_cache", SQLiteCache(path, namespace="search"))
+    monkeypatch.setattr(tavily_mod, "extract_cache", SQLiteCache(path, namespace="extract"))
+    client = FakeTavilyClient(pages={f"https://a.com/{i}": "x" for i in range(6)})
+    monkeypatch.setitem(registry.instances, "tavily", client)
+
+    with collect_metrics() as collector:
+        tavily_mod.tavily_search("hikes")
+        tavily_mod.tavily_extract([f"https://a.com/{i}" for i in range(6)])
+
+    tavily = collector.summary()["by_provider"]["tavily"]
+    assert tavily["calls"] == 2
+    assert tavily["credits"] == 1 + 2
+
+
+def test_metrics_export_as_prometheus_and_json(tmp_path):
+    llm = CachedChatModel(UsageLLM(), "gpt-5-mini", 0, None)
+    with collect_metrics() as collector:
+        llm.invoke("hi")
+    summary = collector.summary()
+
+    text = to_prometheus(summary)
+    assert 'research_call_latency_seconds_count{provider="openai",caller="test_metrics_export' in text
+    assert 'research_prompt_tokens_total{provider="openai",caller=' in text
+    assert 'le="+Inf"} 1' in text
+
+    export_metrics(summary, str(tmp_path / "metrics.json"))
+    assert json.load(open(tmp_path / "metrics.json"))["total"]["calls"] == 1
+
+
+def test_calls_outside_a_run_are_only_aggregated():
+    llm = CachedChatModel(UsageLLM(), "gpt-5-mini", 0, cache=None)
+    before = instrumentation.metrics.summary()["total"]["calls"]
+
+    for i in range(3):
+        llm.invoke([HumanMessage(content=f"no collector {i}")])
+
+    # the process-wide fallback keeps totals, not one record per call
+    assert instrumentation.current_metrics() is instrumentation.metrics
+    assert instrumentation.metrics.calls == []
+    assert instrumentation.metrics.summary()["total"]["calls"] - before == 3
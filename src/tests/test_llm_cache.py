@@ -0,0 +1,210 @@
+import asyncio
+import time
+
+from langchain_core.messages import AIMessageChunk, HumanMessage
+
+import utils.llm as llm_mod
+from tests.fakes import FakeLLM, FakeMsg
+from utils.cache import SQLiteCache, make_key
+from utils.llm import CachedChatModel
+
+
+def test_sqlite_cache_roundtrip_and_counters(tmp_path):
+    cache = SQLiteCache(str(tmp_path / "cache.sqlite"), namespace="t")
+
+    assert cache.get("missing") is None
+    cache.set("k", {"content": "v"})
+    assert cache.get("k") == {"content": "v"}
+
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_sqlite_cache_ttl_expires(tmp_path):
+    cache = SQLiteCache(str(tmp_path / "cache.sqlite"), namespace="t", ttl_seconds=0.01)
+    cache.set("k", "v")
+    time.sleep(0.05)
+
+    assert cache.get("k") is None
+    assert cache.stats()["expired"] == 1
+
+
+def test_sqlite_cache_evicts_least_recently_used(tmp_path):
+    cache = SQLiteCache(str(tmp_path / "cache.sqlite"), namespace="t", max_bytes=25)
+    cache.set("a", "x" * 8)
+    time.sleep(0.01)
+    cache.set("b", "y" * 8)
+    time.sleep(0.01)
+    cache.get("a")  # touch a so b becomes the LRU entry
+    time.sleep(0.01)
+    cache.set("c", "z" * 8)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "x" * 8
+    assert cache.get("c") == "z" * 8
+    assert cache.stats()["evictions"] == 1
+
+
+def test_make_key_is_order_sensitive_and_stable():
+    assert make_key("m", 0, "p") == make_key("m", 0, "p")
+    assert make_key("m", 0, "p") != make_key("m", 1, "p")
+
+
+def test_cached_chat_model_reuses_identical_prompts(tmp_path):
+    fake = FakeLLM(["first", "second"])
+    cache = SQLiteCache(str(tmp_path / "cache.sqlite"), namespace="llm")
+    llm = CachedChatModel(fake, "fake-model", 0, cache)
+
+    a = llm.invoke([HumanMessage(content="hello")]).content
+    b = llm.invoke([HumanMessage(content="hello")]).content
+    c = llm.invoke([HumanMessage(content="different")]).content
+
+    assert a == b == "first"
+    assert c == "second"
+    assert fake.i == 2
+    assert llm.cache_stats()["hits"] == 1
+
+
+class SlowFakeLLM:
+    def __init__(self):
+        self.calls = 0
+
+    async def ainvoke(self, prompt):
+        self.calls += 1
+        answer = f"answer {self.calls}"
+        await asyncio.sleep(0.02)
+        return FakeMsg(answer)
+
+
+def test_concurrent_identical_requests_share_one_call():
+    fake = SlowFakeLLM()
+    llm = CachedChatModel(fake, "fake-model", 0, cache=None)
+    before = llm_mod.llm_stats["coalesced"]
+
+    async def run():
+        return await asyncio.gather(
+            *(llm.ainvoke([HumanMessage(content="same prompt")]) for _ in range(5)),
+            llm.ainvoke([HumanMessage(content="other prompt")]),
+        )
+
+    responses = asyncio.run(run())
+
+    assert fake.calls == 2
+    assert {r.content for r in responses[:5]} == {"answer 1"}
+    assert llm_mod.llm_stats["coalesced"] - before == 4
+
+
+class StreamingFakeLLM:
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.calls = 0
+
+    async def astream(self, prompt):
+        self.calls += 1
+        for chunk in self.chunks:
+            yield AIMessageChunk(content=chunk)
+
+
+def test_streamed_response_is_cached_whole(tmp_path):
+    fake = StreamingFakeLLM(["The ", "report ", "text."])
+    cache = SQLiteCache(str(tmp_path / "cache.sqlite"), namespace="llm")
+    llm = CachedChatModel(fake, "fake-model", 0, cache)
+
+    async def collect():
+        return [chunk.content async for chunk in llm.astream([HumanMessage(content="hello")])]
+
+    assert asyncio.run(collect()) == ["The ", "report ", "text."]
+    # the second request is served from the cache in one chunk
+    assert asyncio.run(collect()) == ["The report text."]
+    assert llm.invoke([HumanMessage(content="hello")]).content == "The report text."
+    assert fake.calls == 1
+
+
+def test_call_options_are_part_of_the_cache_key(tmp_path):
+    class OptionsFakeLLM:
+        def __init__(self):
+            self.calls = []
+
+        def invoke(self, prompt, **kwargs):
+            self.calls.append(kwargs)
+            return FakeMsg(f"answer {len(self.calls)}")
+
+    fake = OptionsFakeLLM()
+    cache = SQLiteCache(str(tmp_path / "cache.sqlite"), namespace="llm")
+    llm = CachedChatModel(fake, "fake-model", 0, cache)
+    prompt = [HumanMessage(content="hello")]
+
+    plain = llm.invoke(prompt).content
+    stopped = llm.invoke(prompt, stop=["\n"]).content
+    json_mode = llm.invoke(prompt, response_format={"type": "json_object"}).content
+
+    assert len({plain, stopped, json_mode}) == 3
+    # the runnable config (callbacks, tags) is not part of the key
+    assert llm.invoke(prompt, stop=["\n"], config={"tags": ["x"]}).content == stopped
+    assert len(fake.calls) == 3
+
+
+def test_cancelled_leader_hands_the_call_to_a_follower():
+    fake = SlowFakeLLM()
+    llm = CachedChatModel(fake, "fake-model", 0, cache=None)
+    prompt = [HumanMessage(content="cancel me")]
+
+    async def run():
+        leader = asyncio.ensure_future(llm.ainvoke(prompt))
+        await asyncio.sleep(0.005)
+        follower = asyncio.ensure_future(llm.ainvoke(prompt))
+        await asyncio.sleep(0.005)
+        leader.cancel()
+        response = await follower
+        return leader, response
+
+    leader, response = asyncio.run(run())
+
+    assert leader.cancelled()
+    # the follower was not failed with the leader's CancelledError; it made the call itself
+    assert response.content == "answer 2"
+    assert fake.calls == 2
+    assert llm_mod._inflight == {}
+
+
+def test_cancelled_follower_does_not_affect_the_others():
+    fake = SlowFakeLLM()
+    llm = CachedChatModel(fake, "fake-model", 0, cache=None)
+    prompt = [HumanMessage(content="shared")]
+
+    async def run():
+        tasks = [asyncio.ensure_future(llm.ainvoke(prompt)) for _ in range(3)]
+        await asyncio.sleep(0.005)
+        tasks[1].cancel()
+        return await asyncio.gather(tasks[0], tasks[2])
+
+    responses = asyncio.run(run())
+
+    assert [r.content for r in responses] == ["answer 1", "answer 1"]
+    assert fake.calls == 1
+
+
+def test_stream_retries_rate_limit_errors_before_the_first_chunk(monkeypatch):
+    import utils.rate_limiter as rl
+
+    class RateLimitError(Exception):
+        status_code = 429
+
+    class LimitedOnceLLM(StreamingFakeLLM):
+        async def astream(self, prompt):
+            self.calls += 1
+            if self.calls == 1:
+                raise RateLimitError()
+            for chunk in self.chunks:
+                yield AIMessageChunk(content=chunk)
+
+    monkeypatch.setattr(rl, "RATE_LIMIT_BASE_DELAY_SECONDS", 0.0)
+    limiter = rl.RateLimiter("test", requests_per_minute=6000)
+    fake = LimitedOnceLLM(["The ", "report."])
+    llm = CachedChatModel(fake, "fake-model", 0, None, limiter)
+
+    async def collect():
+        return [chunk.content async for chunk in llm.astream([HumanMessage(content="r")])]
+
+    assert asyncio.run(collect()) == ["The ", "report."]
+    assert fake.calls == 2 and limiter.stats()["retries"] == 1
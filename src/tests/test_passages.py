@@ -0,0 +1,44 @@
+from utils.passages import bm25_scores, select_relevant_passages, split_passages
+
+
+def test_split_passages_respects_max_chars():
+    text = "\n\n".join(["short para"] * 5 + ["x" * 50 + ". " + "y" * 50])
+
+    passages = split_passages(text, max_chars=60)
+
+    assert all(len(p) <= 60 for p in passages)
+    assert "short para\nshort para" in passages[0]
+
+
+def test_bm25_prefers_passages_with_query_terms():
+    passages = [
+        "Cookie notice and subscription prompts.",
+        "Rattlesnake Ledge trail is 4 miles round trip with 1,160 feet elevation gain.",
+        "Navigation menu links.",
+    ]
+
+    scores = bm25_scores("Rattlesnake Ledge trail length elevation", passages)
+
+    assert scores.index(max(scores)) == 1
+    assert scores[0] == 0.0
+
+
+def test_select_relevant_passages_keeps_budget_and_order():
+    noise = ["Subscribe to our newsletter for deals and offers today."] * 40
+    facts = [
+        "Mailbox Peak trail is 9.4 miles round trip.",
+        "Rattlesnake Ledge trail is 4 miles round trip.",
+    ]
+    text = "\n\n".join(noise[:20] + [facts[0]] + noise[20:] + [facts[1]])
+
+    selected = select_relevant_passages(
+        "trail miles round trip", text, token_budget=40, top_k=4, max_chars=60
+    )
+
+    assert selected.index("Mailbox") < selected.index("Rattlesnake")
+    assert "Subscribe" not in selected
+    assert len(selected) // 4 <= 40
+
+
+def test_select_relevant_passages_leaves_small_pages_alone():
+    assert select_relevant_passages("anything", "tiny page", token_budget=100) == "tiny page"
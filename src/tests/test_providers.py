@@ -0,0 +1,41 @@
+import asyncio
+
+from benchmarks.import_time import measure_import
+from utils.providers import ProviderRegistry
+
+
+def test_clients_are_built_once_on_first_use():
+    registry = ProviderRegistry()
+    built = []
+    registry.register("search", lambda: built.append(1) or object())
+
+    assert registry.built() == [] and built == []
+    client = registry.get("search")
+    assert registry.get("search") is client
+    assert built == [1] and registry.built() == ["search"]
+
+    registry.reset("search")
+    assert registry.get("search") is not client
+
+
+def test_overrides_apply_to_one_run_only():
+    registry = ProviderRegistry()
+    registry.register("search", lambda: "live")
+
+    async def run(name):
+        with registry.override(search=f"fake-{name}"):
+            await asyncio.sleep(0)
+            # threads started by the run see its override too
+            return await asyncio.to_thread(registry.get, "search")
+
+    async def both():
+        return await asyncio.gather(run("a"), run("b"))
+
+    assert asyncio.run(both()) == ["fake-a", "fake-b"]
+    assert registry.get("search") == "live"
+
+
+def test_graph_imports_without_provider_sdks_or_keys():
+    probe = measure_import("graph.main_graph")
+
+    assert probe["loaded"] == []
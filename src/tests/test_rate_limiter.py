@@ -0,0 +1,85 @@
+import asyncio
+
+import pytest
+
+import utils.rate_limiter as rl
+
+
+class FakeRateLimitError(Exception):
+    status_code = 429
+
+
+def test_token_bucket_queues_reservations_in_order():
+    bucket = rl.TokenBucket(per_minute=60)  # 1 per second, burst of 60
+    now = 0.0
+    bucket.updated_at = now
+
+    waits = [bucket.reserve(30, now) for _ in range(4)]
+
+    assert waits[:2] == [0.0, 0.0]
+    assert waits[2] == pytest.approx(30.0)
+    assert waits[3] == pytest.approx(60.0)
+
+
+def test_limiter_retries_rate_limit_errors(monkeypatch):
+    monkeypatch.setattr(rl, "RATE_LIMIT_BASE_DELAY_SECONDS", 0.0)
+    limiter = rl.RateLimiter("test", requests_per_minute=6000)
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise FakeRateLimitError()
+        return "ok"
+
+    assert limiter.call(flaky) == "ok"
+    assert limiter.stats()["retries"] == 2
+
+
+def test_limiter_does_not_retry_other_errors():
+    limiter = rl.RateLimiter("test", requests_per_minute=6000)
+
+    def broken():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        limiter.call(broken)
+    assert limiter.stats()["retries"] == 0
+
+
+def test_async_limiter_gives_up_after_max_retries(monkeypatch):
+    monkeypatch.setattr(rl, "RATE_LIMIT_BASE_DELAY_SECONDS", 0.0)
+    limiter = rl.RateLimiter("test", requests_per_minute=6000, max_retries=2)
+
+    async def always_limited():
+        raise FakeRateLimitError()
+
+    with pytest.raises(FakeRateLimitError):
+        asyncio.run(limiter.call_async(always_limited))
+    assert limiter.stats()["retries"] == 2
+
+
+def test_stream_is_retried_until_the_first_chunk(monkeypatch):
+    monkeypatch.setattr(rl, "RATE_LIMIT_BASE_DELAY_SECONDS", 0.0)
+    limiter = rl.RateLimiter("test", requests_per_minute=6000)
+    attempts = []
+
+    async def flaky_stream(fail_after_first=False):
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise FakeRateLimitError()
+        yield "a"
+        if fail_after_first:
+            raise FakeRateLimitError()
+        yield "b"
+
+    async def collect(**kwargs):
+        return [chunk async for chunk in limiter.stream_async(flaky_stream, **kwargs)]
+
+    assert asyncio.run(collect()) == ["a", "b"]
+    assert limiter.stats()["retries"] == 2
+
+    # after the first chunk the stream cannot be restarted
+    with pytest.raises(FakeRateLimitError):
+        asyncio.run(collect(fail_after_first=True))
+    assert limiter.stats()["retries"] == 2
@@ -0,0 +1,132 @@
+import asyncio
+
+import agents.report_generator as report_mod
+from benchmarks.replay import LatencyModel, load_recorded_run, replay_backends
+from graph.main_graph import build_graph
+from state.research_state import new_research_state
+from tests.fakes import RoutingFakeLLM
+
+PLAN = [
+    {"id": "s1", "goal": "find trails"},
+    {"id": "s2", "goal": "find weather"},
+    {"id": "s3", "goal": "find parking"},
+]
+
+
+def _state():
+    return {
+        "user_query": "Short hikes near Seattle",
+        "plan": PLAN,
+        "evidence_store": [["Rattlesnake Ledge is 4 miles."], ["Mild in May."], []],
+        "failed_steps": [],
+        "termination_reason": None,
+    }
+
+
+def _digest(prompt: str) -> str:
+    goal = prompt.split("Plan Step:\n")[1].split("\n")[0]
+    return f"digest: {goal}"
+
+
+def _make_llm():
+    return RoutingFakeLLM(
+        [
+            ("condensing the evidence", _digest),
+            ("merging evidence digests", "merged digest"),
+            ("writing a final report", lambda p: p),
+        ]
+    )
+
+
+def test_report_uses_digests_scheduled_during_execution(monkeypatch):
+    llm = _make_llm()
+    monkeypatch.setattr(report_mod, "model", llm)
+
+    async def run():
+        state = _state()
+        with report_mod.digest_scope() as pending:
+            # the executor schedules digests as steps finish
+            report_mod.schedule_step_digest(
+                state["user_query"], PLAN[0], state["evidence_store"][0]
+            )
+            await asyncio.sleep(0)
+            result = await report_mod.report_generator_async(state)
+            assert pending == {}
+        return result
+
+    report = asyncio.run(run())["final_report"]
+
+    assert "digest: find trails" in report
+    assert "digest: find weather" in report
+    assert "Rattlesnake Ledge" not in report
+    assert "No evidence collected for this step." in report
+    assert llm.calls.count("condensing the evidence") == 2
+
+
+def test_pending_digests_are_cancelled_when_the_run_ends(monkeypatch):
+    class HangingLLM:
+        async def ainvoke(self, prompt):
+            await asyncio.sleep(60)
+
+    monkeypatch.setattr(report_mod, "model", HangingLLM())
+
+    async def run():
+        with report_mod.digest_scope() as pending:
+            report_mod.schedule_step_digest("q", PLAN[0], ["evidence"])
+            tasks = list(pending.values())
+        await asyncio.sleep(0)
+        return tasks
+
+    tasks = asyncio.run(run())
+
+    assert len(tasks) == 1 and tasks[0].cancelled()
+    # outside a run there is nothing to attach a background digest to
+    report_mod.schedule_step_digest("q", PLAN[0], ["evidence"])
+    assert report_mod._pending_digests.get() is None
+
+
+def test_digests_are_reduced_to_fit_budget(monkeypatch):
+    llm = _make_llm()
+    monkeypatch.setattr(report_mod, "model", llm)
+    monkeypatch.setattr(report_mod, "REPORT_DIGEST_TOKEN_BUDGET", 10)
+
+    report = asyncio.run(report_mod.report_generator_async(_state()))["final_report"]
+
+    assert "merged digest" in report
+    assert "digest: find trails" not in report
+    assert "merging evidence digests" in llm.calls
+
+
+def test_single_mode_keeps_one_prompt_over_raw_evidence(monkeypatch):
+    llm = _make_llm()
+    monkeypatch.setattr(report_mod, "model", llm)
+    monkeypatch.setattr(report_mod, "REPORT_MODE", "single")
+
+    report = report_mod.report_generator(_state())["final_report"]
+
+    assert "Rattlesnake Ledge is 4 miles." in report
+    assert llm.calls == ["writing a final report"]
+
+
+def test_report_tokens_are_streamed_through_the_graph():
+    run = load_recorded_run("hiking")
+
+    async def stream():
+        graph = build_graph()
+        tokens, final_state = [], {}
+        async for mode, chunk in graph.astream(
+            new_research_state(run["user_query"]),
+            {"recursion_limit": 200},
+            stream_mode=["custom", "values"],
+        ):
+            if mode == "values":
+                final_state = chunk
+            elif chunk.get("event") == report_mod.REPORT_TOKEN_EVENT:
+                tokens.append(chunk["text"])
+        return tokens, final_state
+
+    with replay_backends(run, LatencyModel("constant:0"), LatencyModel("constant:0")):
+        tokens, final_state = asyncio.run(stream())
+
+    assert len(tokens) > 1
+    assert "".join(tokens).strip() == final_state["final_report"] == run["final_report"].strip()
@@ -0,0 +1,57 @@
+import asyncio
+import json
+
+from benchmarks.replay import LatencyModel, load_recorded_run, replay_backends
+from run_batch import load_queries, run_batch
+
+
+def test_batch_streams_results_and_shares_one_process(tmp_path):
+    run = load_recorded_run("hiking")
+    input_path = tmp_path / "queries.jsonl"
+    output_path = tmp_path / "results.jsonl"
+    input_path.write_text(
+        "\n".join(
+            json.dumps(item)
+            for item in [
+                {"id": "a", "query": run["user_query"]},
+                {"query": run["user_query"], "max_replans": 1},
+                {"id": "c", "query": run["user_query"]},
+            ]
+        )
+        + "\n"
+    )
+
+    items = load_queries(str(input_path))
+    assert [item["id"] for item in items] == ["a", "2", "c"]
+
+    with replay_backends(run, LatencyModel("constant:0.001"), LatencyModel("constant:0.001")):
+        summary = asyncio.run(run_batch(items, str(output_path), concurrency=2))
+
+    records = [json.loads(line) for line in output_path.read_text().splitlines()]
+    assert sorted(r["id"] for r in records) == ["2", "a", "c"]
+    assert all(r["ok"] and r["final_report"] == run["final_report"] for r in records)
+    assert all(r["llm_calls"] > 0 and r["tavily_calls"] > 0 for r in records)
+    assert summary["runs"] == 3 and summary["failed"] == 0
+    assert summary["run_seconds_max"] >= summary["run_seconds_p50"] > 0
+
+
+def test_batches_with_the_same_item_ids_use_separate_threads(tmp_path):
+    run = load_recorded_run("hiking")
+    items = [{"id": "1", "query": run["user_query"]}]
+    checkpoint_db = str(tmp_path / "checkpoints.sqlite")
+
+    def batch(output, **kwargs):
+        summary = asyncio.run(
+            run_batch(items, str(tmp_path / output), checkpoint_db=checkpoint_db, **kwargs)
+        )
+        (record,) = [json.loads(line) for line in (tmp_path / output).read_text().splitlines()]
+        return summary, record
+
+    with replay_backends(run, LatencyModel("constant:0"), LatencyModel("constant:0")):
+        first, first_record = batch("a.jsonl")
+        second, second_record = batch("b.jsonl", batch_id="b2")
+
+    assert second["batch_id"] == "b2" and first["batch_id"] != "b2"
+    assert first_record["thread_id"] == f"batch-{first['batch_id']}-1"
+    assert second_record["thread_id"] == "batch-b2-1"
+    assert first_record["ok"] and second_record["ok"]
@@ -0,0 +1,160 @@
+import asyncio
+import json
+import time
+
+import httpx
+
+import agents.report_generator as report_mod
+from benchmarks.replay import LatencyModel, load_recorded_run, replay_backends
+from server import ResearchService, serve
+
+
+def _sse_events(text):
+    events = []
+    for block in text.strip().split("\n\n"):
+        data = [line[len("data: "):] for line in block.splitlines() if line.startswith("data: ")]
+        if data:
+            events.append(json.loads(data[0]))
+    return events
+
+
+async def _with_server(run, latency, test, **service_kwargs):
+    with replay_backends(run, LatencyModel(latency), LatencyModel(latency)):
+        service = ResearchService(**service_kwargs)
+        server = await serve(service, port=0)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=30) as client:
+                await test(service, client)
+        finally:
+            server.close()
+            await server.wait_closed()
+            await service.stop()
+
+
+def test_job_streams_progress_until_report_ready():
+    run = load_recorded_run("hiking")
+
+    async def test(service, client):
+        submitted = await client.post("/jobs", json={"query": run["user_query"]})
+        assert submitted.status_code == 202
+        job_id = submitted.json()["id"]
+
+        stream = await client.get(f"/jobs/{job_id}/events")
+        events = _sse_events(stream.text)
+        messages = [e.get("message") for e in events if e["type"] == "node"]
+        assert events[0]["type"] == "queued" and events[-1]["type"] == "done"
+        assert f"plan ready: {len(run['plan'])} steps" in messages
+        assert f"step {run['plan'][0]['id']} executed" in messages
+        assert messages[-1] == "report ready"
+        tokens = [e["text"] for e in events if e["type"] == "token"]
+        assert "".join(tokens).strip() == run["final_report"].strip()
+
+        status = (await client.get(f"/jobs/{job_id}")).json()
+        assert status["status"] == "done"
+        assert status["final_report"] == run["final_report"]
+        assert status["metrics"]["calls"] > 0
+
+    asyncio.run(_with_server(run, "constant:0.001", test, workers=2))
+
+
+def test_cancel_and_queue_limits():
+    run = load_recorded_run("hiking")
+
+    async def test(service, client):
+        first = (await client.post("/jobs", json={"query": run["user_query"]})).json()
+        second = (await client.post("/jobs", json={"query": run["user_query"]})).json()
+        full = await client.post("/jobs", json={"query": run["user_query"]})
+        assert full.status_code == 503
+
+        # the queued job is cancelled before a worker picks it up
+        await client.post(f"/jobs/{second['id']}/cancel")
+        assert (await client.get(f"/jobs/{second['id']}")).json()["status"] == "cancelled"
+
+        while service.jobs[first["id"]].status == "queued":
+            await asyncio.sleep(0.01)
+        await client.post(f"/jobs/{first['id']}/cancel")
+        events = _sse_events((await client.get(f"/jobs/{first['id']}/events")).text)
+        assert events[-1]["type"] == "cancelled"
+
+        await service.queue.join()
+        health = (await client.get("/health")).json()
+        assert health["running"] == 0 and health["queued"] == 0
+        assert (await client.get("/jobs/nope")).status_code == 404
+        bad_bodies = [
+            {"no": "query"},
+            ["q"],
+            {"query": 3},
+            {"query": "q", "user_query": "x"},
+            {"query": "q", "log_level": "LOUD"},
+        ]
+        for body in bad_bodies:
+            assert (await client.post("/jobs", json=body)).status_code == 400, body
+        reserved = await client.post("/jobs", json={"query": "q", "user_query": "x"})
+        assert "user_query" in reserved.json()["error"]
+
+    # a slow backend keeps the first job running while the rest queue up behind it
+    asyncio.run(_with_server(run, "constant:0.2", test, workers=1, queue_size=1))
+
+
+def test_cancelling_a_job_cancels_its_background_digests(monkeypatch):
+    class HangingLLM:
+        async def ainvoke(self, prompt):
+            await asyncio.sleep(60)
+
+    digests = []
+
+    class DigestingGraph:
+        """Finishes one step (scheduling its digest), then hangs in the next one."""
+
+        async def astream(self, state, config, stream_mode):
+            report_mod.schedule_step_digest("q", {"id": "s1", "goal": "g"}, ["evidence"])
+            digests.extend(report_mod._pending_digests.get().values())
+            yield "updates", {"executor": {"current_step_idx": 1}}
+            await asyncio.sleep(60)
+
+    monkeypatch.setattr(report_mod, "model", HangingLLM())
+
+    async def run():
+        service = ResearchService(workers=1)
+        service.graph = DigestingGraph()
+        service.start()
+        job = service.submit("q")
+        while not digests:
+            await asyncio.sleep(0.01)
+        await service.cancel(job)
+        await service.queue.join()
+        await service.stop()
+        return job
+
+    job = asyncio.run(run())
+
+    assert job.status == "cancelled"
+    assert len(digests) == 1 and digests[0].cancelled()
+
+
+def test_stop_waits_for_cancelled_jobs_and_their_threads():
+    finished = []
+
+    class SyncNodeGraph:
+        """Runs a slow sync node in a worker thread, like LangGraph does."""
+
+        async def astream(self, state, config, stream_mode):
+            await asyncio.to_thread(lambda: (time.sleep(0.2), finished.append("node")))
+            yield "updates", {}
+
+    async def run():
+        service = ResearchService(workers=1)
+        service.graph = SyncNodeGraph()
+        service.start()
+        job = service.submit("q")
+        while job.status == "queued":
+            await asyncio.sleep(0.01)
+        await service.stop()
+        # before asyncio.run would have waited for the thread itself
+        return job, list(finished)
+
+    job, finished_at_stop = asyncio.run(run())
+
+    assert job.status == "cancelled"
+    assert finished_at_stop == ["node"]
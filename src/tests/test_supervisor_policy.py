@@ -0,0 +1,73 @@
+import agents.supervisor as supervisor_mod
+from tests.fakes import FakeLLM
+
+PLAN = [
+    {"id": "s1", "goal": "Find A", "method": "search", "risk": "low", "requires_entities": []},
+    {"id": "s2", "goal": "Find B", "method": "search", "risk": "high", "requires_entities": []},
+]
+
+
+def _state(**overrides):
+    state = {
+        "user_query": "Compare A and B",
+        "plan": [dict(s) for s in PLAN],
+        "current_step_idx": 0,
+        "failed_steps": [],
+        "entities": {},
+        "replan_count": 0,
+        "max_replans": 1,
+    }
+    state.update(overrides)
+    return state
+
+
+def _fail_if_called():
+    raise AssertionError("LLM should not be consulted")
+
+
+def test_hybrid_policy_skips_llm_without_failures(monkeypatch):
+    monkeypatch.setattr(supervisor_mod, "get_llm", _fail_if_called)
+    supervisor_mod.supervisor_stats.clear()
+
+    upd = supervisor_mod.supervisor(_state(supervisor_policy="hybrid"))
+
+    assert upd["supervisor_decision"] == "EXECUTE"
+    assert supervisor_mod.supervisor_stats["llm_decisions_avoided"] == 1
+    assert supervisor_mod.supervisor_stats["llm_decisions"] == 0
+
+
+def test_hybrid_policy_skips_llm_when_budgets_are_exhausted(monkeypatch):
+    monkeypatch.setattr(supervisor_mod, "get_llm", _fail_if_called)
+    failures = [{"step_id": "s2", "reason": "No data"}] * 2
+
+    upd = supervisor_mod.supervisor(
+        _state(
+            supervisor_policy="hybrid",
+            current_step_idx=1,
+            failed_steps=failures,
+            replan_count=1,
+        )
+    )
+
+    assert upd["supervisor_decision"] == "SKIP"
+
+
+def test_hybrid_policy_asks_llm_in_ambiguous_states(monkeypatch):
+    monkeypatch.setattr(supervisor_mod, "get_llm", lambda: FakeLLM("REPLAN"))
+    supervisor_mod.supervisor_stats.clear()
+
+    upd = supervisor_mod.supervisor(
+        _state(supervisor_policy="hybrid", failed_steps=[{"step_id": "s1", "reason": "No data"}])
+    )
+
+    assert upd["supervisor_decision"] == "REPLAN"
+    assert supervisor_mod.supervisor_stats["llm_decisions"] == 1
+
+
+def test_llm_policy_always_asks(monkeypatch):
+    monkeypatch.setattr(supervisor_mod, "get_llm", lambda: FakeLLM("EXECUTE"))
+    supervisor_mod.supervisor_stats.clear()
+
+    supervisor_mod.supervisor(_state(supervisor_policy="llm"))
+
+    assert supervisor_mod.supervisor_stats["llm_decisions"] == 1
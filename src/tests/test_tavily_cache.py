@@ -0,0 +1,276 @@
+import asyncio
+import threading
+
+import pytest
+
+import utils.tavily_wrapper as tavily_mod
+from tests.fakes import FakeTavilyClient
+from utils.cache import SQLiteCache
+from utils.instrumentation import call_context, collect_metrics, track_call
+from utils.providers import registry
+
+
+@pytest.fixture
+def fake_client(monkeypatch, tmp_path):
+    path = str(tmp_path / "tavily.sqlite")
+    monkeypatch.setattr(tavily_mod, "TAVILY_CACHE_ENABLED", True)
+    monkeypatch.setattr(tavily_mod, "search_cache", SQLiteCache(path, namespace="search"))
+    monkeypatch.setattr(tavily_mod, "extract_cache", SQLiteCache(path, namespace="extract"))
+    client = FakeTavilyClient(
+        search_results=[{"url": "https://a.com/x", "title": "A", "content": "a", "score": 0.9}],
+        pages={
+            "https://a.com/x?utm_source=feed": "page a",
+            "https://b.com/y": "page b",
+        },
+    )
+    monkeypatch.setitem(registry.instances, "tavily", client)
+    return client
+
+
+def test_canonicalize_url_strips_tracking_and_fragments():
+    assert (
+        tavily_mod.canonicalize_url("HTTPS://Example.com:443/a/?utm_source=x&b=2&a=1#top")
+        == "https://example.com/a?a=1&b=2"
+    )
+    assert tavily_mod.canonicalize_url("http://example.com") == "http://example.com/"
+
+
+def test_search_is_cached_on_normalized_query(fake_client):
+    tavily_mod.tavily_search("NHS  outcomes")
+    tavily_mod.tavily_search("nhs outcomes ")
+
+    assert fake_client.search_calls == ["NHS  outcomes"]
+
+
+def test_extract_only_fetches_uncached_urls(fake_client):
+    first = tavily_mod.tavily_extract(["https://a.com/x?utm_source=feed"])
+    second = tavily_mod.tavily_extract(["https://a.com/x", "https://b.com/y"])
+
+    assert first["results"][0]["raw_content"] == "page a"
+    assert [r["raw_content"] for r in second["results"]] == ["page a", "page b"]
+    assert fake_client.extract_calls == [
+        ["https://a.com/x?utm_source=feed"],
+        ["https://b.com/y"],
+    ]
+
+
+def test_extract_coordinator_batches_and_dedupes_concurrent_requests():
+    calls = []
+
+    async def fake_extract(urls):
+        calls.append(list(urls))
+        await asyncio.sleep(0)
+        return {"results": [{"url": u, "raw_content": f"page {u}"} for u in urls]}
+
+    async def run():
+        coordinator = tavily_mod.ExtractCoordinator(fake_extract, batch_window=0.01)
+        first, second = await asyncio.gather(
+            coordinator.extract(["https://a.com/x", "https://b.com/y"]),
+            coordinator.extract(["https://b.com/y?utm_medium=email", "https://c.com/z"]),
+        )
+        third = await coordinator.extract(["https://a.com/x"])
+        return coordinator, first, second, third
+
+    coordinator, first, second, third = asyncio.run(run())
+
+    assert calls == [["https://a.com/x", "https://b.com/y", "https://c.com/z"]]
+    assert [r["url"] for r in first["results"]] == ["https://a.com/x", "https://b.com/y"]
+    assert [r["url"] for r in second["results"]] == ["https://b.com/y", "https://c.com/z"]
+    assert third["results"][0]["raw_content"] == "page https://a.com/x"
+    assert coordinator.stats() == {"requested": 5, "coalesced": 2, "batches": 1}
+
+
+def test_extract_coordinator_attributes_batches_to_itself_and_the_step():
+    async def fake_extract(urls):
+        with track_call("tavily", "extract"):
+            return {"results": [{"url": u, "raw_content": f"page {u}"} for u in urls]}
+
+    async def run():
+        with collect_metrics() as collector, call_context(step_id="s1"):
+            coordinator = tavily_mod.ExtractCoordinator(fake_extract, batch_window=0.01)
+
+            async def subtask(name, url):
+                with call_context(subtask=name):
+                    return await coordinator.extract([url])
+
+            await asyncio.gather(subtask("a", "https://a.com/x"), subtask("b", "https://b.com/y"))
+        return collector
+
+    (call,) = asyncio.run(run()).calls
+
+    assert call["caller"] == "extract_coordinator"
+    assert call["step_id"] == "s1" and call["subtask"] is None
+
+
+def test_extract_coordinator_reports_missing_pages_as_failed():
+    async def fake_extract(urls):
+        return {"results": []}
+
+    async def run():
+        return await tavily_mod.ExtractCoordinator(fake_extract, batch_window=0).extract(
+            "https://a.com/x"
+        )
+
+    response = asyncio.run(run())
+
+    assert response["results"] == []
+    assert response["failed_results"][0]["url"] == "https://a.com/x"
+
+
+class RedirectingTavilyClient(FakeTavilyClient):
+    """Answers with the URL each page was finally fetched from, like the real API."""
+
+    def __init__(self, redirects, pages):
+        super().__init__(pages=pages)
+        self.redirects = redirects
+
+    def extract(self, urls):
+        response = super().extract([self.redirects.get(url, url) for url in urls])
+        self.extract_calls[-1] = list(urls)
+        return response
+
+
+def test_redirected_page_is_cached_under_the_requested_url(fake_client, monkeypatch):
+    client = RedirectingTavilyClient(
+        redirects={"http://old.com/page": "https://new.com/page"},
+        pages={"https://new.com/page": "moved page", "https://b.com/y": "page b"},
+    )
+    monkeypatch.setitem(registry.instances, "tavily", client)
+
+    first = tavily_mod.tavily_extract(["http://old.com/page", "https://b.com/y"])
+    second = tavily_mod.tavily_extract("http://old.com/page")
+
+    assert [r["raw_content"] for r in first["results"]] == ["moved page", "page b"]
+    assert first["failed_results"] == []
+    assert second["results"][0]["raw_content"] == "moved page"
+    assert client.extract_calls == [["http://old.com/page", "https://b.com/y"]]
+
+
+def test_unanswered_urls_are_reported_as_failed(fake_client):
+    response = tavily_mod.tavily_extract(["https://b.com/y", "https://missing.com/"])
+
+    assert [r["raw_content"] for r in response["results"]] == ["page b"]
+    assert [f["url"] for f in response["failed_results"]] == ["https://missing.com/"]
+
+
+def test_async_paths_keep_cache_io_off_the_event_loop(fake_client, monkeypatch, tmp_path):
+    threads = set()
+
+    class ThreadRecordingCache(SQLiteCache):
+        def get(self, key, ttl_seconds=None):
+            threads.add(threading.get_ident())
+            return super().get(key, ttl_seconds)
+
+        def set(self, key, value):
+            threads.add(threading.get_ident())
+            super().set(key, value)
+
+    path = str(tmp_path / "threads.sqlite")
+    monkeypatch.setattr(tavily_mod, "search_cache", ThreadRecordingCache(path, "search"))
+    monkeypatch.setattr(tavily_mod, "extract_cache", ThreadRecordingCache(path, "extract"))
+
+    class FakeResponse:
+        def __init__(self, payload):
+            self.payload = payload
+
+        def raise_for_status(self):
+            pass
+
+        def json(self):
+            return self.payload
+
+    class FakeAsyncHTTP:
+        async def post(self, path, json):
+            if path == "/search":
+                return FakeResponse(fake_client.search(json["query"]))
+            return FakeResponse(fake_client.extract(json["urls"]))
+
+    monkeypatch.setattr(tavily_mod, "_async_http", FakeAsyncHTTP())
+
+    async def run():
+        await tavily_mod.tavily_search_async("nhs outcomes")
+        await tavily_mod.tavily_extract_async(["https://b.com/y"])
+        return threading.get_ident()
+
+    loop_thread = asyncio.run(run())
+
+    assert threads and loop_thread not in threads
+
+
+def test_extract_coordinator_turns_a_failed_batch_into_failed_urls():
+    attempts = []
+
+    async def flaky_extract(urls):
+        attempts.append(list(urls))
+        if len(attempts) == 1:
+            raise RuntimeError("upstream 502")
+        return {"results": [{"url": u, "raw_content": "page"} for u in urls]}
+
+    async def run():
+        coordinator = tavily_mod.ExtractCoordinator(flaky_extract, batch_window=0)
+        failed = await coordinator.extract(["https://a.com/x", "https://b.com/y"])
+        retried = await coordinator.extract("https://a.com/x")
+        return failed, retried
+
+    failed, retried = asyncio.run(run())
+
+    assert failed["results"] == []
+    assert [f["error"] for f in failed["failed_results"]] == ["upstream 502"] * 2
+    # the failure is forgotten, so the next request tries again
+    assert retried["results"][0]["raw_content"] == "page"
+
+
+def test_extract_coordinator_matches_redirected_pages_to_requests():
+    async def redirecting_extract(urls):
+        return {"results": [{"url": u.replace("old", "new"), "raw_content": u} for u in urls]}
+
+    async def run():
+        coordinator = tavily_mod.ExtractCoordinator(redirecting_extract, batch_window=0)
+        return await coordinator.extract(["https://old.com/a", "https://b.com/y"])
+
+    response = asyncio.run(run())
+
+    contents = [r["raw_content"] for r in response["results"]]
+    assert contents == ["https://old.com/a", "https://b.com/y"]
+    assert response["failed_results"] == []
+
+
+def test_cancelled_extract_batch_does_not_leave_waiters_hanging():
+    started = []
+
+    async def hanging_extract(urls):
+        started.append(urls)
+        await asyncio.sleep(60)
+
+    async def run():
+        coordinator = tavily_mod.ExtractCoordinator(hanging_extract, batch_window=0)
+        waiters = [
+            asyncio.ensure_future(coordinator.extract("https://a.com/x")) for _ in range(2)
+        ]
+        while not started:
+            await asyncio.sleep(0)
+        for task in list(coordinator._tasks):
+            task.cancel()
+        done = await asyncio.wait_for(asyncio.gather(*waiters, return_exceptions=True), 1)
+        return coordinator, done
+
+    coordinator, done = asyncio.run(run())
+
+    assert all(isinstance(result, asyncio.CancelledError) for result in done)
+    assert coordinator._pages == {}
+
+
+def test_cancelled_subtask_does_not_cancel_a_shared_page():
+    async def slow_extract(urls):
+        await asyncio.sleep(0.02)
+        return {"results": [{"url": u, "raw_content": "page"} for u in urls]}
+
+    async def run():
+        coordinator = tavily_mod.ExtractCoordinator(slow_extract, batch_window=0)
+        first = asyncio.ensure_future(coordinator.extract("https://a.com/x"))
+        second = asyncio.ensure_future(coordinator.extract("https://a.com/x"))
+        await asyncio.sleep(0.005)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(run())["results"][0]["raw_content"] == "page"
@@ -0,0 +1,176 @@
+import atexit
+import gzip
+import json
+import os
+import threading
+import zlib
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+MODE_OFF = "off"
+MODE_RECORD = "record"
+MODE_REPLAY = "replay"
+ON_MISS_FAIL = "fail"
+ON_MISS_PASSTHROUGH = "passthrough"
+
+CASSETTE_PATH = os.getenv("CASSETTE_PATH")
+CASSETTE_MODE = os.getenv("CASSETTE_MODE", MODE_OFF)
+CASSETTE_ON_MISS = os.getenv("CASSETTE_ON_MISS", ON_MISS_FAIL)
+
+
+class CassetteMiss(KeyError):
+    """Raised in replay mode when a request is not in the cassette and misses must fail."""
+
+
+class Cassette:
+    """
+    Records provider request/response pairs to a gzip'd JSONL file and
+    replays them later, matched by request hash. Each line is
+    {"kind": ..., "key": ..., "response": ...}. The first recorded response
+    for a key wins, so replays are deterministic. In replay mode a miss
+    either raises CassetteMiss or passes through to the live provider
+    (and, for passthrough, is appended to the cassette).
+    """
+
+    def __init__(self, path: str, mode: str = MODE_REPLAY, on_miss: str = ON_MISS_FAIL):
+        if mode not in (MODE_RECORD, MODE_REPLAY):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        if on_miss not in (ON_MISS_FAIL, ON_MISS_PASSTHROUGH):
+            raise ValueError(f"Unknown cassette miss policy: {on_miss}")
+        self.path = path
+        self.mode = mode
+        self.on_miss = on_miss
+        self.entries: Dict[str, Any] = {}
+        self.hits = 0
+        self.misses = 0
+        self.recorded = 0
+        self._lock = threading.Lock()
+        self._file = None
+        # a cassette left unterminated by a crash is rewritten before appending
+        self._truncated = False
+        if os.path.exists(path):
+            self._load()
+        atexit.register(self.close)
+
+    def _load(self) -> None:
+        try:
+            with gzip.open(self.path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    entry = json.loads(line)
+                    self.entries.setdefault(f"{entry['kind']}:{entry['key']}", entry["response"])
+        except (EOFError, zlib.error, gzip.BadGzipFile, json.JSONDecodeError):
+            self._truncated = True
+
+    def _open_for_append(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        if not self._truncated:
+            return gzip.open(self.path, "at", encoding="utf-8")
+        f = gzip.open(self.path, "wt", encoding="utf-8")
+        for full_key, response in self.entries.items():
+            kind, key = full_key.split(":", 1)
+            f.write(json.dumps({"kind": kind, "key": key, "response": response}) + "\n")
+        self._truncated = False
+        return f
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == MODE_REPLAY
+
+    @property
+    def recording(self) -> bool:
+        return self.mode == MODE_RECORD or self.on_miss == ON_MISS_PASSTHROUGH
+
+    def lookup(self, kind: str, key: str) -> Optional[Any]:
+        """Returns the recorded response, or None if absent or not replaying."""
+        if not self.replaying:
+            return None
+        with self._lock:
+            response = self.entries.get(f"{kind}:{key}")
+            if response is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return response
+
+    def miss(self, kind: str, key: str) -> None:
+        """Called on a replay miss; raises unless misses pass through."""
+        if self.replaying and self.on_miss == ON_MISS_FAIL:
+            raise CassetteMiss(f"{kind} request {key} is not in cassette {self.path}")
+
+    def record(self, kind: str, key: str, response: Any) -> None:
+        if not self.recording:
+            return
+        with self._lock:
+            if f"{kind}:{key}" in self.entries:
+                return
+            if self._file is None:
+                self._file = self._open_for_append()
+            self.entries[f"{kind}:{key}"] = response
+            line = json.dumps({"kind": kind, "key": key, "response": response}, ensure_ascii=False)
+            self._file.write(line + "\n")
+            # everything written so far stays readable if the run crashes
+            self._file.flush()
+            self.recorded += 1
+
+    def call(
+        self,
+        kind: str,
+        key: str,
+        fn: Callable[[], Any],
+        encode: Callable[[Any], Any] = lambda r: r,
+        decode: Callable[[Any], Any] = lambda r: r,
+    ) -> Any:
+        recorded = self.lookup(kind, key)
+        if recorded is not None:
+            return decode(recorded)
+        self.miss(kind, key)
+        response = fn()
+        self.record(kind, key, encode(response))
+        return response
+
+    async def acall(
+        self,
+        kind: str,
+        key: str,
+        fn: Callable[[], Awaitable[Any]],
+        encode: Callable[[Any], Any] = lambda r: r,
+        decode: Callable[[Any], Any] = lambda r: r,
+    ) -> Any:
+        recorded = self.lookup(kind, key)
+        if recorded is not None:
+            return decode(recorded)
+        self.miss(kind, key)
+        response = await fn()
+        self.record(kind, key, encode(response))
+        return response
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "recorded": self.recorded}
+
+
+# the process-wide cassette, looked up at call time so it can be switched per run
+_cassette: Optional[Cassette] = (
+    Cassette(CASSETTE_PATH, CASSETTE_MODE, CASSETTE_ON_MISS)
+    if CASSETTE_PATH and CASSETTE_MODE != MODE_OFF
+    else None
+)
+
+
+def get_cassette() -> Optional[Cassette]:
+    return _cassette
+
+
+def use_cassette(
+    path: Optional[str], mode: str = MODE_REPLAY, on_miss: str = ON_MISS_FAIL
+) -> Optional[Cassette]:
+    """Switches the process to a cassette (or off, with path None or mode "off")."""
+    global _cassette
+    if _cassette is not None:
+        _cassette.close()
+    _cassette = Cassette(path, mode, on_miss) if path and mode != MODE_OFF else None
+    return _cassette
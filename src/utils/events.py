@@ -0,0 +1,199 @@
+import contextvars
+import json
+import logging
+import os
+import sys
+import time
+from contextlib import contextmanager
+from itertools import islice
+from typing import Any, Dict, Iterator, Optional
+
+from utils.instrumentation import current_step, current_subtask
+
+# console verbosity; agent results are INFO, full payload previews DEBUG
+EVENT_LOG_LEVEL = os.getenv("EVENT_LOG_LEVEL", "INFO").upper()
+# machine-readable sink, one JSON object per event
+EVENT_LOG_PATH = os.getenv("EVENT_LOG_PATH")
+EVENT_LOG_PATH_LEVEL = os.getenv("EVENT_LOG_PATH_LEVEL", "DEBUG").upper()
+# payload previews are capped so an event never formats megabytes of evidence
+EVENT_PREVIEW_CHARS = int(os.getenv("EVENT_PREVIEW_CHARS", 300))
+EVENT_PREVIEW_ITEMS = int(os.getenv("EVENT_PREVIEW_ITEMS", 5))
+EVENT_PREVIEW_DEPTH = 3
+
+logger = logging.getLogger("deep_research.events")
+
+# per-run verbosity (see run_event_level), on top of the process-wide handler levels
+_run_level: contextvars.ContextVar[Optional[int]] = contextvars.ContextVar(
+    "event_run_level", default=None
+)
+
+
+def _run_allows(level: int) -> bool:
+    run_level = _run_level.get()
+    return run_level is None or level >= run_level
+
+
+class RunLevelFilter(logging.Filter):
+    """Drops events below the level of the run (context) that emitted them."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return _run_allows(record.levelno)
+
+
+logger.addFilter(RunLevelFilter())
+
+
+def preview(value: Any, depth: int = EVENT_PREVIEW_DEPTH) -> Any:
+    """
+    JSON-safe, size-capped copy of a payload. Strings are cut to
+    EVENT_PREVIEW_CHARS, containers to EVENT_PREVIEW_ITEMS entries and
+    EVENT_PREVIEW_DEPTH levels, so the cost is bounded whatever the input.
+    """
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    if isinstance(value, str):
+        if len(value) <= EVENT_PREVIEW_CHARS:
+            return value
+        return f"{value[:EVENT_PREVIEW_CHARS]}... [{len(value)} chars]"
+    if isinstance(value, dict):
+        if depth <= 0:
+            return f"<dict of {len(value)}>"
+        items = islice(value.items(), EVENT_PREVIEW_ITEMS)
+        shown = {str(k): preview(v, depth - 1) for k, v in items}
+        if len(value) > EVENT_PREVIEW_ITEMS:
+            shown["..."] = f"+{len(value) - EVENT_PREVIEW_ITEMS} more"
+        return shown
+    if isinstance(value, (list, tuple, set)):
+        if depth <= 0:
+            return f"<{type(value).__name__} of {len(value)}>"
+        shown = [preview(v, depth - 1) for v in islice(value, EVENT_PREVIEW_ITEMS)]
+        if len(value) > EVENT_PREVIEW_ITEMS:
+            shown.append(f"... +{len(value) - EVENT_PREVIEW_ITEMS} more")
+        return shown
+    return preview(repr(value), depth)
+
+
+def _event_dict(record: logging.LogRecord) -> Dict[str, Any]:
+    """The record as a JSON-safe event, previewed once and shared by all handlers."""
+    cached = getattr(record, "_event_dict", None)
+    if cached is None:
+        cached = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "event": getattr(record, "event", record.getMessage()),
+        }
+        for key in ("step_id", "subtask"):
+            if getattr(record, key, None):
+                cached[key] = getattr(record, key)
+        for key, value in getattr(record, "fields", {}).items():
+            cached[key] = preview(value)
+        record._event_dict = cached
+    return cached
+
+
+class ConsoleFormatter(logging.Formatter):
+    """One line per event: time, level, event name and key=value previews."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        event = _event_dict(record)
+        fields = " ".join(
+            f"{key}={json.dumps(value, ensure_ascii=False)}"
+            for key, value in event.items()
+            if key not in ("ts", "level", "event")
+        )
+        clock = time.strftime("%H:%M:%S", time.localtime(record.created))
+        return f"{clock} {event['level']:<5} {event['event']} {fields}".rstrip()
+
+
+class JsonlFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        return json.dumps(_event_dict(record), ensure_ascii=False)
+
+
+def emit(event: str, level: int = logging.INFO, **fields: Any) -> None:
+    """
+    Logs a structured event. Nothing is formatted unless a handler accepts
+    the level, so large payloads can be passed as fields at no cost; when
+    they are written, they are written as previews.
+    """
+    if not logger.isEnabledFor(level) or not _run_allows(level):
+        return
+    logger.log(
+        level,
+        event,
+        extra={
+            "event": event,
+            "fields": fields,
+            "step_id": current_step.get(),
+            "subtask": current_subtask.get(),
+        },
+    )
+
+
+def debug(event: str, **fields: Any) -> None:
+    emit(event, logging.DEBUG, **fields)
+
+
+def info(event: str, **fields: Any) -> None:
+    emit(event, logging.INFO, **fields)
+
+
+def warning(event: str, **fields: Any) -> None:
+    emit(event, logging.WARNING, **fields)
+
+
+@contextmanager
+def run_event_level(level: Optional[str]) -> Iterator[None]:
+    """
+    Per-run verbosity: events emitted in this context (its tasks and
+    threads) below `level` are dropped ("OFF" drops all). The process-wide
+    handlers other runs share are left alone, so one job's setting never
+    changes another's; a run can only be quieter than the handlers.
+    """
+    if not level:
+        yield
+        return
+    level = level.upper()
+    token = _run_level.set(
+        logging.CRITICAL + 1 if level == "OFF" else logging.getLevelName(level)
+    )
+    try:
+        yield
+    finally:
+        _run_level.reset(token)
+
+
+def configure_events(
+    level: Optional[str] = None,
+    path: Optional[str] = None,
+    path_level: str = EVENT_LOG_PATH_LEVEL,
+) -> None:
+    """
+    Installs the process-wide event handlers: a console handler on stderr
+    at `level` (EVENT_LOG_LEVEL by default; "OFF" silences it) and, if
+    `path` is given, a JSONL file handler at `path_level`. Called once by
+    the entry point (run_graph, run_batch, server, benchmarks) before any
+    run starts; use run_event_level for the verbosity of a single run.
+    Until it is called, events go through standard logging propagation.
+    """
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+        handler.close()
+    level = (level or EVENT_LOG_LEVEL).upper()
+    levels = []
+    if level != "OFF":
+        console = logging.StreamHandler(sys.stderr)
+        console.setLevel(level)
+        console.setFormatter(ConsoleFormatter())
+        logger.addHandler(console)
+        levels.append(console.level)
+    if path:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        sink = logging.FileHandler(path, encoding="utf-8")
+        sink.setLevel(path_level.upper())
+        sink.setFormatter(JsonlFormatter())
+        logger.addHandler(sink)
+        levels.append(sink.level)
+    # the logger level gates emit(), so disabled events cost one comparison
+    logger.setLevel(min(levels) if levels else logging.CRITICAL + 1)
+    logger.propagate = False
@@ -0,0 +1,276 @@
+import asyncio
+import importlib.util
+import os
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, Optional
+
+import httpx
+
+# one connection pool per process (and per event loop for async) for every provider
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", 100))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", 20))
+HTTP_KEEPALIVE_EXPIRY_SECONDS = float(os.getenv("HTTP_KEEPALIVE_EXPIRY_SECONDS", 60))
+HTTP_CONNECT_TIMEOUT_SECONDS = float(os.getenv("HTTP_CONNECT_TIMEOUT_SECONDS", 10))
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", 1))
+# "auto" uses HTTP/2 when the h2 package is installed; "1" forces it, "0" disables it
+HTTP2 = os.getenv("HTTP2", "auto")
+
+
+def http2_available() -> bool:
+    if HTTP2 == "auto":
+        return importlib.util.find_spec("h2") is not None
+    return HTTP2 != "0"
+
+
+class PoolStats:
+    """
+    Utilization counters for one pool, fed by httpcore trace events:
+    requests, in-flight and peak in-flight requests, new TCP connections and
+    TLS handshakes (so reuse = 1 - connections / requests) and the time
+    requests spent waiting for a connection, including connecting, averaged
+    over the requests that got one.
+    """
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.connections_opened = 0
+        self.tls_handshakes = 0
+        self.http2_requests = 0
+        self.acquired = 0
+        self.acquire_seconds = 0.0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def track(self) -> Iterator[None]:
+        with self._lock:
+            self.requests += 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            yield
+        except Exception:
+            with self._lock:
+                self.errors += 1
+            raise
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def on_trace(self, name: str, started: float, request: Dict[str, bool]) -> None:
+        with self._lock:
+            if name == "connection.connect_tcp.complete":
+                self.connections_opened += 1
+            elif name == "connection.start_tls.complete":
+                self.tls_handshakes += 1
+            elif name.endswith("send_request_headers.started") and not request.get("sent"):
+                # the first byte goes out once the request holds a connection
+                request["sent"] = True
+                self.acquired += 1
+                self.acquire_seconds += time.perf_counter() - started
+                if name.startswith("http2."):
+                    self.http2_requests += 1
+
+    def tracer(self) -> Callable[[str, Any], None]:
+        started, request = time.perf_counter(), {}
+        return lambda name, info: self.on_trace(name, started, request)
+
+    def async_tracer(self) -> Callable[[str, Any], Any]:
+        started, request = time.perf_counter(), {}
+
+        async def trace(name: str, info: Any) -> None:
+            self.on_trace(name, started, request)
+
+        return trace
+
+    def summary(self, open_connections: int = 0, idle_connections: int = 0) -> Dict[str, Any]:
+        with self._lock:
+            requests, acquired = self.requests, self.acquired
+            return {
+                "requests": requests,
+                "errors": self.errors,
+                "in_flight": self.in_flight,
+                "peak_in_flight": self.peak_in_flight,
+                "connections_opened": self.connections_opened,
+                "tls_handshakes": self.tls_handshakes,
+                "http2_requests": self.http2_requests,
+                "connection_reuse": (
+                    round(1 - self.connections_opened / requests, 3) if requests else 0.0
+                ),
+                "avg_acquire_ms": (
+                    round(1000 * self.acquire_seconds / acquired, 2) if acquired else 0.0
+                ),
+                "open_connections": open_connections,
+                "idle_connections": idle_connections,
+            }
+
+
+def _connections(transport: Any) -> list:
+    # httpx keeps the httpcore pool private; only used for reporting
+    return list(getattr(getattr(transport, "_pool", None), "connections", []))
+
+
+class _TracedTransport(httpx.HTTPTransport):
+    def __init__(self, stats: PoolStats, **kwargs):
+        super().__init__(**kwargs)
+        self.stats = stats
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        request.extensions["trace"] = self.stats.tracer()
+        with self.stats.track():
+            return super().handle_request(request)
+
+    def close(self) -> None:
+        # shared by many clients; closing one client must not close the pool
+        pass
+
+
+class _TracedAsyncTransport(httpx.AsyncHTTPTransport):
+    def __init__(self, stats: PoolStats, **kwargs):
+        super().__init__(**kwargs)
+        self.stats = stats
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        request.extensions["trace"] = self.stats.async_tracer()
+        with self.stats.track():
+            return await super().handle_async_request(request)
+
+
+class _LoopLocalAsyncTransport(httpx.AsyncBaseTransport):
+    """
+    One async pool per event loop behind a single transport object, since
+    connections cannot move between loops. Clients built on it can be
+    created once and used from any loop (e.g. successive asyncio.run calls).
+    A loop's pool is closed when the loop shuts down its async generators,
+    which asyncio.run does before closing the loop.
+    """
+
+    def __init__(self, stats: PoolStats, **kwargs):
+        self.stats = stats
+        self._kwargs = kwargs
+        # loop -> (pool, its closer); dropped with their loop
+        self._transports: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    async def _close_with_loop(self, transport: _TracedAsyncTransport) -> AsyncIterator[None]:
+        # an async generator the loop finalizes in shutdown_asyncgens(), while it can still run
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._transports.pop(asyncio.get_running_loop(), None)
+            await transport.aclose()
+
+    async def _transport(self) -> _TracedAsyncTransport:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            entry = self._transports.get(loop)
+            created = entry is None
+            if created:
+                transport = _TracedAsyncTransport(self.stats, **self._kwargs)
+                # the closer must not reference the loop, or the entry would never be dropped
+                entry = self._transports[loop] = (transport, self._close_with_loop(transport))
+        if created:
+            # the first step registers the closer with the loop and stops at its yield
+            await entry[1].__anext__()
+        return entry[0]
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        transport = await self._transport()
+        return await transport.handle_async_request(request)
+
+    async def aclose(self) -> None:
+        # shared by many clients; closing one client must not close the pool
+        pass
+
+    def connections(self) -> list:
+        with self._lock:
+            transports = [transport for transport, _ in self._transports.values()]
+        return [c for t in transports for c in _connections(t)]
+
+
+class HTTPPool:
+    """
+    The shared outbound transport: a sync pool and a per-loop async pool
+    with the same limits, keep-alive and HTTP/2 setting. Provider clients
+    (the OpenAI SDK via http_client/http_async_client, the Tavily client)
+    are thin httpx clients with their own base URL and headers on top of
+    it, so a burst of subtasks reuses warm connections instead of opening
+    new ones per client.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = HTTP_MAX_CONNECTIONS,
+        max_keepalive: int = HTTP_MAX_KEEPALIVE,
+        keepalive_expiry: float = HTTP_KEEPALIVE_EXPIRY_SECONDS,
+        http2: Optional[bool] = None,
+        retries: int = HTTP_RETRIES,
+    ):
+        self.http2 = http2_available() if http2 is None else http2
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=keepalive_expiry,
+        )
+        transport_kwargs = {"limits": self.limits, "http2": self.http2, "retries": retries}
+        self.sync_stats = PoolStats()
+        self.async_stats = PoolStats()
+        self.transport = _TracedTransport(self.sync_stats, **transport_kwargs)
+        self.async_transport = _LoopLocalAsyncTransport(self.async_stats, **transport_kwargs)
+
+    def client(self, timeout: float = 60.0, **kwargs) -> httpx.Client:
+        """A sync client on the shared pool; kwargs are e.g. base_url and headers."""
+        return httpx.Client(
+            transport=self.transport,
+            timeout=httpx.Timeout(timeout, connect=HTTP_CONNECT_TIMEOUT_SECONDS),
+            **kwargs,
+        )
+
+    def async_client(self, timeout: float = 60.0, **kwargs) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            transport=self.async_transport,
+            timeout=httpx.Timeout(timeout, connect=HTTP_CONNECT_TIMEOUT_SECONDS),
+            **kwargs,
+        )
+
+    def close(self) -> None:
+        """Closes the sync pool; async pools are closed when their loops shut down."""
+        httpx.HTTPTransport.close(self.transport)
+
+    def stats(self) -> Dict[str, Any]:
+        sync_connections = _connections(self.transport)
+        async_connections = self.async_transport.connections()
+        return {
+            "http2": self.http2,
+            "max_connections": self.limits.max_connections,
+            "max_keepalive": self.limits.max_keepalive_connections,
+            "sync": self.sync_stats.summary(
+                len(sync_connections), sum(c.is_idle() for c in sync_connections)
+            ),
+            "async": self.async_stats.summary(
+                len(async_connections), sum(c.is_idle() for c in async_connections)
+            ),
+        }
+
+
+_pool: Optional[HTTPPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> HTTPPool:
+    """The process-wide pool, created on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = HTTPPool()
+        return _pool
+
+
+def pool_stats() -> Dict[str, Any]:
+    return get_pool().stats() if _pool is not None else {}
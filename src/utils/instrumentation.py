@@ -0,0 +1,277 @@
+import contextvars
+import copy
+import json
+import math
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# USD per 1M tokens: (prompt, completion)
+MODEL_PRICES_PER_MTOK = {
+    "gpt-5-mini": (0.25, 2.00),
+    "gpt-5": (1.25, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+}
+TAVILY_CREDIT_USD = float(os.getenv("TAVILY_CREDIT_USD", 0.008))
+# a basic extract costs one credit per this many successfully extracted URLs
+TAVILY_URLS_PER_EXTRACT_CREDIT = 5
+
+LATENCY_BUCKETS_SECONDS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# frames from these modules are plumbing, not the agent function that made the call
+_PLUMBING_MODULES = (
+    "utils.instrumentation",
+    "utils.llm",
+    "utils.rate_limiter",
+    "utils.tavily_wrapper",
+    "contextlib",
+)
+# reaching these means the task or worker thread has no agent frame at all
+_BOUNDARY_MODULES = ("asyncio", "threading", "concurrent")
+# thin prompt helpers whose caller is the interesting function
+_WRAPPER_FUNCTIONS = {"_invoke_text", "_ainvoke_text"}
+
+current_step: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar(
+    "current_step", default=None
+)
+current_subtask: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar(
+    "current_subtask", default=None
+)
+# set where the stack cannot tell, e.g. in tasks shared by several agent functions
+current_caller: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar(
+    "current_caller", default=None
+)
+
+
+def _in_modules(module: str, modules: Tuple[str, ...]) -> bool:
+    module = module[len("src.") :] if module.startswith("src.") else module
+    return any(module == m or module.startswith(m + ".") for m in modules)
+
+
+def _caller() -> Optional[str]:
+    """Name of the innermost agent function on the stack, without an _async suffix."""
+    frame = sys._getframe(1)
+    while frame is not None:
+        name = frame.f_code.co_name
+        module = frame.f_globals.get("__name__", "")
+        if _in_modules(module, _BOUNDARY_MODULES):
+            return None
+        if not _in_modules(module, _PLUMBING_MODULES) and name not in _WRAPPER_FUNCTIONS:
+            return name[: -len("_async")] if name.endswith("_async") else name
+        frame = frame.f_back
+    return None
+
+
+def llm_cost(model_name: str, prompt_tokens: int, completion_tokens: int) -> float:
+    prompt_price, completion_price = MODEL_PRICES_PER_MTOK.get(model_name, (0.0, 0.0))
+    return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1_000_000
+
+
+def tavily_credits(operation: str, extracted_urls: int = 0) -> float:
+    if operation == "search":
+        return 1.0
+    return float(math.ceil(extracted_urls / TAVILY_URLS_PER_EXTRACT_CREDIT))
+
+
+def _empty_group() -> Dict:
+    return {
+        "calls": 0,
+        "cached": 0,
+        "errors": 0,
+        "prompt_tokens": 0,
+        "completion_tokens": 0,
+        "credits": 0.0,
+        "cost_usd": 0.0,
+        "latency_seconds": {
+            "sum": 0.0,
+            "max": 0.0,
+            "buckets": {str(b): 0 for b in LATENCY_BUCKETS_SECONDS},
+        },
+    }
+
+
+def _add_to_group(group: Dict, record: Dict) -> None:
+    group["calls"] += 1
+    group["cached"] += int(record["cached"])
+    group["errors"] += int(record["error"])
+    group["prompt_tokens"] += record["prompt_tokens"]
+    group["completion_tokens"] += record["completion_tokens"]
+    group["credits"] += record["credits"]
+    group["cost_usd"] += record["cost_usd"]
+    latency = group["latency_seconds"]
+    latency["sum"] += record["latency_seconds"]
+    latency["max"] = max(latency["max"], record["latency_seconds"])
+    for bound in LATENCY_BUCKETS_SECONDS:
+        if record["latency_seconds"] <= bound:
+            latency["buckets"][str(bound)] += 1
+
+
+class Metrics:
+    """
+    Collects one record per LLM/Tavily call: provider, operation, calling
+    agent function, step ID, subtask, latency, tokens, credits and estimated
+    cost. summary() aggregates them into per-provider, per-caller and
+    per-step groups with cumulative latency histograms. The aggregates are
+    kept up to date as calls are recorded; with keep_calls=False only they
+    are kept, so memory stays bounded however many calls are recorded.
+    """
+
+    def __init__(self, keep_calls: bool = True):
+        self.keep_calls = keep_calls
+        self.calls: List[Dict] = []
+        self._summary = {"total": _empty_group(), "by_provider": {}, "by_caller": {}, "by_step": {}}
+        self._lock = threading.Lock()
+
+    def record(self, record: Dict) -> None:
+        with self._lock:
+            if self.keep_calls:
+                self.calls.append(record)
+            _add_to_group(self._summary["total"], record)
+            for section, label in (
+                ("by_provider", record["provider"]),
+                ("by_caller", f"{record['provider']}:{record['caller']}"),
+                ("by_step", record["step_id"] or "none"),
+            ):
+                _add_to_group(self._summary[section].setdefault(label, _empty_group()), record)
+
+    def summary(self) -> Dict:
+        with self._lock:
+            return copy.deepcopy(self._summary)
+
+    def to_json(self, include_calls: bool = False) -> str:
+        data = {"summary": self.summary()}
+        if include_calls:
+            with self._lock:
+                data["calls"] = list(self.calls)
+        return json.dumps(data, indent=2)
+
+
+# process-wide collector, used when no run-level collector is active; it lives
+# as long as the process (server, batch runner), so it keeps aggregates only
+metrics = Metrics(keep_calls=False)
+_active_metrics: contextvars.ContextVar[Optional[Metrics]] = contextvars.ContextVar(
+    "active_metrics", default=None
+)
+
+
+def current_metrics() -> Metrics:
+    return _active_metrics.get() or metrics
+
+
+@contextmanager
+def collect_metrics() -> Iterator[Metrics]:
+    """Records the calls made in this context, its tasks and threads in a fresh collector."""
+    collector = Metrics()
+    token = _active_metrics.set(collector)
+    try:
+        yield collector
+    finally:
+        _active_metrics.reset(token)
+
+
+@contextmanager
+def call_context(
+    step_id: Optional[str] = None, subtask: Optional[str] = None, caller: Optional[str] = None
+) -> Iterator[None]:
+    """
+    Labels the calls made in this context with a plan step and/or subtask.
+    `caller` replaces the agent function found on the stack.
+    """
+    tokens = []
+    if caller is not None:
+        tokens.append((current_caller, current_caller.set(caller)))
+    if step_id is not None:
+        tokens.append((current_step, current_step.set(step_id)))
+    if subtask is not None:
+        tokens.append((current_subtask, current_subtask.set(subtask)))
+    try:
+        yield
+    finally:
+        for var, token in reversed(tokens):
+            var.reset(token)
+
+
+@contextmanager
+def track_call(provider: str, operation: str) -> Iterator[Dict]:
+    """
+    Times one provider call and records it in the current collector. The
+    caller fills in tokens, credits and cost on the yielded record.
+    """
+    record = {
+        "provider": provider,
+        "operation": operation,
+        "caller": current_caller.get() or _caller() or "unattributed",
+        "step_id": current_step.get(),
+        "subtask": current_subtask.get(),
+        "prompt_tokens": 0,
+        "completion_tokens": 0,
+        "credits": 0.0,
+        "cost_usd": 0.0,
+        "cached": False,
+        "error": False,
+    }
+    start = time.perf_counter()
+    try:
+        yield record
+    except BaseException:
+        record["error"] = True
+        raise
+    finally:
+        record["latency_seconds"] = time.perf_counter() - start
+        current_metrics().record(record)
+
+
+def _labels(**labels: str) -> str:
+    def escape(value: str) -> str:
+        return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+    return ",".join(f'{k}="{escape(v)}"' for k, v in labels.items())
+
+
+def to_prometheus(summary: Dict) -> str:
+    """Renders a Metrics.summary() in the Prometheus text exposition format."""
+    lines = [
+        "# HELP research_call_latency_seconds Latency of LLM and Tavily calls.",
+        "# TYPE research_call_latency_seconds histogram",
+    ]
+    groups = summary["by_caller"].items()
+    for label, group in groups:
+        provider, caller = label.split(":", 1)
+        latency = group["latency_seconds"]
+        for bound, count in latency["buckets"].items():
+            labels = _labels(provider=provider, caller=caller, le=bound)
+            lines.append(f"research_call_latency_seconds_bucket{{{labels}}} {count}")
+        labels = _labels(provider=provider, caller=caller, le="+Inf")
+        lines.append(f"research_call_latency_seconds_bucket{{{labels}}} {group['calls']}")
+        labels = _labels(provider=provider, caller=caller)
+        lines.append(f"research_call_latency_seconds_sum{{{labels}}} {latency['sum']:.6f}")
+        lines.append(f"research_call_latency_seconds_count{{{labels}}} {group['calls']}")
+
+    for name, help_text, key in (
+        ("research_calls_cached_total", "Calls answered from cache.", "cached"),
+        ("research_call_errors_total", "Calls that raised.", "errors"),
+        ("research_prompt_tokens_total", "Prompt tokens sent.", "prompt_tokens"),
+        ("research_completion_tokens_total", "Completion tokens received.", "completion_tokens"),
+        ("research_tavily_credits_total", "Tavily API credits used.", "credits"),
+        ("research_cost_usd_total", "Estimated cost in USD.", "cost_usd"),
+    ):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} counter")
+        for label, group in groups:
+            provider, caller = label.split(":", 1)
+            lines.append(f"{name}{{{_labels(provider=provider, caller=caller)}}} {group[key]}")
+    return "\n".join(lines) + "\n"
+
+
+def export_metrics(summary: Dict, path: str) -> None:
+    """Writes a summary as Prometheus text for .prom/.txt paths, JSON otherwise."""
+    if path.endswith((".prom", ".txt")):
+        text = to_prometheus(summary)
+    else:
+        text = json.dumps(summary, indent=2)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
@@ -1,15 +1,433 @@
+import asyncio
 import os
+import threading
+from collections import Counter
+from concurrent.futures import Future
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 
-from langchain_openai import ChatOpenAI
-from langchain.chat_models import init_chat_model
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
 
+from utils.cache import DEFAULT_CACHE_DIR, SQLiteCache, make_key
+from utils.cassette import get_cassette
+from utils.http import get_pool
+from utils.instrumentation import llm_cost, track_call
+from utils.providers import get_provider, load_env, registry
+from utils.rate_limiter import RateLimiter, estimate_tokens, get_limiter
+
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1") != "0"
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join(DEFAULT_CACHE_DIR, "llm_cache.sqlite"))
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", 7 * 24 * 3600))
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+# read timeout of provider HTTP calls; long reports take a while
+LLM_HTTP_TIMEOUT_SECONDS = float(os.getenv("LLM_HTTP_TIMEOUT_SECONDS", 600))
+
+llm_cache = SQLiteCache(
+    LLM_CACHE_PATH,
+    namespace="llm",
+    ttl_seconds=LLM_CACHE_TTL_SECONDS,
+    max_bytes=LLM_CACHE_MAX_BYTES,
+)
+
+# identical requests that are already in flight share one provider call
+LLM_SINGLE_FLIGHT = os.getenv("LLM_SINGLE_FLIGHT", "1") != "0"
+_inflight: Dict[str, Future] = {}
+_inflight_lock = threading.Lock()
+
+# process-wide counters: provider_calls, coalesced
+llm_stats: Counter = Counter()
+
+
+def _serialize_prompt(prompt: Any) -> List[List[str]]:
+    """Turns a str or list of messages into a plain structure for hashing."""
+    if isinstance(prompt, str):
+        return [["human", prompt]]
+    serialized = []
+    for message in prompt:
+        if isinstance(message, BaseMessage):
+            serialized.append([message.type, str(message.content)])
+        else:
+            serialized.append(["raw", str(message)])
+    return serialized
+
+
+def _join_inflight(key: str) -> Tuple[Future, bool]:
+    """Returns (future, is_leader). Only the leader makes the provider call."""
+    with _inflight_lock:
+        future = _inflight.get(key)
+        if future is not None:
+            llm_stats["coalesced"] += 1
+            return future, False
+        future = Future()
+        _inflight[key] = future
+        return future, True
+
+
+class _LeaderCancelled(Exception):
+    """Set on a single-flight future whose leader was cancelled; a follower takes over."""
+
+
+def _finish_inflight(key: str, future: Future, response=None, error=None) -> None:
+    with _inflight_lock:
+        if _inflight.get(key) is future:
+            del _inflight[key]
+    if future.done():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(response)
+
+
+def _total_tokens(response) -> Optional[int]:
+    usage = getattr(response, "usage_metadata", None) or {}
+    return usage.get("total_tokens")
+
+
+def _encode_message(response) -> Dict:
+    return {
+        "content": response.content,
+        "usage_metadata": getattr(response, "usage_metadata", None),
+    }
+
+
+def _decode_message(recorded: Dict) -> AIMessage:
+    return AIMessage(
+        content=recorded["content"], usage_metadata=recorded.get("usage_metadata") or None
+    )
+
+
+def _record_usage(record: Dict, model_name: str, prompt_tokens: int, response) -> None:
+    """Fills tokens and cost into an instrumentation record; estimates if usage is missing."""
+    usage = getattr(response, "usage_metadata", None) or {}
+    record["prompt_tokens"] = usage.get("input_tokens", prompt_tokens)
+    record["completion_tokens"] = usage.get(
+        "output_tokens", estimate_tokens(str(getattr(response, "content", "")))
+    )
+    record["cost_usd"] = llm_cost(
+        model_name, record["prompt_tokens"], record["completion_tokens"]
+    )
+
+
+class CachedChatModel:
+    """
+    Wraps a chat model so that identical prompts are answered from a
+    persistent cache. The key is model name + temperature + full prompt +
+    call options (kwargs other than config).
+    Cache misses go through the provider rate limiter, if one is given, and
+    concurrent identical misses (from any thread or event loop) are
+    coalesced into a single provider call whose result they all share; if
+    the caller making it is cancelled, one of the waiting callers takes over.
+    When a cassette is active (utils/cassette.py), misses are recorded to it
+    under the same key, and cache hits are recorded too, so a cassette
+    recorded with a warm cache is complete. While replaying, the cache is
+    bypassed for reads and writes: answers come from the cassette only, and
+    a request it lacks raises CassetteMiss (unless misses pass through).
+    astream goes through the same cache, cassette and limiter, but is not
+    coalesced. Everything else is delegated to the wrapped model.
+    With model=None the wrapped model is the registry's `provider`
+    (utils/providers.py), built on first use.
+    """
+
+    def __init__(
+        self,
+        model,
+        model_name: str,
+        temperature: float,
+        cache: Optional[SQLiteCache],
+        limiter: Optional[RateLimiter] = None,
+        provider: Optional[str] = None,
+    ):
+        self._model = model
+        self.provider = provider
+        self.model_name = model_name
+        self.temperature = temperature
+        self.cache = cache
+        self.limiter = limiter
+
+    @property
+    def model(self):
+        return self._model if self._model is not None else get_provider(self.provider)
+
+    @model.setter
+    def model(self, model) -> None:
+        self._model = model
+
+    def _key(self, prompt: Any, kwargs: Dict[str, Any]) -> str:
+        # call options such as stop, response_format or tools change the answer;
+        # the runnable config (callbacks, tags) does not
+        options = {k: v for k, v in kwargs.items() if k != "config"}
+        parts = [self.model_name, self.temperature, _serialize_prompt(prompt)]
+        # plain calls keep the keys they had before options were part of it
+        if options:
+            parts.append(options)
+        return make_key(*parts)
+
+    def _live_cache(self) -> Optional[SQLiteCache]:
+        # a replay must not be answered by, nor leak into, the persistent cache
+        cassette = get_cassette()
+        return None if cassette is not None and cassette.replaying else self.cache
+
+    def _hit(self, key: str, cached: Optional[Dict]):
+        if cached is None:
+            return None
+        with track_call("openai", self.model_name) as record:
+            record["cached"] = True
+        response = AIMessage(content=cached["content"])
+        cassette = get_cassette()
+        if cassette is not None:
+            # a recording must not depend on what happened to be cached
+            cassette.record("llm", key, _encode_message(response))
+        return response
+
+    def _lookup(self, key: str):
+        cache = self._live_cache()
+        return self._hit(key, cache.get(key)) if cache is not None else None
+
+    async def _alookup(self, key: str):
+        # SQLite reads block; keep them off the event loop
+        cache = self._live_cache()
+        if cache is None:
+            return None
+        return self._hit(key, await asyncio.to_thread(cache.get, key))
+
+    def _store(self, key: str, response) -> None:
+        cache = self._live_cache()
+        if cache is not None:
+            cache.set(key, {"content": response.content})
+
+    async def _astore(self, key: str, response) -> None:
+        cache = self._live_cache()
+        if cache is not None:
+            await asyncio.to_thread(cache.set, key, {"content": response.content})
+
+    def _estimate(self, prompt: Any) -> int:
+        return estimate_tokens("".join(text for _, text in _serialize_prompt(prompt)))
+
+    def _provider_call(self, prompt: Any, tokens: int, args, kwargs):
+        llm_stats["provider_calls"] += 1
+        if self.limiter is None:
+            return self.model.invoke(prompt, *args, **kwargs)
+        response = self.limiter.call(self.model.invoke, prompt, *args, tokens=tokens, **kwargs)
+        self.limiter.record_tokens(tokens, _total_tokens(response))
+        return response
+
+    async def _provider_acall(self, prompt: Any, tokens: int, args, kwargs):
+        llm_stats["provider_calls"] += 1
+        if self.limiter is None:
+            return await self.model.ainvoke(prompt, *args, **kwargs)
+        response = await self.limiter.call_async(
+            self.model.ainvoke, prompt, *args, tokens=tokens, **kwargs
+        )
+        self.limiter.record_tokens(tokens, _total_tokens(response))
+        return response
+
+    async def _provider_astream(
+        self, prompt: Any, tokens: int, args, kwargs
+    ) -> AsyncIterator[AIMessageChunk]:
+        llm_stats["provider_calls"] += 1
+        if self.limiter is None:
+            stream = self.model.astream(prompt, *args, **kwargs)
+        else:
+            # retried like ainvoke until the first chunk arrives
+            stream = self.limiter.stream_async(
+                self.model.astream, prompt, *args, tokens=tokens, **kwargs
+            )
+        async for chunk in stream:
+            yield chunk
+
+    def _call(self, key: str, prompt: Any, args, kwargs):
+        tokens = self._estimate(prompt)
+        with track_call("openai", self.model_name) as record:
+            cassette = get_cassette()
+            if cassette is None:
+                response = self._provider_call(prompt, tokens, args, kwargs)
+            else:
+                response = cassette.call(
+                    "llm",
+                    key,
+                    lambda: self._provider_call(prompt, tokens, args, kwargs),
+                    _encode_message,
+                    _decode_message,
+                )
+            _record_usage(record, self.model_name, tokens, response)
+        return response
+
+    async def _acall(self, key: str, prompt: Any, args, kwargs):
+        tokens = self._estimate(prompt)
+        with track_call("openai", self.model_name) as record:
+            cassette = get_cassette()
+            if cassette is None:
+                response = await self._provider_acall(prompt, tokens, args, kwargs)
+            else:
+                response = await cassette.acall(
+                    "llm",
+                    key,
+                    lambda: self._provider_acall(prompt, tokens, args, kwargs),
+                    _encode_message,
+                    _decode_message,
+                )
+            _record_usage(record, self.model_name, tokens, response)
+        return response
+
+    def invoke(self, prompt: Any, *args, **kwargs):
+        key = self._key(prompt, kwargs)
+        cached = self._lookup(key)
+        if cached is not None:
+            return cached
+
+        if not LLM_SINGLE_FLIGHT:
+            response = self._call(key, prompt, args, kwargs)
+            self._store(key, response)
+            return response
+
+        while True:
+            future, is_leader = _join_inflight(key)
+            if is_leader:
+                break
+            try:
+                return future.result()
+            except _LeaderCancelled:
+                continue
+        try:
+            response = self._call(key, prompt, args, kwargs)
+            self._store(key, response)
+        except Exception as e:
+            _finish_inflight(key, future, error=e)
+            raise
+        except BaseException:
+            # interrupted, not failed: the followers retry instead of sharing it
+            _finish_inflight(key, future, error=_LeaderCancelled())
+            raise
+        _finish_inflight(key, future, response=response)
+        return response
+
+    async def ainvoke(self, prompt: Any, *args, **kwargs):
+        key = self._key(prompt, kwargs)
+        cached = await self._alookup(key)
+        if cached is not None:
+            return cached
+
+        if not LLM_SINGLE_FLIGHT:
+            response = await self._acall(key, prompt, args, kwargs)
+            await self._astore(key, response)
+            return response
+
+        while True:
+            future, is_leader = _join_inflight(key)
+            if is_leader:
+                break
+            try:
+                # shielded: a cancelled follower must not cancel the shared future
+                return await asyncio.shield(asyncio.wrap_future(future))
+            except _LeaderCancelled:
+                # the leader was cancelled; the first follower back becomes the leader
+                continue
+        try:
+            response = await self._acall(key, prompt, args, kwargs)
+            await self._astore(key, response)
+        except Exception as e:
+            _finish_inflight(key, future, error=e)
+            raise
+        except BaseException:
+            # cancelled, not failed: the followers retry instead of sharing it
+            _finish_inflight(key, future, error=_LeaderCancelled())
+            raise
+        _finish_inflight(key, future, response=response)
+        return response
+
+    async def astream(self, prompt: Any, *args, **kwargs) -> AsyncIterator[AIMessageChunk]:
+        """
+        Yields the response as it is generated. Cached and replayed responses
+        arrive as a single chunk; a generated one is cached (and recorded to
+        the cassette) once it is complete.
+        """
+        key = self._key(prompt, kwargs)
+        cached = await self._alookup(key)
+        if cached is not None:
+            yield AIMessageChunk(content=cached.content)
+            return
+
+        tokens = self._estimate(prompt)
+        with track_call("openai", self.model_name) as record:
+            cassette = get_cassette()
+            recorded = cassette.lookup("llm", key) if cassette is not None else None
+            if recorded is not None:
+                response = _decode_message(recorded)
+                yield AIMessageChunk(content=response.content)
+            else:
+                if cassette is not None:
+                    cassette.miss("llm", key)
+                chunks = []
+                async for chunk in self._provider_astream(prompt, tokens, args, kwargs):
+                    chunks.append(chunk)
+                    yield chunk
+                response = AIMessageChunk(content="") + chunks
+                if self.limiter is not None:
+                    self.limiter.record_tokens(tokens, _total_tokens(response))
+                if cassette is not None:
+                    cassette.record("llm", key, _encode_message(response))
+            _record_usage(record, self.model_name, tokens, response)
+        await self._astore(key, response)
+
+    def cache_stats(self) -> Dict[str, int]:
+        return self.cache.stats() if self.cache is not None else {}
+
+    def stats(self) -> Dict[str, int]:
+        """Cache counters plus process-wide provider_calls and coalesced counts."""
+        return {**self.cache_stats(), **llm_stats}
+
+    def __getattr__(self, name: str):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.model, name)
+
+
+def _http_clients() -> Dict[str, Any]:
+    """SDK clients on the shared connection pool (utils/http.py)."""
+    pool = get_pool()
+    return {
+        "http_client": pool.client(LLM_HTTP_TIMEOUT_SECONDS),
+        "http_async_client": pool.async_client(LLM_HTTP_TIMEOUT_SECONDS),
+    }
+
+
+def _init_chat_model(model_name: str, temperature: float):
+    load_env()
+    from langchain.chat_models import init_chat_model
+
+    return init_chat_model(model_name, temperature=temperature, **_http_clients())
+
+
+def _chat_openai(model_name: str, temperature: float):
+    load_env()
+    from langchain_openai import ChatOpenAI
 
-def get_llm(model: str = "gpt-4o-mini", temperature: float = 0.0):
     return ChatOpenAI(
-        model=model,
+        model=model_name,
         temperature=temperature,
         api_key=os.environ["OPENAI_API_KEY"],
+        **_http_clients(),
+    )
+
+
+def _wrap_model(provider: str, model_name: str, temperature: float):
+    return CachedChatModel(
+        None,
+        model_name,
+        temperature,
+        llm_cache if LLM_CACHE_ENABLED else None,
+        get_limiter("openai"),
+        provider=provider,
     )
 
 
-model = init_chat_model("gpt-5-mini", temperature=0)
+def get_llm(model: str = "gpt-4o-mini", temperature: float = 0.0):
+    provider = f"openai:{model}@{temperature}"
+    if provider not in registry.factories:
+        registry.register(provider, lambda: _chat_openai(model, temperature))
+    return _wrap_model(provider, model, temperature)
+
+
+# the default model; the provider client is only built on the first call
+registry.register("chat:gpt-5-mini@0", lambda: _init_chat_model("gpt-5-mini", 0))
+model = _wrap_model("chat:gpt-5-mini@0", "gpt-5-mini", 0)
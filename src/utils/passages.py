@@ -0,0 +1,111 @@
+import math
+import re
+from collections import Counter
+from typing import List
+
+from utils.rate_limiter import estimate_tokens
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has", "have", "in",
+    "is", "it", "its", "of", "on", "or", "that", "the", "their", "this", "to", "was",
+    "were", "what", "which", "with", "how", "does", "do", "between", "into", "about",
+}  # fmt: skip
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:[.,][0-9]+)*")
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in _TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+def split_passages(text: str, max_chars: int = 1200) -> List[str]:
+    """
+    Splits page text into passages of at most ~max_chars. Paragraphs are
+    kept whole when possible, short ones are merged and long ones are cut
+    on sentence boundaries.
+    """
+    pieces: List[str] = []
+    for paragraph in re.split(r"\n\s*\n", text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if len(paragraph) <= max_chars:
+            pieces.append(paragraph)
+            continue
+        for sentence in _SENTENCE_RE.split(paragraph):
+            while len(sentence) > max_chars:
+                pieces.append(sentence[:max_chars])
+                sentence = sentence[max_chars:]
+            if sentence:
+                pieces.append(sentence)
+
+    passages: List[str] = []
+    current = ""
+    for piece in pieces:
+        if current and len(current) + len(piece) + 1 > max_chars:
+            passages.append(current)
+            current = piece
+        else:
+            current = f"{current}\n{piece}" if current else piece
+    if current:
+        passages.append(current)
+    return passages
+
+
+def bm25_scores(
+    query: str, passages: List[str], k1: float = 1.5, b: float = 0.75
+) -> List[float]:
+    """Okapi BM25 score of every passage against the query."""
+    query_terms = set(tokenize(query))
+    docs = [Counter(tokenize(p)) for p in passages]
+    if not docs or not query_terms:
+        return [0.0] * len(passages)
+
+    avg_len = sum(sum(d.values()) for d in docs) / len(docs) or 1.0
+    doc_freq = Counter(term for d in docs for term in query_terms if term in d)
+
+    scores = []
+    for d in docs:
+        length = sum(d.values())
+        score = 0.0
+        for term in query_terms:
+            tf = d.get(term, 0)
+            if not tf:
+                continue
+            idf = math.log(1 + (len(docs) - doc_freq[term] + 0.5) / (doc_freq[term] + 0.5))
+            score += idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * length / avg_len))
+        scores.append(score)
+    return scores
+
+
+def select_relevant_passages(
+    query: str, text: str, token_budget: int, top_k: int = 12, max_chars: int = 1200
+) -> str:
+    """
+    Keeps only the passages of `text` that rank highest against `query`,
+    up to top_k passages and token_budget tokens, in their original order.
+    Passages sharing no terms with the query are dropped. Text that already
+    fits the budget is returned unchanged.
+    """
+    if estimate_tokens(text) <= token_budget:
+        return text
+
+    passages = split_passages(text, max_chars=max_chars)
+    scores = bm25_scores(query, passages)
+    ranked = sorted(
+        (i for i in range(len(passages)) if scores[i] > 0), key=lambda i: scores[i], reverse=True
+    )
+    if not ranked:
+        # nothing matches lexically: fall back to the start of the page
+        ranked = list(range(len(passages)))
+
+    chosen: List[int] = []
+    used = 0
+    for i in ranked[:top_k]:
+        cost = estimate_tokens(passages[i])
+        if used + cost > token_budget:
+            continue
+        chosen.append(i)
+        used += cost
+    return "\n\n".join(passages[i] for i in sorted(chosen))
@@ -0,0 +1,84 @@
+import contextvars
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+_env_loaded = False
+
+
+def load_env() -> None:
+    """Loads .env into the environment, once, the first time a provider needs a key."""
+    global _env_loaded
+    if not _env_loaded:
+        from dotenv import load_dotenv
+
+        load_dotenv()
+        _env_loaded = True
+
+
+class ProviderRegistry:
+    """
+    Named provider clients (chat models, the Tavily client) built by their
+    factory on first use instead of at import time, so importing the agents
+    needs neither the provider SDKs nor API keys.
+
+    `instances` holds the process-wide clients and can be assigned directly
+    to inject one (tests, replay backends). `override` replaces clients for
+    the current context only, i.e. for one run and the tasks and threads it
+    starts, without affecting concurrent runs.
+    """
+
+    def __init__(self):
+        self.factories: Dict[str, Callable[[], Any]] = {}
+        self.instances: Dict[str, Any] = {}
+        self._overrides: contextvars.ContextVar[Dict[str, Any]] = contextvars.ContextVar(
+            "provider_overrides", default={}
+        )
+        self._lock = threading.Lock()
+
+    def register(self, name: str, factory: Callable[[], Any]) -> None:
+        """Adds (or replaces) the factory for `name`; an already built client is kept."""
+        self.factories[name] = factory
+
+    def get(self, name: str) -> Any:
+        override = self._overrides.get().get(name)
+        if override is not None:
+            return override
+        instance = self.instances.get(name)
+        if instance is not None:
+            return instance
+        if name not in self.factories:
+            raise KeyError(f"No provider registered under {name!r}")
+        with self._lock:
+            # another thread may have built it while we waited
+            if name not in self.instances:
+                self.instances[name] = self.factories[name]()
+            return self.instances[name]
+
+    def reset(self, name: Optional[str] = None) -> None:
+        """Drops built clients (all, or one) so the next use rebuilds them."""
+        with self._lock:
+            if name is None:
+                self.instances.clear()
+            else:
+                self.instances.pop(name, None)
+
+    @contextmanager
+    def override(self, clients: Optional[Dict[str, Any]] = None, **named: Any) -> Iterator[None]:
+        """Uses the given clients in this context, e.g. override(tavily=FakeTavilyClient())."""
+        token = self._overrides.set({**self._overrides.get(), **(clients or {}), **named})
+        try:
+            yield
+        finally:
+            self._overrides.reset(token)
+
+    def built(self) -> List[str]:
+        return sorted(self.instances)
+
+
+# the process-wide registry; utils.llm and utils.tavily_wrapper register their factories here
+registry = ProviderRegistry()
+
+
+def get_provider(name: str) -> Any:
+    return registry.get(name)
@@ -0,0 +1,182 @@
+import asyncio
+import os
+import random
+import threading
+import time
+from typing import Any, AsyncIterator, Callable, Dict, Optional
+
+RATE_LIMIT_MAX_RETRIES = int(os.getenv("RATE_LIMIT_MAX_RETRIES", 6))
+RATE_LIMIT_BASE_DELAY_SECONDS = float(os.getenv("RATE_LIMIT_BASE_DELAY_SECONDS", 1.0))
+RATE_LIMIT_MAX_DELAY_SECONDS = float(os.getenv("RATE_LIMIT_MAX_DELAY_SECONDS", 60.0))
+
+RATE_LIMIT_ERROR_NAMES = {"RateLimitError", "UsageLimitExceededError"}
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 chars per token), good enough for budgeting."""
+    return max(1, len(text) // 4)
+
+
+def is_rate_limit_error(exc: BaseException) -> bool:
+    if type(exc).__name__ in RATE_LIMIT_ERROR_NAMES:
+        return True
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+    return status == 429
+
+
+def _retry_after_seconds(exc: BaseException) -> Optional[float]:
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """
+    Per-minute token bucket. Callers reserve capacity up front and are told
+    how long to wait, so the level can go negative: later callers queue up
+    behind earlier ones, which keeps waiting fair (first come, first served).
+    """
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.level = self.capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def reserve(self, amount: float, now: float) -> float:
+        """Takes `amount` from the bucket and returns the seconds to wait before using it."""
+        self._refill(now)
+        self.level -= min(amount, self.capacity)
+        return max(0.0, -self.level / self.rate)
+
+    def adjust(self, amount: float, now: float) -> None:
+        """Corrects an earlier reservation once the real usage is known."""
+        self._refill(now)
+        self.level -= amount
+
+
+class RateLimiter:
+    """
+    Requests-per-minute and tokens-per-minute budget for one provider,
+    shared by sync and async callers. Rate-limit errors are retried with
+    exponential backoff, and the whole provider pauses while backing off.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        requests_per_minute: float,
+        tokens_per_minute: Optional[float] = None,
+        max_retries: int = RATE_LIMIT_MAX_RETRIES,
+    ):
+        self.name = name
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.max_retries = max_retries
+        self.paused_until = 0.0
+        self.calls = 0
+        self.retries = 0
+        self.waited_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens: int = 0) -> float:
+        with self._lock:
+            now = time.monotonic()
+            wait = self.requests.reserve(1, now)
+            if self.tokens is not None and tokens:
+                wait = max(wait, self.tokens.reserve(tokens, now))
+            wait = max(wait, self.paused_until - now)
+            self.calls += 1
+            self.waited_seconds += wait
+        return wait
+
+    def record_tokens(self, estimated: int, actual: Optional[int]) -> None:
+        if self.tokens is None or actual is None:
+            return
+        with self._lock:
+            self.tokens.adjust(actual - estimated, time.monotonic())
+
+    def _backoff(self, attempt: int, exc: BaseException) -> float:
+        delay = _retry_after_seconds(exc)
+        if delay is None:
+            delay = min(RATE_LIMIT_MAX_DELAY_SECONDS, RATE_LIMIT_BASE_DELAY_SECONDS * 2**attempt)
+            delay *= 0.5 + random.random() / 2
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + delay)
+            self.retries += 1
+        return delay
+
+    def call(self, fn: Callable[..., Any], *args, tokens: int = 0, **kwargs) -> Any:
+        for attempt in range(self.max_retries + 1):
+            time.sleep(self.reserve(tokens))
+            try:
+                return fn(*args, **kwargs)
+            except Exception as exc:
+                if attempt == self.max_retries or not is_rate_limit_error(exc):
+                    raise
+                self._backoff(attempt, exc)
+
+    async def call_async(self, fn: Callable[..., Any], *args, tokens: int = 0, **kwargs) -> Any:
+        for attempt in range(self.max_retries + 1):
+            await asyncio.sleep(self.reserve(tokens))
+            try:
+                return await fn(*args, **kwargs)
+            except Exception as exc:
+                if attempt == self.max_retries or not is_rate_limit_error(exc):
+                    raise
+                self._backoff(attempt, exc)
+
+    async def stream_async(
+        self, fn: Callable[..., AsyncIterator[Any]], *args, tokens: int = 0, **kwargs
+    ) -> AsyncIterator[Any]:
+        """
+        call_async for a streaming call: rate-limit errors raised before the
+        first chunk are retried with the same backoff. Once a chunk has been
+        handed out the stream cannot be restarted, so later errors propagate.
+        """
+        for attempt in range(self.max_retries + 1):
+            await asyncio.sleep(self.reserve(tokens))
+            stream = fn(*args, **kwargs)
+            try:
+                first = await stream.__anext__()
+            except StopAsyncIteration:
+                return
+            except Exception as exc:
+                if attempt == self.max_retries or not is_rate_limit_error(exc):
+                    raise
+                self._backoff(attempt, exc)
+                continue
+            yield first
+            async for chunk in stream:
+                yield chunk
+            return
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "calls": self.calls,
+            "retries": self.retries,
+            "waited_seconds": round(self.waited_seconds, 3),
+        }
+
+
+# one shared limiter per provider for the whole process
+limiters: Dict[str, RateLimiter] = {
+    "openai": RateLimiter(
+        "openai",
+        requests_per_minute=float(os.getenv("OPENAI_RPM", 500)),
+        tokens_per_minute=float(os.getenv("OPENAI_TPM", 200_000)),
+    ),
+    "tavily": RateLimiter("tavily", requests_per_minute=float(os.getenv("TAVILY_RPM", 100))),
+}
+
+
+def get_limiter(provider: str) -> RateLimiter:
+    return limiters[provider]
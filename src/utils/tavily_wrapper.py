@@ -1,123 +1,621 @@
-from typing import List, Dict
-from state.research_state import PlanStep, ResearchState
+import asyncio
 import os
-from dotenv import load_dotenv
-from tavily.client import TavilyClient
-
-load_dotenv()
-TAVILY_API_KEY = os.getenv("TAVILY_API_KEY")
-client = TavilyClient(TAVILY_API_KEY)
-
-
-def tavily_search(query: str):
-    EXCLUDED_DOMAINS = [
-        # Authenticated / Paywalled
-        "linkedin.com",
-        "facebook.com",
-        "instagram.com",
-        "x.com",
-        "twitter.com",
-        "reddit.com",
-        "quora.com",
-        "medium.com",
-        "substack.com",
-        "patreon.com",
-        "onlyfans.com",
-        "bloomberg.com",
-        "ft.com",
-        "wsj.com",
-        "economist.com",
-        "jstor.org",
-        "ieee.org",
-        "sciencedirect.com",
-        "springer.com",
-        "nature.com",
-        "lexisnexis.com",
-        "westlaw.com",
-        # E-commerce / Marketplaces
-        "amazon.com",
-        "ebay.com",
-        "walmart.com",
-        "target.com",
-        "bestbuy.com",
-        "homedepot.com",
-        "lowes.com",
-        "aliexpress.com",
-        "etsy.com",
-        "wayfair.com",
-        "costco.com",
-        "shopify.com",
-        # Ticketing / Travel
-        "ticketmaster.com",
-        "livenation.com",
-        "stubhub.com",
-        "seatgeek.com",
-        "expedia.com",
-        "booking.com",
-        "priceline.com",
-        "kayak.com",
-        "airbnb.com",
-        "delta.com",
-        "united.com",
-        "americanairlines.com",
-        # SaaS Dashboards / Cloud Consoles
-        "aws.amazon.com",
-        "console.aws.amazon.com",
-        "azure.microsoft.com",
-        "portal.azure.com",
-        "cloud.google.com",
-        "console.cloud.google.com",
-        "stripe.com",
-        "dashboard.stripe.com",
-        "datadog.com",
-        "newrelic.com",
-        "grafana.com",
-        "notion.so",
-        "atlassian.net",
-        "jira.com",
-        # Social / Multimedia
-        "tiktok.com",
-        "youtube.com",
-        "snapchat.com",
-        "pinterest.com",
-        "imgur.com",
-        "flickr.com",
-        "soundcloud.com",
-        "spotify.com",
-        "twitch.tv",
-        # Government / Institutional
-        "irs.gov",
-        "sec.gov",
-        "ssa.gov",
-        "cdc.gov",
-        "nih.gov",
-        "who.int",
-        "un.org",
-        "loc.gov",
-        "europa.eu",
-        "gov.uk",
-        # Forums / Communities
-        "phpbb.com",
-        "vbulletin.com",
-        "invisioncommunity.com",
-        "stackexchange.com",
-        "stackoverflow.com",
-        "superuser.com",
-        "serverfault.com",
-        # Media / News
-        "nytimes.com",
-        "washingtonpost.com",
-        "cnn.com",
-        "bbc.com",
-        "theguardian.com",
-        "forbes.com",
-        "businessinsider.com",
-        "vox.com",
+import re
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple, Union
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import httpx
+
+from utils.cache import DEFAULT_CACHE_DIR, SQLiteCache, make_key
+from utils.cassette import get_cassette
+from utils.instrumentation import (
+    TAVILY_CREDIT_USD,
+    call_context,
+    current_step,
+    current_subtask,
+    tavily_credits,
+    track_call,
+)
+from utils.http import get_pool
+from utils.providers import get_provider, load_env, registry
+from utils.rate_limiter import get_limiter
+
+TAVILY_API_URL = "https://api.tavily.com"
+TAVILY_TIMEOUT_SECONDS = float(os.getenv("TAVILY_TIMEOUT_SECONDS", 60))
+
+
+def tavily_api_key() -> Optional[str]:
+    load_env()
+    return os.getenv("TAVILY_API_KEY")
+
+
+def _headers() -> Dict[str, str]:
+    return {"Content-Type": "application/json", "Authorization": f"Bearer {tavily_api_key()}"}
+
+
+class TavilyHTTPClient:
+    """
+    The subset of the Tavily SDK client the wrapper uses (search, extract),
+    posting through the shared connection pool (utils/http.py) instead of
+    the SDK's own requests session.
+    """
+
+    def __init__(self, http: Optional[httpx.Client] = None):
+        self.http = http or get_pool().client(
+            TAVILY_TIMEOUT_SECONDS, base_url=TAVILY_API_URL, headers=_headers()
+        )
+
+    def _post(self, path: str, payload: Dict) -> Dict:
+        response = self.http.post(path, json=payload)
+        response.raise_for_status()
+        return response.json()
+
+    def search(self, query: str, **kwargs) -> Dict:
+        return self._post("/search", {"query": query, **kwargs})
+
+    def extract(self, urls: Union[str, List[str]]) -> Dict:
+        return self._post("/extract", {"urls": urls})
+
+
+# the sync client, built on first use (inject another via utils.providers)
+registry.register("tavily", TavilyHTTPClient)
+
+# the async client, built on first use; its transport keeps one pool per event loop
+_async_http: Optional[httpx.AsyncClient] = None
+
+TAVILY_CACHE_ENABLED = os.getenv("TAVILY_CACHE_ENABLED", "1") != "0"
+TAVILY_CACHE_PATH = os.getenv(
+    "TAVILY_CACHE_PATH", os.path.join(DEFAULT_CACHE_DIR, "tavily_cache.sqlite")
+)
+# freshness windows: search results go stale much faster than page content
+TAVILY_SEARCH_TTL_SECONDS = float(os.getenv("TAVILY_SEARCH_TTL_SECONDS", 24 * 3600))
+TAVILY_EXTRACT_TTL_SECONDS = float(os.getenv("TAVILY_EXTRACT_TTL_SECONDS", 7 * 24 * 3600))
+TAVILY_CACHE_MAX_BYTES = int(os.getenv("TAVILY_CACHE_MAX_BYTES", 1024 * 1024 * 1024))
+
+search_cache = SQLiteCache(
+    TAVILY_CACHE_PATH,
+    namespace="search",
+    ttl_seconds=TAVILY_SEARCH_TTL_SECONDS,
+    max_bytes=TAVILY_CACHE_MAX_BYTES // 8,
+)
+extract_cache = SQLiteCache(
+    TAVILY_CACHE_PATH,
+    namespace="extract",
+    ttl_seconds=TAVILY_EXTRACT_TTL_SECONDS,
+    max_bytes=TAVILY_CACHE_MAX_BYTES,
+)
+
+TRACKING_PARAMS = {
+    "fbclid",
+    "gclid",
+    "dclid",
+    "msclkid",
+    "mc_cid",
+    "mc_eid",
+    "igshid",
+    "yclid",
+    "_ga",
+    "_hsenc",
+    "_hsmi",
+    "ref",
+    "ref_src",
+    "spm",
+}
+
+EXCLUDED_DOMAINS = [
+    # Authenticated / Paywalled
+    "linkedin.com",
+    "facebook.com",
+    "instagram.com",
+    "x.com",
+    "twitter.com",
+    "reddit.com",
+    "quora.com",
+    "medium.com",
+    "substack.com",
+    "patreon.com",
+    "onlyfans.com",
+    "bloomberg.com",
+    "ft.com",
+    "wsj.com",
+    "economist.com",
+    "jstor.org",
+    "ieee.org",
+    "sciencedirect.com",
+    "springer.com",
+    "nature.com",
+    "lexisnexis.com",
+    "westlaw.com",
+    # E-commerce / Marketplaces
+    "amazon.com",
+    "ebay.com",
+    "walmart.com",
+    "target.com",
+    "bestbuy.com",
+    "homedepot.com",
+    "lowes.com",
+    "aliexpress.com",
+    "etsy.com",
+    "wayfair.com",
+    "costco.com",
+    "shopify.com",
+    # Ticketing / Travel
+    "ticketmaster.com",
+    "livenation.com",
+    "stubhub.com",
+    "seatgeek.com",
+    "expedia.com",
+    "booking.com",
+    "priceline.com",
+    "kayak.com",
+    "airbnb.com",
+    "delta.com",
+    "united.com",
+    "americanairlines.com",
+    # SaaS Dashboards / Cloud Consoles
+    "aws.amazon.com",
+    "console.aws.amazon.com",
+    "azure.microsoft.com",
+    "portal.azure.com",
+    "cloud.google.com",
+    "console.cloud.google.com",
+    "stripe.com",
+    "dashboard.stripe.com",
+    "datadog.com",
+    "newrelic.com",
+    "grafana.com",
+    "notion.so",
+    "atlassian.net",
+    "jira.com",
+    # Social / Multimedia
+    "tiktok.com",
+    "youtube.com",
+    "snapchat.com",
+    "pinterest.com",
+    "imgur.com",
+    "flickr.com",
+    "soundcloud.com",
+    "spotify.com",
+    "twitch.tv",
+    # Government / Institutional
+    "irs.gov",
+    "sec.gov",
+    "ssa.gov",
+    "cdc.gov",
+    "nih.gov",
+    "who.int",
+    "un.org",
+    "loc.gov",
+    "europa.eu",
+    "gov.uk",
+    # Forums / Communities
+    "phpbb.com",
+    "vbulletin.com",
+    "invisioncommunity.com",
+    "stackexchange.com",
+    "stackoverflow.com",
+    "superuser.com",
+    "serverfault.com",
+    # Media / News
+    "nytimes.com",
+    "washingtonpost.com",
+    "cnn.com",
+    "bbc.com",
+    "theguardian.com",
+    "forbes.com",
+    "businessinsider.com",
+    "vox.com",
+]
+
+
+def normalize_query(query: str) -> str:
+    """Case- and whitespace-insensitive form of a search query, used for cache keys."""
+    return re.sub(r"\s+", " ", query).strip().lower()
+
+
+def canonicalize_url(url: str) -> str:
+    """
+    Canonical form of a URL for per-page caching: lowercased scheme and host,
+    no default port, fragment or tracking params, sorted query string.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower() or "https"
+    host = (parts.hostname or "").lower()
+    if parts.port and not (
+        (scheme == "http" and parts.port == 80) or (scheme == "https" and parts.port == 443)
+    ):
+        host = f"{host}:{parts.port}"
+
+    path = parts.path or "/"
+    if len(path) > 1:
+        path = path.rstrip("/")
+
+    params = [
+        (k, v)
+        for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith("utm_") and k.lower() not in TRACKING_PARAMS
     ]
-    response = client.search(query, max_results=7, exclude_domains=EXCLUDED_DOMAINS)
+    return urlunsplit((scheme, host, path, urlencode(sorted(params)), ""))
+
+
+def _search_key(query: str, max_results: int, exclude_domains: List[str]) -> str:
+    return make_key(normalize_query(query), sorted(exclude_domains), max_results)
+
+
+def _use_cache() -> bool:
+    """Whether to read and write the persistent cache; a replay serves the cassette only."""
+    cassette = get_cassette()
+    return TAVILY_CACHE_ENABLED and (cassette is None or not cassette.replaying)
+
+
+def _record_cache_hits(kind: str, hits: Dict[str, Dict]) -> None:
+    """Records cache hits into a recording cassette, so it does not depend on what was cached."""
+    cassette = get_cassette()
+    if cassette is not None:
+        for key, response in hits.items():
+            cassette.record(kind, key, response)
+
+
+def _record_credits(record: Dict, operation: str, response: Optional[Dict]) -> None:
+    if response is None:
+        record["cached"] = True
+        return
+    record["credits"] = tavily_credits(operation, len(response.get("results", [])))
+    record["cost_usd"] = record["credits"] * TAVILY_CREDIT_USD
+
+
+def tavily_search(
+    query: str, max_results: int = 7, exclude_domains: Optional[List[str]] = None
+) -> Dict:
+    exclude_domains = EXCLUDED_DOMAINS if exclude_domains is None else exclude_domains
+    key = _search_key(query, max_results, exclude_domains)
+    use_cache = _use_cache()
+    if use_cache:
+        cached = search_cache.get(key)
+        if cached is not None:
+            with track_call("tavily", "search") as record:
+                _record_credits(record, "search", None)
+            _record_cache_hits("tavily_search", {key: cached})
+            return cached
+
+    def search() -> Dict:
+        return get_limiter("tavily").call(
+            get_provider("tavily").search,
+            query,
+            max_results=max_results,
+            exclude_domains=exclude_domains,
+        )
+
+    cassette = get_cassette()
+    with track_call("tavily", "search") as record:
+        response = search() if cassette is None else cassette.call("tavily_search", key, search)
+        _record_credits(record, "search", response)
+    if use_cache:
+        search_cache.set(key, response)
     return response
 
 
-def tavily_extract(url: str) -> Dict:
-    response = client.extract(url)
+def _split_cached_urls(urls: List[str]) -> Tuple[Dict[str, Dict], List[str]]:
+    """Returns (cached results by canonical url, urls that still need extracting)."""
+    cached: Dict[str, Dict] = {}
+    missing: List[str] = []
+    seen = set()
+    use_cache = _use_cache()
+    for url in urls:
+        canonical = canonicalize_url(url)
+        if canonical in seen:
+            continue
+        seen.add(canonical)
+        hit = extract_cache.get(canonical) if use_cache else None
+        if hit is not None:
+            cached[canonical] = hit
+        else:
+            missing.append(url)
+    return cached, missing
+
+
+def _is_failure(entry: Dict) -> bool:
+    return "raw_content" not in entry
+
+
+def _match_extracted(urls: List[str], response: Optional[Dict]) -> Dict[str, Dict]:
+    """
+    Maps each requested URL (by canonical form) to its result or failure
+    entry. A result carries the URL the page was finally fetched from, which
+    differs from the requested one after a redirect; results that match no
+    requested URL are paired with the requested URLs still unanswered, in
+    request order (the API answers in request order). URLs left without a
+    result or a reported failure get an "extraction failed" entry.
+    """
+    response = response or {}
+    requested: Dict[str, str] = {}
+    for url in urls:
+        requested.setdefault(canonicalize_url(url), url)
+    failed = {
+        canonicalize_url(entry["url"]): entry
+        for entry in response.get("failed_results", [])
+        if entry.get("url")
+    }
+
+    matched: Dict[str, Dict] = {}
+    redirected: List[Dict] = []
+    for result in response.get("results", []):
+        canonical = canonicalize_url(result["url"])
+        if canonical in requested and canonical not in matched:
+            matched[canonical] = result
+        else:
+            redirected.append(result)
+    unanswered = [c for c in requested if c not in matched and c not in failed]
+    matched.update(zip(unanswered, redirected))
+
+    for canonical, url in requested.items():
+        if canonical not in matched:
+            matched[canonical] = failed.get(canonical, {"url": url, "error": "extraction failed"})
+    return matched
+
+
+def _merge_extracted(
+    url_list: List[str], pages: Dict[str, Dict], fetched: Dict[str, Dict]
+) -> Dict:
+    """Caches freshly extracted pages and returns results in request order."""
+    use_cache = _use_cache()
+    for canonical, entry in fetched.items():
+        if not _is_failure(entry):
+            pages[canonical] = entry
+            if use_cache:
+                extract_cache.set(canonical, entry)
+
+    results, failed_results = [], []
+    seen = set()
+    for url in url_list:
+        canonical = canonicalize_url(url)
+        if canonical in seen:
+            continue
+        seen.add(canonical)
+        if canonical in pages:
+            results.append(pages[canonical])
+        elif canonical in fetched:
+            failed_results.append(fetched[canonical])
+    return {"results": results, "failed_results": failed_results}
+
+
+def _replay_extracted(urls: List[str]) -> Tuple[Dict[str, Dict], List[str]]:
+    """
+    Looks URLs up in the active cassette, one entry per canonical URL (batch
+    composition varies between runs, pages do not). Returns (replayed
+    entries by canonical url, urls that still need extracting).
+    """
+    replayed: Dict[str, Dict] = {}
+    cassette = get_cassette()
+    if cassette is None or not cassette.replaying:
+        return replayed, urls
+
+    missing = []
+    for url in urls:
+        canonical = canonicalize_url(url)
+        recorded = cassette.lookup("tavily_extract", canonical)
+        if recorded is None:
+            cassette.miss("tavily_extract", canonical)
+            missing.append(url)
+        else:
+            replayed[canonical] = recorded
+    return replayed, missing
+
+
+def _record_extracted(fetched: Dict[str, Dict]) -> None:
+    cassette = get_cassette()
+    if cassette is None:
+        return
+    for canonical, entry in fetched.items():
+        # failures are recorded too, so a replay fails the same URLs
+        cassette.record("tavily_extract", canonical, entry)
+
+
+def _extract_response(fetched: Dict[str, Dict]) -> Optional[Dict]:
+    """The fetched entries as an extract response, for credit accounting; None if all cached."""
+    if not fetched:
+        return None
+    return {"results": [entry for entry in fetched.values() if not _is_failure(entry)]}
+
+
+def tavily_extract(urls: Union[str, List[str]]) -> Dict:
+    """
+    Extracts page content for one or more URLs. Pages are cached per
+    canonical requested URL (also when the page redirects elsewhere), so
+    only URLs without a fresh cached copy hit the API.
+    """
+    url_list = [urls] if isinstance(urls, str) else list(urls)
+    pages, missing = _split_cached_urls(url_list)
+    _record_cache_hits("tavily_extract", pages)
+    with track_call("tavily", "extract") as record:
+        fetched, missing = _replay_extracted(missing)
+        if missing:
+            response = get_limiter("tavily").call(get_provider("tavily").extract, missing)
+            fresh = _match_extracted(missing, response)
+            _record_extracted(fresh)
+            fetched.update(fresh)
+        _record_credits(record, "extract", _extract_response(fetched))
+    return _merge_extracted(url_list, pages, fetched)
+
+
+def _get_async_http() -> httpx.AsyncClient:
+    """Returns the async Tavily client on the shared connection pool."""
+    global _async_http
+    if _async_http is None:
+        _async_http = get_pool().async_client(
+            TAVILY_TIMEOUT_SECONDS, base_url=TAVILY_API_URL, headers=_headers()
+        )
+    return _async_http
+
+
+async def _post_once_async(path: str, payload: Dict) -> Dict:
+    response = await _get_async_http().post(path, json=payload)
+    response.raise_for_status()
+    return response.json()
+
+
+async def _post_async(path: str, payload: Dict) -> Dict:
+    return await get_limiter("tavily").call_async(_post_once_async, path, payload)
+
+
+async def tavily_search_async(
+    query: str, max_results: int = 7, exclude_domains: Optional[List[str]] = None
+) -> Dict:
+    exclude_domains = EXCLUDED_DOMAINS if exclude_domains is None else exclude_domains
+    key = _search_key(query, max_results, exclude_domains)
+    use_cache = _use_cache()
+    if use_cache:
+        # SQLite reads and writes block; keep them off the event loop
+        cached = await asyncio.to_thread(search_cache.get, key)
+        if cached is not None:
+            with track_call("tavily", "search") as record:
+                _record_credits(record, "search", None)
+            _record_cache_hits("tavily_search", {key: cached})
+            return cached
+
+    def search() -> Awaitable[Dict]:
+        return _post_async(
+            "/search",
+            {"query": query, "max_results": max_results, "exclude_domains": exclude_domains},
+        )
+
+    cassette = get_cassette()
+    with track_call("tavily", "search") as record:
+        if cassette is None:
+            response = await search()
+        else:
+            response = await cassette.acall("tavily_search", key, search)
+        _record_credits(record, "search", response)
+    if use_cache:
+        await asyncio.to_thread(search_cache.set, key, response)
     return response
+
+
+async def tavily_extract_async(urls: Union[str, List[str]]) -> Dict:
+    """Async counterpart of tavily_extract, sharing the same per-URL cache."""
+    url_list = [urls] if isinstance(urls, str) else list(urls)
+    pages, missing = await asyncio.to_thread(_split_cached_urls, url_list)
+    _record_cache_hits("tavily_extract", pages)
+    with track_call("tavily", "extract") as record:
+        fetched, missing = _replay_extracted(missing)
+        if missing:
+            response = await _post_async("/extract", {"urls": missing})
+            fresh = _match_extracted(missing, response)
+            _record_extracted(fresh)
+            fetched.update(fresh)
+        _record_credits(record, "extract", _extract_response(fetched))
+    if not fetched:
+        return _merge_extracted(url_list, pages, fetched)
+    return await asyncio.to_thread(_merge_extracted, url_list, pages, fetched)
+
+
+# Tavily accepts at most this many URLs per extract request
+EXTRACT_MAX_BATCH = 20
+EXTRACT_BATCH_WINDOW_SECONDS = float(os.getenv("EXTRACT_BATCH_WINDOW_SECONDS", 0.05))
+
+
+class ExtractCoordinator:
+    """
+    Step-level extraction coordinator. Subtasks of one step ask it for
+    pages instead of calling tavily_extract themselves; URLs requested within
+    a short window are deduplicated (by canonical URL) and sent as batched
+    extract requests. Each URL is extracted at most once per coordinator:
+    later or concurrent requests for it share the same in-flight future.
+    """
+
+    def __init__(
+        self,
+        extract_fn: Callable[[List[str]], Awaitable[Dict]] = tavily_extract_async,
+        batch_window: float = EXTRACT_BATCH_WINDOW_SECONDS,
+        max_batch: int = EXTRACT_MAX_BATCH,
+    ):
+        self.extract_fn = extract_fn
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        # batches run in timer or flush tasks, outside the step's call stack
+        self.step_id = current_step.get()
+        self._pages: Dict[str, asyncio.Future] = {}
+        self._queue: List[str] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self.requested = 0
+        self.coalesced = 0
+        self.batches = 0
+
+    async def extract(self, urls: Union[str, List[str]]) -> Dict:
+        """Same contract as tavily_extract: {"results": [...], "failed_results": [...]}."""
+        loop = asyncio.get_running_loop()
+        url_list = [urls] if isinstance(urls, str) else list(urls)
+
+        waiting: List[Tuple[str, asyncio.Future]] = []
+        for url in url_list:
+            canonical = canonicalize_url(url)
+            self.requested += 1
+            future = self._pages.get(canonical)
+            if future is None:
+                future = loop.create_future()
+                self._pages[canonical] = future
+                self._queue.append(url)
+            else:
+                self.coalesced += 1
+            waiting.append((url, future))
+        self._schedule_flush(loop)
+
+        results, failed_results, seen = [], [], set()
+        for url, future in waiting:
+            # shielded: one cancelled subtask must not cancel a page others share
+            entry = await asyncio.shield(future)
+            if _is_failure(entry):
+                error = entry.get("error", "extraction failed")
+                failed_results.append({"url": url, "error": error})
+            elif id(entry) not in seen:
+                seen.add(id(entry))
+                results.append(entry)
+        return {"results": results, "failed_results": failed_results}
+
+    def _schedule_flush(self, loop: asyncio.AbstractEventLoop) -> None:
+        if len(self._queue) >= self.max_batch:
+            self._flush()
+        elif self._queue and self._timer is None:
+            self._timer = loop.call_later(self.batch_window, self._flush)
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._queue:
+            batch, self._queue = self._queue[: self.max_batch], self._queue[self.max_batch :]
+            task = asyncio.ensure_future(self._run_batch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, batch: List[str]) -> None:
+        self.batches += 1
+        futures = {canonicalize_url(url): self._pages[canonicalize_url(url)] for url in batch}
+        entries: Optional[Dict[str, Dict]] = None
+        # the batch is shared by the step's subtasks, not owned by the one that flushed it;
+        # this task runs in its own context copy, so the reset stays local to it
+        current_subtask.set(None)
+        try:
+            with call_context(step_id=self.step_id, caller="extract_coordinator"):
+                response = await self.extract_fn(batch)
+            entries = _match_extracted(batch, response)
+        except Exception as e:
+            # a failed batch fails its URLs, not the subtasks waiting on them
+            entries = {c: {"url": url, "error": str(e)} for c, url in zip(futures, batch)}
+            for canonical in futures:
+                # forget the failure so a later request can try again
+                self._pages.pop(canonical, None)
+        finally:
+            for canonical, future in futures.items():
+                if future.done():
+                    continue
+                if entries is None:
+                    # the batch was cancelled: so are its waiters; a later request retries
+                    self._pages.pop(canonical, None)
+                    future.cancel()
+                else:
+                    future.set_result(entries[canonical])
+
+    def stats(self) -> Dict[str, int]:
+        return {"requested": self.requested, "coalesced": self.coalesced, "batches": self.batches}